@@ -1,24 +1,55 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, status, Form
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from performance_cache import ModelCache
-import tempfile
 import os
 import logging
-from performance_cache import ModelCache
-from ocr.processor import process_document
-from pii_detection.detector import PIIDetector
-from pii_detection.models import TextSpan, EntityType, DetectedEntity
+import time
+from pipeline.executor import get_executor, OverloadedError
+from ocr.pool import get_ocr_pool, shutdown_ocr_pool
+from pipeline.stages import analyze_document, analyze_batch, analyze_stream_page, stream_page_count
+from pipeline.result_cache import get_result_cache, make_cache_key, document_options
+from pipeline.jobs import get_job_runner
+from pipeline.serialization import dumps_compact, dumps_line, entity_dicts
+from pii_detection.models import EntityType
 from pii_detection.llm_validator import LLMValidator
 from dotenv import load_dotenv
 import shutil
 from config.settings import settings
 from config.logging import logger
+from config.metrics import IN_FLIGHT, observe_request, render_metrics
 
 # Load environment variables
 load_dotenv()
 
+
+class CompactJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with a shared encoder: same bytes, less overhead."""
+
+    def render(self, content) -> bytes:
+        return dumps_compact(content)
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """``StreamingResponse`` that releases an executor ``AdmissionSlot`` once sent.
+
+    The body generator releases it too, but a generator the client never
+    started (or abandoned mid-way) is not closed until it is garbage collected.
+    """
+
+    def __init__(self, content, slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="OCR PII Detection API",
@@ -43,6 +74,36 @@ app.add_middleware(
     allowed_hosts=["*"]  # Configure properly for production
 )
 
+# Endpoints whose latency and concurrency are exported at /metrics
+_METERED_PATHS = {"/process_document", "/process_document/stream", "/process_documents/batch", "/jobs"}
+
+class RequestMetricsMiddleware:
+    """Track latency and concurrency of ``_METERED_PATHS`` per endpoint.
+
+    Plain ASGI rather than ``@app.middleware("http")``: that hook returns once
+    the endpoint hands back its response, before a streamed body is produced,
+    whereas here the request counts until its last byte is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] != "http" or scope["method"] != "POST" or path not in _METERED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        in_flight = IN_FLIGHT.labels(path)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight.dec()
+            observe_request(path, time.perf_counter() - started)
+
+
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.on_event("startup")
@@ -51,6 +112,18 @@ async def startup_event():
     ModelCache.load_easyocr()
     ModelCache.load_spacy()
     ModelCache.load_presidio()
+    ModelCache.load_pii_detector()
+    get_executor()
+    if settings.serving_mode != "prefork":
+        # In pre-fork mode OCR runs in the inference workers, which have no pool
+        get_ocr_pool()
+    get_job_runner().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    get_job_runner().stop()
+    get_executor().shutdown(wait=False)
+    shutdown_ocr_pool()
 
 @app.get("/health")
 async def health_check():
@@ -61,6 +134,33 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: reports whether all models are loaded."""
+    models = ModelCache.readiness()
+    ready = all(models.values())
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "loading", "models": models}
+    )
+
+@app.get("/workers")
+async def worker_stats():
+    """Inference executor load and, in pre-fork mode, per-worker memory and startup cost."""
+    return get_executor().stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Result cache hit/miss counters."""
+    cache = get_result_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency, document sizes, errors, cache and LLM outcomes."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -69,7 +169,14 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
+            "workers": "/workers",
+            "cache_stats": "/cache/stats",
+            "metrics": "/metrics",
             "process_document": "/process_document",
+            "process_document_stream": "/process_document/stream",
+            "process_documents_batch": "/process_documents/batch",
+            "jobs": "/jobs",
             "docs": "/docs"
         }
     }
@@ -93,157 +200,251 @@ def validate_file(file: UploadFile) -> None:
         )
 
 
+def parse_entities(entities: Optional[str]) -> List[str]:
+    """Entity types requested as a comma-separated form field; all when empty."""
+    if not entities or not entities.strip():
+        return [e.value for e in EntityType]
+    requested = []
+    for name in entities.split(","):
+        name = name.strip().upper()
+        if name and name not in requested:
+            requested.append(name)
+    known = {e.value for e in EntityType}
+    unknown = [name for name in requested if name not in known]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown entity type(s): {', '.join(unknown)}. Allowed: {', '.join(sorted(known))}"
+        )
+    return requested or [e.value for e in EntityType]
+
+
 @app.post("/process_document")
 async def process_document_api(
     file: UploadFile = File(...),
-    use_llm: bool = Form(False)
+    use_llm: bool = Form(False),
+    use_cache: bool = Form(True),
+    entities: Optional[str] = Form(None)
 ):
-    """Process document for OCR, signature detection, and PII detection."""
+    """Process document for OCR, signature detection, and PII detection.
+
+    Responses are cached by document content and options; pass
+    ``use_cache=false`` to force reprocessing (the fresh result is stored).
+    ``entities`` (e.g. ``AADHAAR,PAN``) limits detection to those types, and
+    only the detectors they need run.
+    """
     
     # Validate input file
     validate_file(file)
+    entities_to_detect = parse_entities(entities)
     
     logger.info(f"Processing document: {file.filename}")
     
     llm_api_key = settings.gemini_api_key if use_llm else None
-    image_path = None
 
     try:
-        # Save uploaded file to temp file
-        orig_ext = os.path.splitext(file.filename)[1] or '.jpg'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=orig_ext) as tmp:
-            file_bytes = await file.read()
-            tmp.write(file_bytes)
-            image_path = tmp.name
-
-        print(f"[DEBUG] Temp file created at: {image_path}, size: {os.path.getsize(image_path)} bytes, ext: {orig_ext}")
-
-        # Ensure file is valid
-        if not os.path.exists(image_path) or os.path.getsize(image_path) == 0:
-            print(f"[ERROR] Temp file not found or empty: {image_path}")
-            raise HTTPException(status_code=400, detail="Uploaded file could not be saved.")
-
-        # Run OCR
-        ocr_result = process_document(image_path)
-        if ocr_result is None or (isinstance(ocr_result, dict) and "error" in ocr_result):
-            error_msg = ocr_result["error"] if ocr_result and "error" in ocr_result else "OCR failed"
-            return JSONResponse(content={"error": error_msg}, status_code=400)
-
-        # Run YOLO signature detection
-        signature_spans = []
-        try:
-            model = ModelCache.yolo_model
-            results = model(image_path)
-            unique_boxes = set()
-            detected_boxes = 0
-            for i, r in enumerate(results):
-                for box in r.boxes:
-                    coords = box.xyxy[0].tolist()
-                    conf = float(box.conf[0])
-                    if len(coords) >= 4:
-                        x1, y1, x2, y2 = coords[:4]
-                    else:
-                        print(f"[SIGNATURE] Skipping YOLO box with insufficient coordinates: {coords}")
-                        continue
-                    box_key = (round(x1, 2), round(y1, 2), round(x2, 2), round(y2, 2))
-                    if box_key in unique_boxes:
-                        continue
-                    unique_boxes.add(box_key)
-                    signature_spans.append({
-                        "span_id": f"signature_{i}",
-                        "text": "<signature>",
-                        "bbox": {
-                            "x1": float(x1),
-                            "y1": float(y1),
-                            "x2": float(x2),
-                            "y2": float(y2)
-                        },
-                        "page_no": 1,
-                        "language": "und",
-                        "ocr_confidence": conf
-                    })
-                    detected_boxes += 1
-                    print(f"[SIGNATURE] Detected box {detected_boxes}: coords={coords}, confidence={conf}")
-            print(f"[SIGNATURE] Total detected signature boxes: {detected_boxes}")
-        except Exception as e:
-            print(f"[SIGNATURE][ERROR] Signature detection failed: {e}")
-            signature_spans = []
-
-        # Build spans for PII detection
-        spans_for_pii = []
-        for page in ocr_result.get("pages", []):
-            for i, block in enumerate(page.get("blocks", [])):
-                span = TextSpan(
-                    span_id=f"block_{i}",
-                    text=block["text"],
-                    bbox={
-                        "x1": block["position"]["top_left"][0],
-                        "y1": block["position"]["top_left"][1],
-                        "x2": block["position"]["bottom_right"][0],
-                        "y2": block["position"]["bottom_right"][1]
-                    },
-                    page_no=page["page_number"],
-                    language="en",
-                    ocr_confidence=block["confidence"]
-                )
-                spans_for_pii.append(span)
-
-            # Add signature spans to first page
-            if page["page_number"] == 1 and signature_spans:
-                for sig in signature_spans:
-                    sig_span = TextSpan(
-                        span_id=sig["span_id"],
-                        text=sig["text"],
-                        bbox=sig["bbox"],
-                        page_no=sig["page_no"],
-                        language=sig["language"],
-                        ocr_confidence=sig["ocr_confidence"]
-                    )
-                    spans_for_pii.append(sig_span)
-
-        # Entities to detect
-        entities_to_detect = [e.value for e in EntityType]
-
-        # Run PII detection
-        try:
-            detector = PIIDetector()
-            pii_entities = detector.detect_entities(spans_for_pii, entities_to_detect)
-        except Exception as pii_error:
-            print(f"[WARNING] PII detection failed: {pii_error}")
-            pii_entities = []
+        # Keep the upload in memory; it is decoded once inside the worker
+        file_bytes = await file.read()
+        if not file_bytes:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+
+        cache = get_result_cache()
+        cache_key = None
+        cache_status = "DISABLED"
+        if cache is not None:
+            cache_key = make_cache_key(
+                file_bytes,
+                document_options(bool(llm_api_key), entities_to_detect, ModelCache.versions())
+            )
+            if use_cache:
+                cached_body = cache.get(cache_key)
+                if cached_body is not None:
+                    logger.info(f"Result cache hit for {file.filename}")
+                    return Response(content=cached_body, media_type="application/json", headers={"X-Cache": "HIT"})
+                cache_status = "MISS"
+            else:
+                cache.record_bypass()
+                cache_status = "BYPASS"
+
+        # Run OCR, signature detection and PII detection off the event loop
+        stage_result = await get_executor().run(
+            analyze_document, file_bytes, file.filename, entities_to_detect=entities_to_detect
+        )
+        if "error" in stage_result:
+            return JSONResponse(content={"error": stage_result["error"]}, status_code=400)
+        ocr_result = stage_result["ocr"]
+        signature_spans = stage_result["signatures"]
+        spans_for_pii = stage_result["spans"]
+        pii_entities = stage_result["pii_entities"]
 
         # Optionally run LLM validation
         false_positives = []
+        llm_failed = False
         import logging
         if llm_api_key:
             try:
                 llm_validator = LLMValidator(api_key=llm_api_key)
                 validated_entities, false_positives = await llm_validator.validate_entities(
-                    pii_entities, " ".join([s.text for s in spans_for_pii]), detector
+                    pii_entities, " ".join([s.text for s in spans_for_pii]), ModelCache.get_pii_detector()
                 )
+                if llm_validator.failed_calls:
+                    logging.error(f"LLM validation failed for {llm_validator.failed_calls} entity(ies)")
+                    llm_failed = True
             except Exception as llm_error:
                 logging.error(f"LLM validation failed: {llm_error}")
                 validated_entities = pii_entities
+                llm_failed = True
         else:
             logging.warning("LLM validation skipped: GEMINI_API_KEY not set.")
             validated_entities = pii_entities
 
         # Convert DetectedEntity objects to dicts for JSON response
-        pii_data = [e.dict() for e in validated_entities]
+        pii_data = entity_dicts(validated_entities)
 
-        return JSONResponse(content={
+        response = CompactJSONResponse(content={
             "ocr": ocr_result,
             "signatures": signature_spans,
             "pii_detection": pii_data,
             "false_positives": false_positives
-        })
+        }, headers={"X-Cache": cache_status})
+        # Unvalidated fallbacks must not be served as the validated answer later
+        if cache_key is not None and not llm_failed:
+            cache.put(cache_key, response.body)
+        return response
+
+    except OverloadedError as e:
+        logger.warning(f"Rejecting {file.filename}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    except HTTPException:
+        raise
 
     except Exception as e:
-        if image_path and os.path.exists(image_path):
-            os.remove(image_path)
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        # Ensure temp file is always cleaned up
-        if image_path and os.path.exists(image_path):
-            os.remove(image_path)
+
+@app.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    file: UploadFile = File(...),
+    use_llm: bool = Form(False),
+    entities: Optional[str] = Form(None)
+):
+    """Queue a document for background processing and return its job id."""
+    validate_file(file)
+    entities_to_detect = parse_entities(entities)
+    file_bytes = await file.read()
+    if not file_bytes:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+
+    runner = get_job_runner()
+    job_id = runner.store.create(file_bytes, file.filename, use_llm, entities_to_detect)
+    runner.notify()
+    logger.info(f"Queued job {job_id} for {file.filename}")
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, per-page progress and, once completed, the AnalyzeResponse result."""
+    job = get_job_runner().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found")
+    return job
+
+
+@app.post("/process_document/stream")
+async def process_document_stream_api(file: UploadFile = File(...), entities: Optional[str] = Form(None)):
+    """Stream OCR, signature and PII results page by page as NDJSON.
+
+    Each line is one page's result, written as soon as that page is done;
+    the last line is ``{"done": true, ...}`` with document totals.
+    """
+    validate_file(file)
+    entities_to_detect = parse_entities(entities)
+    file_bytes = await file.read()
+    if not file_bytes:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+
+    # The stream occupies one inference slot for as long as it runs; each
+    # page is a separate task in the executor's pool
+    executor = get_executor()
+    try:
+        slot = executor.hold()
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    logger.info(f"Streaming document: {file.filename}")
+
+    async def ndjson_lines():
+        pages = 0
+        total_entities = 0
+        try:
+            total = await slot.run(stream_page_count, file_bytes, file.filename)
+            if isinstance(total, dict):
+                yield dumps_line(total)
+                return
+            for page_no in range(1, total + 1):
+                page = await slot.run(analyze_stream_page, file_bytes, file.filename, page_no, entities_to_detect)
+                yield dumps_line(page)
+                if "error" in page:
+                    return
+                pages += 1
+                total_entities += len(page["pii_detection"])
+            yield dumps_line({"done": True, "pages": pages, "total_entities": total_entities})
+        finally:
+            slot.release()
+
+    return SlotStreamingResponse(ndjson_lines(), slot, media_type="application/x-ndjson")
+
+
+@app.post("/process_documents/batch")
+async def process_documents_batch_api(files: List[UploadFile] = File(...), entities: Optional[str] = Form(None)):
+    """Process many documents in one request with batched OCR and YOLO calls.
+
+    Returns one result per file, in upload order; errors are reported per
+    file and do not fail the rest of the batch.
+    """
+    if len(files) > settings.batch_max_files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files: {len(files)} (max {settings.batch_max_files})"
+        )
+    entities_to_detect = parse_entities(entities)
+
+    results = [None] * len(files)
+    batch = []
+    positions = []
+    for i, file in enumerate(files):
+        try:
+            validate_file(file)
+        except HTTPException as e:
+            results[i] = {"filename": file.filename, "error": e.detail}
+            continue
+        file_bytes = await file.read()
+        if not file_bytes:
+            results[i] = {"filename": file.filename, "error": "Uploaded file is empty."}
+            continue
+        batch.append((file_bytes, file.filename))
+        positions.append(i)
+
+    logger.info(f"Processing batch of {len(batch)} document(s)")
+    if batch:
+        try:
+            batch_results = await get_executor().run(analyze_batch, batch, entities_to_detect)
+        except OverloadedError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        for i, result in zip(positions, batch_results):
+            results[i] = result
+
+    return CompactJSONResponse(content={"results": results})
@@ -0,0 +1,7 @@
+"""
+Reproducible performance benchmarks.
+
+``python -m benchmarks.run`` generates synthetic ID and medical documents,
+times every pipeline stage and writes the results to a JSON file that can be
+compared against a previous run with ``--compare``.
+"""
@@ -0,0 +1,143 @@
+"""
+Micro-benchmark: rule-based pattern detection per text.
+
+Compares the original approach (stock Presidio ``PatternRecognizer`` per ID
+type, then ``re.finditer`` per healthcare pattern with the pattern lists
+rebuilt on every call) against the shared precompiled ``patterns.SCANNER``.
+Both must produce identical matches; the script checks that before timing.
+
+    python -m benchmarks.patterns --iterations 20
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+from typing import Dict, List
+
+from benchmarks.synthetic import default_corpus
+from pii_detection.page_text import PageText
+
+
+def legacy_healthcare_patterns(text: str) -> List[Dict]:
+    """``PIIDetector._detect_healthcare_patterns`` before the shared scanner."""
+    results = []
+    mrn_patterns = [
+        r'\b(?:MRN|Medical Record|Patient ID|Chart #):\s*([A-Z0-9-]{6,15})',
+        r'\b([A-Z]{2,3}\d{6,10})\b',
+    ]
+    insurance_patterns = [
+        r'\b(?:Insurance|Policy):\s*([A-Z0-9-]{8,20})',
+        r'\b([A-Z]{3}\d{6,12})\b',
+    ]
+    condition_keywords = [
+        r'\b(?:diagnosed with|suffers from|condition:|history of)\s+([A-Za-z\s,]+?)(?:\.|,|$|\s+and|\s+or)',
+        r'\b(diabetes(?:\s+mellitus)?(?:\s+type\s+\d+)?|hypertension|asthma|cancer|depression|anxiety|arthritis)\b',
+    ]
+    medication_patterns = [
+        r'\b(?:prescribed|taking|medication:|drug:)\s+([A-Za-z\s]{3,30})',
+        r'\b(aspirin|ibuprofen|metformin|lisinopril|atorvastatin)\b',
+    ]
+    pattern_configs = [
+        (mrn_patterns, "MEDICAL_RECORD_NUMBER"),
+        (insurance_patterns, "INSURANCE_NUMBER"),
+        (condition_keywords, "MEDICAL_CONDITION"),
+        (medication_patterns, "MEDICATION"),
+    ]
+    for patterns, entity_type in pattern_configs:
+        for pattern in patterns:
+            for match in re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE):
+                start, end = match.span(1) if match.groups() else match.span()
+                results.append({
+                    "entity_type": entity_type,
+                    "start": start,
+                    "end": end,
+                    "score": 0.8,
+                    "text": match.group(1) if match.groups() else match.group(0)
+                })
+    return results
+
+
+def legacy_recognizers():
+    from presidio_analyzer import PatternRecognizer
+    from pii_detection.indian_recognizers import AadhaarRecognizer, IndianPhoneRecognizer, PANRecognizer
+
+    return [
+        PatternRecognizer(supported_entity=entity, patterns=list(cls.PATTERNS), context=cls.CONTEXT)
+        for entity, cls in (("AADHAAR", AadhaarRecognizer), ("PAN", PANRecognizer), ("PHONE", IndianPhoneRecognizer))
+    ]
+
+
+def scanned_recognizers():
+    from pii_detection.indian_recognizers import AadhaarRecognizer, IndianPhoneRecognizer, PANRecognizer
+
+    return [AadhaarRecognizer(), PANRecognizer(), IndianPhoneRecognizer()]
+
+
+def run_rules(recognizers, healthcare, texts):
+    out = []
+    for text in texts:
+        ids = [(r.entity_type, r.start, r.end, r.score) for recognizer in recognizers for r in recognizer.analyze(text, [])]
+        out.append((sorted(ids), healthcare(text)))
+    return out
+
+
+def time_variant(recognizers, healthcare, texts, iterations: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run_rules(recognizers, healthcare, texts)
+        samples.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(samples) * 1000, 3), "min_ms": round(min(samples) * 1000, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare legacy per-pattern loops with the shared pattern scanner.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    from pii_detection.detector import PIIDetector
+    from pii_detection.models import TextSpan
+
+    # Only the healthcare method is needed; skip loading any models
+    detector = PIIDetector.__new__(PIIDetector)
+    # Every OCR line of the corpus on its own, and each page joined as in page mode
+    span_texts, page_texts = [], []
+    for document in default_corpus():
+        for page_no, lines in enumerate(document.pages, start=1):
+            spans = [
+                TextSpan(
+                    span_id=f"block_{i}", text=text, page_no=page_no,
+                    bbox={"x1": corners[0][0], "y1": corners[0][1], "x2": corners[2][0], "y2": corners[2][1]},
+                )
+                for i, (corners, text, confidence) in enumerate(lines)
+            ]
+            span_texts.extend(span.text for span in spans)
+            page_texts.append(PageText(page_no, spans).text)
+    workloads = {"spans": span_texts, "pages": page_texts}
+
+    legacy = (legacy_recognizers(), legacy_healthcare_patterns)
+    scanned = (scanned_recognizers(), detector._detect_healthcare_patterns)
+    report = {}
+    for name, texts in workloads.items():
+        if run_rules(*legacy, texts) != run_rules(*scanned, texts):
+            raise SystemExit(f"Scanner results differ from the legacy patterns on {name}")
+        before = time_variant(*legacy, texts, args.iterations)
+        after = time_variant(*scanned, texts, args.iterations)
+        report[name] = {
+            "texts": len(texts),
+            "legacy": before,
+            "scanner": after,
+            "speedup": round(before["median_ms"] / after["median_ms"], 2) if after["median_ms"] else None,
+        }
+        print(f"{name:<6} {len(texts):>5} texts  legacy {before['median_ms']:8.2f} ms  "
+              f"scanner {after['median_ms']:8.2f} ms  x{report[name]['speedup']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark: page normalization at different target sizes.
+
+Each synthetic page is turned into a "phone photo" (upscaled to about
+20 megapixels, rotated a few degrees, on a dark background), then
+normalized at every ``--long-edges`` target, with and without crop, deskew
+and grayscale. Reported per setting:
+
+* preprocessing time and the pixels left for OCR and YOLO;
+* with ``--real-models``, EasyOCR time on the normalized page and accuracy
+  against the drawn lines after mapping the boxes back: text similarity
+  (difflib ratio) and mean IoU of each line's box with its best match.
+
+Without ``--real-models`` no OCR runs, so only the cost side is measured.
+
+    python -m benchmarks.preprocess --long-edges 0 3200 2560 1920 1280 --real-models
+"""
+import argparse
+import difflib
+import json
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SyntheticDocument, default_corpus
+
+PHOTO_SCALE = 2.5
+PHOTO_SKEW = 3.0
+PHOTO_BORDER = 400
+
+
+def phone_photo(document: SyntheticDocument) -> Tuple[np.ndarray, List[Tuple[np.ndarray, str]]]:
+    """The document's first page as a large skewed photo, with each line's corners in photo coordinates."""
+    page = cv2.imdecode(np.frombuffer(document.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    big = cv2.resize(page, None, fx=PHOTO_SCALE, fy=PHOTO_SCALE, interpolation=cv2.INTER_CUBIC)
+    height, width = big.shape[:2]
+    canvas = np.full((height + 2 * PHOTO_BORDER, width + 2 * PHOTO_BORDER, 3), 40, dtype=np.uint8)
+    canvas[PHOTO_BORDER:PHOTO_BORDER + height, PHOTO_BORDER:PHOTO_BORDER + width] = big
+    center = (canvas.shape[1] / 2, canvas.shape[0] / 2)
+    rotation = cv2.getRotationMatrix2D(center, PHOTO_SKEW, 1.0)
+    photo = cv2.warpAffine(canvas, rotation, (canvas.shape[1], canvas.shape[0]), borderValue=(40, 40, 40))
+    to_photo = np.vstack([rotation, [0.0, 0.0, 1.0]]) @ np.array(
+        [[PHOTO_SCALE, 0.0, PHOTO_BORDER], [0.0, PHOTO_SCALE, PHOTO_BORDER], [0.0, 0.0, 1.0]]
+    )
+    lines = []
+    for corners, text, _ in document.pages[0]:
+        points = np.c_[np.asarray(corners, dtype=np.float64), np.ones(4)] @ to_photo.T
+        lines.append((points[:, :2], text))
+    return photo, lines
+
+
+def _box(points) -> Tuple[float, float, float, float]:
+    points = np.asarray(points, dtype=np.float64)
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+
+def _iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def accuracy(lines, detections) -> Dict[str, float]:
+    """Text similarity of all lines read, and mean IoU of each drawn line with its best detection."""
+    expected = " ".join(text for _, text in lines)
+    ordered = sorted(detections, key=lambda d: (_box(d[0])[1], _box(d[0])[0]))
+    read = " ".join(str(text) for _, text, _ in ordered)
+    boxes = [_box(corners) for corners, _, _ in detections]
+    ious = [max((_iou(_box(points), box) for box in boxes), default=0.0) for points, _ in lines]
+    return {
+        "text_similarity": round(difflib.SequenceMatcher(None, expected, read).ratio(), 4),
+        "box_iou": round(statistics.mean(ious), 4) if ious else 0.0,
+    }
+
+
+def settings_grid(long_edges: List[int]) -> List[Dict]:
+    grid = []
+    for edge in long_edges:
+        grid.append({"preprocess_max_long_edge": edge})
+        grid.append({"preprocess_max_long_edge": edge, "preprocess_crop": True, "preprocess_deskew": True})
+        grid.append({
+            "preprocess_max_long_edge": edge, "preprocess_crop": True, "preprocess_deskew": True,
+            "preprocess_grayscale": True,
+        })
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latency and accuracy of page normalization at different target sizes.")
+    parser.add_argument("--long-edges", type=int, nargs="+", default=[0, 3200, 2560, 1920, 1280])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--real-models", action="store_true", help="Run EasyOCR on each normalized page")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    from config.settings import settings
+    from ocr.images import to_rgb
+    from ocr.preprocess import _normalize, map_detections
+
+    reader = None
+    if args.real_models:
+        import easyocr
+        reader = easyocr.Reader(["en"], gpu=settings.ocr_gpu_enabled)
+
+    photos = [(document.name, *phone_photo(document)) for document in default_corpus() if not document.filename.endswith(".pdf")]
+    defaults = {
+        "preprocess_max_long_edge": 0, "preprocess_crop": False, "preprocess_deskew": False,
+        "preprocess_grayscale": False, "preprocess_target_text_height": 0,
+    }
+    saved = {name: getattr(settings, name) for name in defaults}
+    report = []
+    try:
+        for overrides in settings_grid(args.long_edges):
+            for name, value in {**defaults, **overrides}.items():
+                setattr(settings, name, value)
+            row = {"settings": overrides, "documents": {}}
+            for name, photo, lines in photos:
+                samples = []
+                for _ in range(args.iterations):
+                    started = time.perf_counter()
+                    processed, to_original = _normalize(photo)
+                    samples.append(time.perf_counter() - started)
+                entry = {
+                    "preprocess_ms": round(statistics.median(samples) * 1000, 1),
+                    "megapixels": round(processed.shape[0] * processed.shape[1] / 1e6, 2),
+                }
+                # The drawn lines, as a perfect reader would see them on the
+                # normalized page, must map back onto themselves
+                to_processed = np.linalg.inv(np.vstack([to_original, [0.0, 0.0, 1.0]])) if to_original is not None else np.eye(3)
+                seen = [((np.c_[points, np.ones(4)] @ to_processed.T)[:, :2].tolist(), text, 1.0) for points, text in lines]
+                if accuracy(lines, map_detections(to_original, seen))["box_iou"] < 0.999:
+                    raise SystemExit(f"Boxes do not map back to the original page for {name} with {overrides}")
+                if reader is not None:
+                    started = time.perf_counter()
+                    detections = reader.readtext(to_rgb(processed), detail=1)
+                    entry["ocr_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    entry.update(accuracy(lines, map_detections(to_original, detections)))
+                row["documents"][name] = entry
+                print(f"{name:<15} {json.dumps(overrides):<100} " + "  ".join(f"{k} {v}" for k, v in entry.items()))
+            report.append(row)
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
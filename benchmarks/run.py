@@ -0,0 +1,215 @@
+"""
+Time every pipeline stage over a seeded synthetic corpus.
+
+    python -m benchmarks.run                      # stubbed OCR and YOLO
+    python -m benchmarks.run --real-models        # real EasyOCR and YOLO
+    python -m benchmarks.run --stub-nlp           # blank spaCy, no NER model needed
+    python -m benchmarks.run --compare benchmarks/results/abc1234.json
+
+Results (per document and stage: min/median/mean/p95/max in milliseconds)
+are written to ``benchmarks/results/<commit>.json`` unless ``--output`` is
+given.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks import stubs
+from benchmarks.synthetic import SyntheticDocument, default_corpus
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ["decode", "ocr", "signatures", "spans", "pii", "masking", "serialization", "end_to_end"]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True
+        ).stdout
+        return f"{commit}-dirty" if dirty.strip() else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _serialize(ocr_result, signatures, entities) -> bytes:
+    from pipeline.serialization import dumps_compact, entity_dicts
+    return dumps_compact({
+        "ocr": ocr_result,
+        "signatures": signatures,
+        "pii_detection": entity_dicts(entities),
+        "false_positives": [],
+    })
+
+
+def run_once(document: SyntheticDocument) -> Dict[str, Any]:
+    """Run each stage once for ``document``; returns seconds per stage plus sizes."""
+    from ocr.images import decode_document, is_pdf
+    from ocr.processor import PAGE_LIMIT, process_images
+    from performance_cache import ModelCache
+    from pii_detection.models import EntityType
+    from pipeline.stages import analyze_document, build_pii_spans, detect_signatures
+
+    detector = ModelCache.get_pii_detector()
+    entity_types = [e.value for e in EntityType]
+    timings: Dict[str, float] = {}
+
+    def timed(stage, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[stage] = time.perf_counter() - started
+        return result
+
+    stubs.expect(document)
+    pages = timed("decode", decode_document, document.data, document.filename, PAGE_LIMIT)
+    ocr_result = timed("ocr", process_images, pages, pdf=is_pdf(document.filename, document.data))
+    if "error" in ocr_result:
+        raise RuntimeError(ocr_result["error"])
+    signatures = timed("signatures", detect_signatures, pages)
+    spans = timed("spans", build_pii_spans, ocr_result, signatures)
+    entities = timed("pii", detector.detect_entities, spans, entity_types)
+    timed("masking", lambda: [detector._mask_value(e.value, e.type.value) for e in entities])
+    timed("serialization", _serialize, ocr_result, signatures, entities)
+
+    stubs.expect(document)
+    started = time.perf_counter()
+    result = analyze_document(document.data, document.filename)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    _serialize(result["ocr"], result["signatures"], result["pii_entities"])
+    timings["end_to_end"] = time.perf_counter() - started
+
+    return {"timings": timings, "pages": len(pages), "spans": len(spans), "entities": len(entities)}
+
+
+def benchmark_document(document: SyntheticDocument, iterations: int, warmup: int) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    sizes: Dict[str, int] = {}
+    for i in range(warmup + iterations):
+        run = run_once(document)
+        if i < warmup:
+            continue
+        for stage, seconds in run["timings"].items():
+            samples[stage].append(seconds)
+        sizes = {"pages": run["pages"], "spans": run["spans"], "entities": run["entities"]}
+    return {
+        "filename": document.filename,
+        "bytes": len(document.data),
+        **sizes,
+        "stages": {stage: summarize(values) for stage, values in samples.items() if values},
+    }
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Format median changes per document and stage against an earlier run."""
+    lines = [f"{'document':<24}{'stage':<15}{'before ms':>12}{'after ms':>12}{'change':>9}"]
+    for name, doc in current["documents"].items():
+        before_doc = previous.get("documents", {}).get(name, {})
+        for stage, stats in doc.get("stages", {}).items():
+            before = before_doc.get("stages", {}).get(stage)
+            if not before:
+                continue
+            old, new = before["median_ms"], stats["median_ms"]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            lines.append(f"{name:<24}{stage:<15}{old:>12.3f}{new:>12.3f}{change:>9}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the OCR/PII pipeline on synthetic documents.")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--documents", nargs="*", help="Only run these documents (by name)")
+    parser.add_argument("--real-models", action="store_true", help="Use real EasyOCR and YOLO instead of stand-ins")
+    parser.add_argument("--stub-nlp", action="store_true", help="Use a blank spaCy pipeline (no NER model download)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare medians against")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output while timing")
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        # Presidio warns once per span about entity types it has no recognizer for
+        logging.getLogger("presidio-analyzer").setLevel(logging.ERROR)
+
+    from performance_cache import ModelCache
+
+    stubbed = stubs.install(ocr=not args.real_models, yolo=not args.real_models, nlp=args.stub_nlp)
+    started = time.perf_counter()
+    if args.real_models:
+        ModelCache.load_easyocr()
+        ModelCache.load_yolo()
+    ModelCache.load_pii_detector()
+    load_seconds = time.perf_counter() - started
+
+    corpus = [d for d in default_corpus(args.seed) if not args.documents or d.name in args.documents]
+    commit = _git_commit()
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "stubbed_models": stubbed,
+            "model_versions": ModelCache.versions(),
+            "model_load_seconds": round(load_seconds, 3),
+        },
+        "documents": {},
+    }
+
+    for document in corpus:
+        print(f"Benchmarking {document.name} ({len(document.pages)} page(s))...", file=sys.stderr)
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        try:
+            with output:
+                report["documents"][document.name] = benchmark_document(document, args.iterations, args.warmup)
+        except Exception as e:
+            # e.g. PDF rasterization without poppler installed
+            print(f"  skipped: {e}", file=sys.stderr)
+            report["documents"][document.name] = {"filename": document.filename, "error": str(e)}
+
+    output_path = args.output or os.path.join(REPO_ROOT, "benchmarks", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output_path}", file=sys.stderr)
+
+    for name, doc in report["documents"].items():
+        if "stages" in doc:
+            summary = ", ".join(f"{stage} {stats['median_ms']:.1f}" for stage, stats in doc["stages"].items())
+            print(f"{name}: {summary} (median ms)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark: building entities and serializing the response.
+
+Compares the original path (a validated ``DetectedEntity`` per detection,
+``e.dict()`` per entity and Starlette's ``JSONResponse`` rendering) against
+``DetectedEntity.model_construct``, ``serialization.entity_dicts`` and the
+shared compact encoder. Both must produce the same response bytes; the
+script checks that before timing.
+
+    python -m benchmarks.serialization --iterations 20
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.synthetic import default_corpus
+
+
+def legacy_map_entity_type(entity_type: str) -> str:
+    """``PIIDetector._map_entity_type`` before the precomputed table."""
+    from pii_detection.models import EntityType
+
+    mapping = {
+        "PERSON": "NAME",
+        "ORG": "ADDRESS",
+        "GPE": "ADDRESS",
+        "LOC": "ADDRESS",
+        "DATE": "DATE",
+        "CARDINAL": "MEDICAL_RECORD_NUMBER",
+        "QUANTITY": "MEDICAL_RECORD_NUMBER",
+    }
+    valid_types = [e.value for e in EntityType]
+    if entity_type in valid_types:
+        return entity_type
+    return mapping.get(entity_type)
+
+
+def detections() -> List[Tuple]:
+    """One detection per OCR line of the corpus, cycling through raw labels."""
+    from pii_detection.models import BBox
+
+    labels = ["AADHAAR", "PERSON", "PHONE", "CARDINAL", "DATE_OF_BIRTH", "MEDICAL_RECORD_NUMBER", "GPE", "PAN"]
+    out = []
+    for document in default_corpus():
+        for page_no, lines in enumerate(document.pages, start=1):
+            for i, (corners, text, confidence) in enumerate(lines):
+                bbox = BBox(x1=corners[0][0], y1=corners[0][1], x2=corners[2][0], y2=corners[2][1])
+                label = labels[len(out) % len(labels)]
+                method = "rule" if label in ("AADHAAR", "PHONE", "PAN") else "ner"
+                out.append((label, text, round(0.5 + confidence / 2, 4), method, page_no, bbox, f"block_{i}"))
+    return out
+
+
+def legacy_body(items: List[Tuple]) -> bytes:
+    from fastapi.responses import JSONResponse
+    from pii_detection.models import DetectedEntity, EntityType
+
+    entities = []
+    for label, text, score, method, page_no, bbox, span_id in items:
+        entity_type = legacy_map_entity_type(label)
+        entities.append(DetectedEntity(
+            type=EntityType(entity_type), value=text, redacted_value="*" * len(text), confidence=score,
+            method=method, page_no=page_no, bbox=bbox, source_span_ids=[span_id], language="en",
+            validations={"regex_match": True, "context_score": score},
+        ))
+    return JSONResponse(content={
+        "pii_detection": [e.dict() for e in entities],
+        "false_positives": [],
+    }).body
+
+
+def constructed_body(items: List[Tuple]) -> bytes:
+    from pii_detection.detector import ENTITY_TYPE_MAP
+    from pii_detection.models import DetectedEntity, EntityType
+    from pipeline.serialization import dumps_compact, entity_dicts
+
+    entities = []
+    for label, text, score, method, page_no, bbox, span_id in items:
+        entity_type = ENTITY_TYPE_MAP.get(label)
+        entities.append(DetectedEntity.model_construct(
+            type=EntityType(entity_type), value=text, redacted_value="*" * len(text), confidence=float(score),
+            method=method, page_no=page_no, bbox=bbox, source_span_ids=[span_id], language="en",
+            validations={"regex_match": True, "context_score": score},
+        ))
+    return dumps_compact({
+        "pii_detection": entity_dicts(entities),
+        "false_positives": [],
+    })
+
+
+def time_variant(build, items, iterations: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        build(items)
+        samples.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(samples) * 1000, 3), "min_ms": round(min(samples) * 1000, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare validated models + e.dict() with constructed entities + the shared encoder.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=20, help="Repeat the corpus detections this many times")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    items = detections() * args.scale
+    if legacy_body(items) != constructed_body(items):
+        raise SystemExit("Constructed response differs from the legacy serialization")
+    before = time_variant(legacy_body, items, args.iterations)
+    after = time_variant(constructed_body, items, args.iterations)
+    report = {
+        "entities": len(items),
+        "legacy": before,
+        "constructed": after,
+        "speedup": round(before["median_ms"] / after["median_ms"], 2) if after["median_ms"] else None,
+    }
+    print(f"{len(items):>6} entities  legacy {before['median_ms']:8.2f} ms  "
+          f"constructed {after['median_ms']:8.2f} ms  x{report['speedup']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Lightweight stand-ins for the heavy models, for benchmarks that should time
+the pipeline around a model rather than the model itself.
+
+``install`` places them in ``ModelCache`` so every stage picks them up
+through the usual accessors.
+"""
+from collections import deque
+from typing import List
+
+from benchmarks.synthetic import SyntheticDocument
+
+
+def _scaled(lines, sx: float, sy: float):
+    return [([[x * sx, y * sy] for x, y in corners], text, conf) for corners, text, conf in lines]
+
+
+class StubReader:
+    """Returns the lines drawn on each synthetic page instead of running OCR.
+
+    ``expect(document)`` queues the document's pages; each ``readtext`` call
+    consumes one page, scaling boxes to the size the page was decoded at.
+    """
+
+    def __init__(self):
+        self._pages = deque()
+        self._page_size = (1, 1)
+
+    def expect(self, document: SyntheticDocument):
+        self._pages = deque(document.pages)
+        self._page_size = document.page_size
+
+    def readtext(self, image, detail=1, **kwargs):
+        if not self._pages:
+            return []
+        height, width = image.shape[:2]
+        return _scaled(self._pages.popleft(), width / self._page_size[0], height / self._page_size[1])
+
+    def readtext_batched(self, images, detail=1, **kwargs):
+        return [self.readtext(image, detail=detail) for image in images]
+
+
+class _Tensor(list):
+    def tolist(self):
+        return list(self)
+
+
+class _Box:
+    def __init__(self, xyxy, conf):
+        self.xyxy = [_Tensor(xyxy)]
+        self.conf = [conf]
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubYolo:
+    """Reports one signature box in the bottom-right corner of every page."""
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        results = []
+        for image in images:
+            height, width = image.shape[:2]
+            box = [width * 0.7, height * 0.85, width * 0.95, height * 0.95]
+            results.append(_Result([_Box(box, 0.85)]))
+        return results
+
+
+def blank_nlp():
+    """A tokenizer-only English pipeline: no NER, but no model download either."""
+    import spacy
+    nlp = spacy.blank("en")
+    nlp.meta["name"] = "blank_en"
+    return nlp
+
+
+def install(ocr: bool = True, yolo: bool = True, nlp: bool = False) -> List[str]:
+    """Swap the selected models in ``ModelCache`` for stand-ins; returns their names."""
+    from performance_cache import ModelCache
+
+    installed = []
+    if ocr:
+        ModelCache.easyocr_reader = StubReader()
+        installed.append("easyocr")
+    if yolo:
+        ModelCache.yolo_model = StubYolo()
+        ModelCache.yolo_model_path = None
+        installed.append("yolo")
+    if nlp:
+        # Presidio is rebuilt on top of whatever spaCy pipeline is cached
+        ModelCache.spacy_nlp = blank_nlp()
+        ModelCache.presidio_analyzer = None
+        ModelCache.pii_detector = None
+        installed.extend(["spacy", "presidio"])
+    return installed
+
+
+def expect(document: SyntheticDocument):
+    """Tell the stub reader (if installed) which document is about to be OCRed."""
+    from performance_cache import ModelCache
+
+    reader = ModelCache.easyocr_reader
+    if isinstance(reader, StubReader):
+        reader.expect(document)
@@ -0,0 +1,208 @@
+"""
+Synthetic documents for benchmarking.
+
+Each generator draws a document with PIL and returns a ``SyntheticDocument``
+holding the encoded file plus the text and pixel box of every line drawn on
+each page, so a stand-in OCR reader can return exactly what a real one would
+read. Generation is seeded and therefore identical between runs.
+"""
+import io
+import random
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+CARD_SIZE = (1012, 638)
+
+# (corners, text, confidence) in EasyOCR ``readtext(detail=1)`` order
+Line = Tuple[List[List[float]], str, float]
+
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8],
+    [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2],
+    [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 3, 1, 2, 6, 8, 7, 0],
+    [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5],
+    [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+]
+_VERHOEFF_INV = [0, 4, 3, 2, 1, 5, 6, 7, 8, 9]
+
+_FIRST_NAMES = ["Ravi", "Priya", "Anil", "Sunita", "Arjun", "Meera", "Vikram", "Lakshmi"]
+_LAST_NAMES = ["Kumar", "Sharma", "Patel", "Iyer", "Reddy", "Singh", "Nair", "Gupta"]
+_CITIES = ["Mumbai", "Bengaluru", "Chennai", "Pune", "Hyderabad", "Kolkata"]
+_CONDITIONS = ["diabetes", "hypertension", "asthma", "arthritis"]
+_MEDICATIONS = ["metformin", "lisinopril", "atorvastatin", "aspirin"]
+
+
+@dataclass
+class SyntheticDocument:
+    name: str
+    filename: str
+    data: bytes
+    page_size: Tuple[int, int]
+    pages: List[List[Line]] = field(default_factory=list)
+
+
+def _font(size: int):
+    for name in ("DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def aadhaar_number(rng: random.Random) -> str:
+    """A 12-digit number with a valid Verhoeff check digit, grouped 4-4-4."""
+    digits = [rng.randint(2, 9)] + [rng.randint(0, 9) for _ in range(10)]
+    check = 0
+    for i, d in enumerate(reversed(digits)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[(i + 1) % 8][d]]
+    digits.append(_VERHOEFF_INV[check])
+    number = "".join(map(str, digits))
+    return f"{number[:4]} {number[4:8]} {number[8:]}"
+
+
+def pan_number(rng: random.Random) -> str:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return (
+        "".join(rng.choice(letters) for _ in range(3))
+        + rng.choice("PCHFATBLJG")
+        + rng.choice(letters)
+        + f"{rng.randint(0, 9999):04d}"
+        + rng.choice(letters)
+    )
+
+
+def phone_number(rng: random.Random) -> str:
+    return f"+91 {rng.randint(6, 9)}{rng.randint(0, 999999999):09d}"
+
+
+def mrn(rng: random.Random) -> str:
+    return f"{rng.choice(['MR', 'HX', 'PT'])}{rng.randint(0, 99999999):08d}"
+
+
+def person_name(rng: random.Random) -> str:
+    return f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+
+
+def _draw_page(size, texts: List[str], font_size: int, signature: bool = True):
+    """Draw ``texts`` one per line and return ``(image, lines)``."""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    font = _font(font_size)
+    margin = size[0] // 16
+    y = margin
+    lines: List[Line] = []
+    for text in texts:
+        x1, y1, x2, y2 = draw.textbbox((margin, y), text, font=font)
+        draw.text((margin, y), text, fill="black", font=font)
+        corners = [[float(x1), float(y1)], [float(x2), float(y1)], [float(x2), float(y2)], [float(x1), float(y2)]]
+        lines.append((corners, text, 0.95))
+        y = y2 + font_size
+    if signature:
+        # A scribble where the signature detector is expected to fire
+        sx, sy = size[0] - margin - size[0] // 4, size[1] - margin - size[1] // 10
+        points = [(sx + i * 12, sy + (18 if i % 2 else -18)) for i in range(size[0] // 48)]
+        draw.line(points, fill="black", width=3)
+    return image, lines
+
+
+def _encode(images, filename: str) -> bytes:
+    buffer = io.BytesIO()
+    if filename.endswith(".pdf"):
+        images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:], resolution=150)
+    else:
+        images[0].save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def aadhaar_card(seed: int = 0) -> SyntheticDocument:
+    rng = random.Random(seed)
+    texts = [
+        "GOVERNMENT OF INDIA",
+        person_name(rng),
+        f"DOB: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2005)}",
+        rng.choice(["Male", "Female"]),
+        f"Aadhaar {aadhaar_number(rng)}",
+        f"Mobile {phone_number(rng)}",
+    ]
+    image, lines = _draw_page(CARD_SIZE, texts, 36)
+    return SyntheticDocument("aadhaar_card", "aadhaar.png", _encode([image], "aadhaar.png"), CARD_SIZE, [lines])
+
+
+def pan_card(seed: int = 0) -> SyntheticDocument:
+    rng = random.Random(seed + 1)
+    texts = [
+        "INCOME TAX DEPARTMENT",
+        person_name(rng),
+        f"Father: {person_name(rng)}",
+        f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2005)}",
+        "Permanent Account Number",
+        pan_number(rng),
+    ]
+    image, lines = _draw_page(CARD_SIZE, texts, 36)
+    return SyntheticDocument("pan_card", "pan.png", _encode([image], "pan.png"), CARD_SIZE, [lines])
+
+
+def _medical_texts(rng: random.Random, lines_per_page: int) -> List[str]:
+    texts = [
+        "CITY HOSPITAL - DISCHARGE SUMMARY",
+        f"Patient: {person_name(rng)}",
+        f"MRN: {mrn(rng)}",
+        f"Contact: {phone_number(rng)}",
+        f"Address: {rng.randint(1, 200)} MG Road, {rng.choice(_CITIES)}",
+        f"Insurance: INS{rng.randint(0, 999999999):09d}",
+    ]
+    while len(texts) < lines_per_page:
+        texts.append(rng.choice([
+            f"Patient was diagnosed with {rng.choice(_CONDITIONS)}.",
+            f"Prescribed {rng.choice(_MEDICATIONS)} twice daily.",
+            f"History of {rng.choice(_CONDITIONS)} and {rng.choice(_CONDITIONS)}.",
+            f"Follow up on {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2026 with Dr {person_name(rng)}.",
+            "Vitals stable, no acute distress observed during the visit.",
+            f"Emergency contact {person_name(rng)} {phone_number(rng)}",
+        ]))
+    return texts
+
+
+def medical_record(seed: int = 0, lines: int = 30) -> SyntheticDocument:
+    rng = random.Random(seed + 2)
+    image, page_lines = _draw_page(PAGE_SIZE, _medical_texts(rng, lines), 28)
+    return SyntheticDocument("medical_record", "medical.png", _encode([image], "medical.png"), PAGE_SIZE, [page_lines])
+
+
+def multipage_pdf(seed: int = 0, pages: int = 5, lines: int = 30) -> SyntheticDocument:
+    rng = random.Random(seed + 3)
+    images, all_lines = [], []
+    for _ in range(pages):
+        image, page_lines = _draw_page(PAGE_SIZE, _medical_texts(rng, lines), 28)
+        images.append(image)
+        all_lines.append(page_lines)
+    filename = f"medical_{pages}p.pdf"
+    return SyntheticDocument(f"multipage_pdf_{pages}p", filename, _encode(images, filename), PAGE_SIZE, all_lines)
+
+
+def default_corpus(seed: int = 0) -> List[SyntheticDocument]:
+    return [
+        aadhaar_card(seed),
+        pan_card(seed),
+        medical_record(seed),
+        multipage_pdf(seed, pages=5),
+    ]
@@ -0,0 +1,139 @@
+"""
+Prometheus metrics for the processing pipeline.
+
+Stage timings are recorded with ``stage_timer`` and exposed at ``/metrics``.
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (the pre-fork serving mode sets it,
+and it should be set when running several uvicorn workers) every process
+writes its samples there and ``/metrics`` aggregates all of them.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import psutil
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_DURATION = Histogram(
+    "pii_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUEST_DURATION = Histogram(
+    "pii_request_duration_seconds",
+    "Time from request start until the response is fully sent, per endpoint",
+    ["endpoint"],
+    buckets=_LATENCY_BUCKETS,
+)
+DOCUMENT_PAGES = Histogram(
+    "pii_document_pages",
+    "Pages per processed document",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+DOCUMENT_SPANS = Histogram(
+    "pii_document_spans",
+    "Text spans passed to PII detection per document",
+    buckets=(0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+DOCUMENT_ENTITIES = Histogram(
+    "pii_document_entities",
+    "PII entities detected per document",
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+ERRORS = Counter("pii_errors_total", "Errors by stage", ["stage"])
+CACHE_REQUESTS = Counter("pii_result_cache_requests_total", "Result cache lookups by outcome", ["result"])
+PREFILTER_SKIPPED = Counter(
+    "pii_prefilter_skipped_total",
+    "Detector calls the span pre-filter avoided",
+    ["detector"],
+)
+ID_VALIDATIONS = Counter(
+    "pii_id_validations_total",
+    "Aadhaar/PAN/phone candidates by checksum and structure verdict",
+    ["verdict"],
+)
+PAGE_SOURCES = Counter("pii_pages_total", "Document pages by text source (text_layer or ocr)", ["source"])
+LLM_CALLS = Counter("pii_llm_calls_total", "Gemini validation calls by outcome", ["outcome"])
+IN_FLIGHT = Gauge(
+    "pii_requests_in_flight",
+    "Requests currently being processed",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+PROCESS_RSS = Gauge(
+    "pii_process_resident_memory_bytes",
+    "Resident set size of the serving process",
+    multiprocess_mode="liveall",
+)
+
+_process = psutil.Process()
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block as ``stage``; exceptions also count as errors for it."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_DURATION.labels(stage).observe(time.perf_counter() - started)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a duration measured elsewhere (e.g. summed over many spans)."""
+    STAGE_DURATION.labels(stage).observe(seconds)
+
+
+def observe_request(endpoint: str, seconds: float):
+    REQUEST_DURATION.labels(endpoint).observe(seconds)
+
+
+def observe_document(pages: int, spans: int, entities: int):
+    DOCUMENT_PAGES.observe(pages)
+    DOCUMENT_SPANS.observe(spans)
+    DOCUMENT_ENTITIES.observe(entities)
+
+
+def observe_skipped(skipped: dict):
+    """Add per-detector counts of calls the pre-filter avoided."""
+    for detector, count in skipped.items():
+        if count:
+            PREFILTER_SKIPPED.labels(detector).inc(count)
+
+
+def observe_validations(verdicts: dict):
+    """Add counts of ID candidates per validator verdict."""
+    for verdict, count in verdicts.items():
+        if count:
+            ID_VALIDATIONS.labels(verdict).inc(count)
+
+
+def update_process_memory():
+    PROCESS_RSS.set(_process.memory_info().rss)
+
+
+def render_metrics():
+    """Return ``(body, content_type)`` for the ``/metrics`` endpoint."""
+    update_process_memory()
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
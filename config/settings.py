@@ -21,18 +21,76 @@ class Settings(BaseSettings):
     allowed_extensions: List[str] = Field(default=["jpg", "jpeg", "png", "pdf"], env="ALLOWED_EXTENSIONS")
     request_timeout: int = Field(default=60, env="REQUEST_TIMEOUT")
     
+    # Inference Executor Configuration
+    serving_mode: str = Field(default="threads", env="SERVING_MODE")  # "threads" or "prefork"
+    inference_workers: int = Field(default=2, env="INFERENCE_WORKERS")
+    inference_queue_depth: int = Field(default=8, env="INFERENCE_QUEUE_DEPTH")
+    overload_retry_after: int = Field(default=5, env="OVERLOAD_RETRY_AFTER")  # seconds
+    
+    # Result Cache Configuration
+    result_cache_enabled: bool = Field(default=True, env="RESULT_CACHE_ENABLED")
+    result_cache_max_entries: int = Field(default=256, env="RESULT_CACHE_MAX_ENTRIES")
+    result_cache_ttl: int = Field(default=3600, env="RESULT_CACHE_TTL")  # seconds
+    result_cache_dir: Optional[str] = Field(default=None, env="RESULT_CACHE_DIR")  # disk tier, off when unset
+    
+    # Async Job Configuration
+    jobs_dir: str = Field(default="jobs", env="JOBS_DIR")  # SQLite database and pending uploads
+    job_workers: int = Field(default=1, env="JOB_WORKERS")
+    job_lease_seconds: int = Field(default=60, env="JOB_LEASE_SECONDS")  # a running job is re-queued once its lease lapses
+    
     # OCR Configuration
     ocr_gpu_enabled: bool = Field(default=True, env="OCR_GPU_ENABLED")
     ocr_languages: List[str] = Field(default=["en"], env="OCR_LANGUAGES")
     ocr_confidence_threshold: float = Field(default=0.5, env="OCR_CONFIDENCE_THRESHOLD")
     
+    ocr_batch_size: int = Field(default=16, env="OCR_BATCH_SIZE")  # EasyOCR recognizer batch size
+    ocr_batch_max_images: int = Field(default=8, env="OCR_BATCH_MAX_IMAGES")  # pages per cross-request OCR batch
+    ocr_batch_max_wait_ms: int = Field(default=10, env="OCR_BATCH_MAX_WAIT_MS")  # 0: no cross-request batching
+    ocr_pool_workers: int = Field(default=0, env="OCR_POOL_WORKERS")  # 0: OCR in-process, -1: as many as cores allow
+    ocr_pool_threads: int = Field(default=1, env="OCR_POOL_THREADS")  # torch threads per OCR pool worker
+    
+    # Page Preprocessing Configuration (boxes are mapped back to original coordinates)
+    preprocess_enabled: bool = Field(default=False, env="PREPROCESS_ENABLED")  # opt in after benchmarks.preprocess --real-models
+    preprocess_max_long_edge: int = Field(default=2560, env="PREPROCESS_MAX_LONG_EDGE")  # 0: no limit; never upscales
+    preprocess_target_text_height: int = Field(default=0, env="PREPROCESS_TARGET_TEXT_HEIGHT")  # px; 0: off
+    preprocess_grayscale: bool = Field(default=False, env="PREPROCESS_GRAYSCALE")
+    preprocess_deskew: bool = Field(default=False, env="PREPROCESS_DESKEW")
+    preprocess_crop: bool = Field(default=False, env="PREPROCESS_CROP")  # crop the background around the document
+    
+    # PDF Rasterization Configuration
+    pdf_dpi: int = Field(default=200, env="PDF_DPI")
+    pdf_grayscale: bool = Field(default=False, env="PDF_GRAYSCALE")  # render 8-bit gray, expanded to BGR for OCR/YOLO
+    pdf_render_window: int = Field(default=4, env="PDF_RENDER_WINDOW")  # pages rendered (and held) at a time
+    pdf_text_layer_enabled: bool = Field(default=True, env="PDF_TEXT_LAYER_ENABLED")  # skip OCR on born-digital pages
+    pdf_text_layer_min_chars: int = Field(default=32, env="PDF_TEXT_LAYER_MIN_CHARS")  # less text than this: OCR the page
+    
+    # Batch Endpoint Configuration
+    batch_max_files: int = Field(default=64, env="BATCH_MAX_FILES")
+    batch_page_window: int = Field(default=16, env="BATCH_PAGE_WINDOW")  # rendered pages a batch holds at once
+    
     # YOLO Configuration
     yolo_model_path: str = Field(default="models/detector_yolo_1cls.pt", env="YOLO_MODEL_PATH")
     yolo_confidence_threshold: float = Field(default=0.5, env="YOLO_CONFIDENCE_THRESHOLD")
+    yolo_batch_size: int = Field(default=16, env="YOLO_BATCH_SIZE")  # images per batched YOLO call
     
     # PII Detection Configuration
     pii_detection_enabled: bool = Field(default=True, env="PII_DETECTION_ENABLED")
     spacy_model: str = Field(default="en_core_web_sm", env="SPACY_MODEL")
+    pii_analysis_mode: str = Field(default="span", env="PII_ANALYSIS_MODE")  # "span", "line" (layout lines/key-value pairs) or "page"
+    pii_prefilter_enabled: bool = Field(default=True, env="PII_PREFILTER_ENABLED")  # skip detectors a text cannot need
+    pii_validators_enabled: bool = Field(default=True, env="PII_VALIDATORS_ENABLED")  # checksum/structure checks on IDs
+    pii_resolve_overlaps: bool = Field(default=True, env="PII_RESOLVE_OVERLAPS")  # merge duplicate/overlapping detections
+    pii_entity_precedence: List[str] = Field(
+        default=[
+            "AADHAAR", "PAN", "PHONE", "EMAIL", "MEDICAL_RECORD_NUMBER", "INSURANCE_NUMBER", "PATIENT_ID",
+            "ACCOUNT_NUMBER", "NAME", "DATE_OF_BIRTH", "ADDRESS", "MEDICATION", "MEDICAL_CONDITION",
+        ],
+        env="PII_ENTITY_PRECEDENCE",
+    )  # earlier types win when one detection lies inside another
+    pii_score_fusion: str = Field(default="max", env="PII_SCORE_FUSION")  # "max" or "noisy_or"
+    spacy_batch_size: int = Field(default=256, env="SPACY_BATCH_SIZE")  # spans per nlp.pipe batch
+    spacy_n_process: int = Field(default=1, env="SPACY_N_PROCESS")  # >1 forks parser processes for large batches
+    spacy_multiprocess_min_texts: int = Field(default=2000, env="SPACY_MULTIPROCESS_MIN_TEXTS")
     
     # LLM Validation Configuration
     gemini_api_key: Optional[str] = Field(default=None, env="GEMINI_API_KEY")
@@ -0,0 +1,98 @@
+"""
+In-memory decoding of uploaded documents.
+
+Uploads are decoded exactly once into one BGR ``uint8`` numpy array per page,
+so nothing is written to or re-read from disk. YOLO takes the BGR buffer as
+is; EasyOCR loads file paths as RGB and feeds arrays to its detector
+unchanged, so ``ocr.processor`` hands it an RGB copy (``to_rgb``).
+
+PDFs are rasterized lazily, a few pages (``PDF_RENDER_WINDOW``) per poppler
+call, and never past the page limit, so a long PDF costs no more memory than
+its first window of pages.
+"""
+import os
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+from config.settings import settings
+
+PAGE_LIMIT = 20
+
+
+class DocumentDecodeError(ValueError):
+    """Raised when uploaded bytes cannot be decoded into page images."""
+
+
+def is_pdf(filename: str, data: bytes = b"") -> bool:
+    return os.path.splitext(filename or "")[1].lower() == ".pdf" or data[:5] == b"%PDF-"
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """Decode encoded image bytes (JPEG/PNG/...) into a BGR array."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise DocumentDecodeError("Could not load image file")
+    return image
+
+
+def pil_to_bgr(pil_image) -> np.ndarray:
+    """Convert a PIL image (as produced by pdf2image) into a BGR array."""
+    if pil_image.mode == "L":
+        # Grayscale renders keep three channels for YOLO and EasyOCR
+        return cv2.cvtColor(np.asarray(pil_image), cv2.COLOR_GRAY2BGR)
+    return cv2.cvtColor(np.asarray(pil_image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+
+def to_rgb(image: np.ndarray) -> np.ndarray:
+    """An RGB copy of a BGR page, the channel order EasyOCR's detector expects."""
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def pdf_page_count(data: bytes) -> int:
+    return int(pdfinfo_from_bytes(data).get("Pages", 0))
+
+
+def render_pdf_pages(data: bytes, first_page: int, last_page: int) -> List[np.ndarray]:
+    """Rasterize pages ``first_page``..``last_page`` (1-based, inclusive) into BGR arrays."""
+    pil_images = convert_from_bytes(
+        data, dpi=settings.pdf_dpi, first_page=first_page, last_page=last_page, grayscale=settings.pdf_grayscale
+    )
+    pages = []
+    while pil_images:
+        pil_image = pil_images.pop(0)
+        pages.append(pil_to_bgr(pil_image))
+        pil_image.close()
+    return pages
+
+
+def page_windows(
+    data: bytes, filename: str, page_limit: int = PAGE_LIMIT, window: Optional[int] = None
+) -> Tuple[int, Iterator[List[np.ndarray]]]:
+    """Number of pages to process and an iterator over them, ``window`` pages at a time.
+
+    The page count is read (and an empty upload or PDF rejected) up front;
+    pages are only rendered as the iterator advances.
+    """
+    if not data:
+        raise DocumentDecodeError("File is empty")
+    if not is_pdf(filename, data):
+        return 1, iter([[decode_image(data)]])
+    total = min(pdf_page_count(data), page_limit)
+    if total <= 0:
+        raise DocumentDecodeError("PDF has no pages")
+    window = max(window or settings.pdf_render_window, 1)
+
+    def windows() -> Iterator[List[np.ndarray]]:
+        for first in range(1, total + 1, window):
+            yield render_pdf_pages(data, first, min(first + window - 1, total))
+
+    return total, windows()
+
+
+def decode_document(data: bytes, filename: str, page_limit: int = PAGE_LIMIT) -> List[np.ndarray]:
+    """Decode an uploaded document into one BGR array per page (at most ``page_limit``)."""
+    _, windows = page_windows(data, filename, page_limit)
+    return [page for pages in windows for page in pages]
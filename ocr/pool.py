@@ -0,0 +1,114 @@
+"""
+Process pool for multi-page OCR.
+
+EasyOCR runs one page at a time and, per call, barely uses more than one
+core. With ``OCR_POOL_WORKERS`` set, the pages of a document are spread over
+worker processes that each hold their own ``easyocr.Reader`` and run torch
+with ``OCR_POOL_THREADS`` intra-op threads, and the detections come back in
+page order.
+
+Workers are started with ``spawn``: forking a process whose torch thread pool
+is already running can deadlock the child, and the serving process has
+usually run torch by the time a pool is needed.
+
+Pre-fork inference workers are daemonic processes, which cannot have
+children, so there is no pool in pre-fork mode: the inference workers
+already spread documents over the cores.
+"""
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Sequence
+
+from config.logging import logger
+from config.settings import settings
+
+_reader = None
+
+
+def _init_worker(languages: List[str], gpu: bool, threads: int):
+    global _reader
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+    import easyocr
+    _reader = easyocr.Reader(languages, gpu=gpu)
+
+
+def _readtext(image, batch_size: int):
+    return _reader.readtext(image, detail=1, batch_size=batch_size)
+
+
+def pool_size(workers: int, threads: int, pools: int = 1) -> int:
+    """Worker processes for ``workers`` (``-1``: as many as the cores allow) at ``threads`` torch threads each.
+
+    Never more than the cores can run without oversubscribing when
+    ``pools`` such pools share the machine; ``0`` when the pool is off.
+    """
+    if workers == 0:
+        return 0
+    fits = max(1, (os.cpu_count() or 1) // (max(1, threads) * max(1, pools)))
+    return fits if workers < 0 else min(workers, fits)
+
+
+class OCRPool:
+    def __init__(self, workers: int, threads: int, languages: Sequence[str] = ("en",), gpu: bool = False):
+        self.workers = workers
+        self.threads = threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(list(languages), gpu, threads),
+        )
+
+    def readtext_many(self, images: Sequence[Any], batch_size: int = 1) -> List[Any]:
+        """Detections per image, in order, or the exception raised for that image."""
+        futures = [self._executor.submit(_readtext, image, batch_size) for image in images]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_pool: Optional[OCRPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> Optional[OCRPool]:
+    """Return the process-wide OCR pool, or None when ``OCR_POOL_WORKERS`` is 0.
+
+    Also None in a daemonic process (a pre-fork inference worker), which is
+    not allowed to start one. With several uvicorn workers each creates its
+    own pool on first use, so the cores are divided between them.
+    """
+    global _pool
+    if _pool is None:
+        if mp.current_process().daemon:
+            return None
+        pools = settings.workers if settings.workers > 1 and not settings.debug else 1
+        workers = pool_size(settings.ocr_pool_workers, settings.ocr_pool_threads, pools)
+        if workers == 0:
+            return None
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCRPool(workers, settings.ocr_pool_threads)
+                logger.info(f"OCR pool: {workers} worker(s) x {settings.ocr_pool_threads} torch thread(s)")
+    return _pool
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
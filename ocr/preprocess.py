@@ -0,0 +1,227 @@
+"""
+Page normalization before OCR and signature detection.
+
+EasyOCR and YOLO cost grows with pixel count, and phone photos of documents
+arrive at 12+ megapixels with text far larger than either model needs.
+``normalize_page`` optionally crops the border around the document, deskews
+it, downscales it (to ``PREPROCESS_MAX_LONG_EDGE`` and, if set, until the
+median text height is ``PREPROCESS_TARGET_TEXT_HEIGHT`` pixels) and converts
+it to grayscale. It never upscales.
+
+Every step is an affine map, so the page comes back with a single 2x3
+matrix from processed to original pixel coordinates; OCR and signature boxes
+are mapped through it and the API keeps reporting original-image
+coordinates. Pages needing no change are returned as is, with no matrix.
+
+The same page array is normalized once even though OCR and YOLO both ask
+for it: results are remembered for as long as the original array lives.
+"""
+import threading
+import weakref
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from config.settings import settings
+
+# Long edge of the reduced copy that text height, skew and borders are measured on
+ANALYSIS_EDGE = 1024
+# Deskew search range and final step, in degrees; smaller skews are left alone
+MAX_SKEW = 10.0
+SKEW_STEP = 0.25
+MIN_SKEW = 0.5
+# A border pixel differs from the background by more than this (0-255)
+BORDER_DIFF = 40
+# Crop only when it removes at least this fraction of either side
+MIN_CROP = 0.02
+
+Matrix = np.ndarray  # 3x3 homogeneous affine
+
+
+def _translate(dx: float, dy: float) -> Matrix:
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]])
+
+
+def _reduced_gray(image: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Grayscale copy with a long edge of at most ``ANALYSIS_EDGE``, and its scale."""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    factor = min(1.0, ANALYSIS_EDGE / max(gray.shape[:2]))
+    if factor < 1.0:
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    return gray, factor
+
+
+def _ink(gray: np.ndarray) -> np.ndarray:
+    """Binary mask of dark-on-light text pixels."""
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return mask
+
+
+def content_box(gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """``(x1, y1, x2, y2)`` of everything that differs from the border colour, or None to keep the page."""
+    height, width = gray.shape[:2]
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    differs = (np.abs(gray.astype(np.int16) - int(np.median(border))) > BORDER_DIFF).astype(np.uint8)
+    differs = cv2.morphologyEx(differs, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    points = cv2.findNonZero(differs)
+    if points is None:
+        return None
+    x, y, w, h = cv2.boundingRect(points)
+    pad = max(2, int(0.01 * max(width, height)))
+    x1, y1 = max(0, x - pad), max(0, y - pad)
+    x2, y2 = min(width, x + w + pad), min(height, y + h + pad)
+    if (x2 - x1) > (1 - MIN_CROP) * width and (y2 - y1) > (1 - MIN_CROP) * height:
+        return None
+    return x1, y1, x2, y2
+
+
+def _profile_score(ink: np.ndarray, angle: float) -> float:
+    height, width = ink.shape
+    rotated = cv2.warpAffine(ink, cv2.getRotationMatrix2D((width / 2.0, height / 2.0), angle, 1.0), (width, height))
+    profile = rotated.sum(axis=1, dtype=np.float64)
+    return float(np.square(np.diff(profile)).sum())
+
+
+def skew_angle(gray: np.ndarray) -> float:
+    """Rotation, in degrees, that makes the text lines horizontal.
+
+    The angle whose row projection of the ink is most peaked (lines and the
+    gaps between them line up with the rows) wins; whole degrees are tried
+    first, then ``SKEW_STEP`` steps around the best one.
+    """
+    ink = _ink(gray)
+    coarse = max(np.arange(-MAX_SKEW, MAX_SKEW + 0.5, 1.0), key=lambda a: _profile_score(ink, float(a)))
+    fine = np.arange(coarse - 1.0 + SKEW_STEP, coarse + 1.0, SKEW_STEP)
+    best = float(max(fine, key=lambda a: _profile_score(ink, float(a))))
+    return best if abs(best) >= MIN_SKEW else 0.0
+
+
+def text_height(gray: np.ndarray) -> Optional[float]:
+    """Median height of character-sized ink components, or None when there are too few."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(_ink(gray), connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    limit = gray.shape[0] / 10
+    # Characters: not specks, not rules or page-sized blobs
+    chars = heights[(heights >= 3) & (heights <= limit) & (widths <= 4 * heights)]
+    if len(chars) < 10:
+        return None
+    return float(np.median(chars))
+
+
+def _rotation(width: int, height: int, angle: float) -> Tuple[Matrix, int, int]:
+    """Rotation by ``angle`` about the page centre onto a canvas large enough for the whole page."""
+    rotation = np.vstack([cv2.getRotationMatrix2D((width / 2.0, height / 2.0), angle, 1.0), [0.0, 0.0, 1.0]])
+    corners = np.array([[0, 0, 1], [width, 0, 1], [width, height, 1], [0, height, 1]], dtype=np.float64).T
+    moved = rotation @ corners
+    x1, y1 = moved[0].min(), moved[1].min()
+    new_width, new_height = int(np.ceil(moved[0].max() - x1)), int(np.ceil(moved[1].max() - y1))
+    return _translate(-x1, -y1) @ rotation, new_width, new_height
+
+
+def _normalize(image: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    forward = np.eye(3)
+    gray, factor = _reduced_gray(image)
+
+    if settings.preprocess_crop:
+        box = content_box(gray)
+        if box is not None:
+            x1, y1, x2, y2 = (int(round(v / factor)) for v in box)
+            # A copy: a view would keep the original alive through the cache
+            image = image[y1:y2, x1:x2].copy()
+            forward = _translate(-x1, -y1) @ forward
+            gray, factor = _reduced_gray(image)
+
+    angle = skew_angle(gray) if settings.preprocess_deskew else 0.0
+    height, width = image.shape[:2]
+    # Sized for the page as it will be once deskewed, but scaled first so the
+    # rotation runs on the smaller image
+    long_edge = max(_rotation(width, height, angle)[1:]) if angle else max(width, height)
+    scale = 1.0
+    if settings.preprocess_max_long_edge > 0:
+        scale = min(scale, settings.preprocess_max_long_edge / long_edge)
+    if settings.preprocess_target_text_height > 0:
+        measured = text_height(gray)
+        if measured:
+            scale = min(scale, settings.preprocess_target_text_height / (measured / factor))
+    if scale < 1.0:
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        # Exact per-axis factors after rounding
+        forward = np.diag([size[0] / width, size[1] / height, 1.0]) @ forward
+
+    if angle:
+        height, width = image.shape[:2]
+        rotation, new_width, new_height = _rotation(width, height, angle)
+        image = cv2.warpAffine(
+            image, rotation[:2], (new_width, new_height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+        )
+        forward = rotation @ forward
+
+    if settings.preprocess_grayscale and image.ndim == 3:
+        # Three channels again for YOLO and EasyOCR
+        image = cv2.cvtColor(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+
+    if np.allclose(forward, np.eye(3)):
+        return image, None
+    return np.ascontiguousarray(image), np.linalg.inv(forward)[:2]
+
+
+_normalized: Dict[int, tuple] = {}
+_normalized_lock = threading.Lock()
+
+
+def normalize_page(image: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """``(processed, to_original)``; ``to_original`` is a 2x3 affine matrix, or None when nothing changed."""
+    if not settings.preprocess_enabled:
+        return image, None
+    key = id(image)
+    with _normalized_lock:
+        cached = _normalized.get(key)
+    if cached is not None and cached[0]() is image:
+        return cached[1], cached[2]
+    processed, to_original = _normalize(image)
+    if processed is image:
+        # Remembering the page itself would keep it alive forever
+        return processed, to_original
+    try:
+        ref = weakref.ref(image, lambda _, key=key: _normalized.pop(key, None))
+    except TypeError:
+        # Views cannot always be weakly referenced; just skip remembering them
+        return processed, to_original
+    with _normalized_lock:
+        _normalized[key] = (ref, processed, to_original)
+    return processed, to_original
+
+
+def map_points(to_original: Optional[np.ndarray], points: Sequence[Sequence[float]]) -> List[List[float]]:
+    """Points from processed to original page coordinates."""
+    if to_original is None:
+        return [[float(x), float(y)] for x, y in points]
+    array = np.asarray(points, dtype=np.float64)
+    mapped = array @ to_original[:, :2].T + to_original[:, 2]
+    return mapped.tolist()
+
+
+def map_detections(to_original: Optional[np.ndarray], detections):
+    """EasyOCR ``(corners, text, confidence)`` detections in original page coordinates."""
+    if to_original is None or isinstance(detections, Exception):
+        return detections
+    mapped = []
+    for detection in detections:
+        try:
+            corners, text, confidence = detection[0], detection[1], detection[2]
+            mapped.append((map_points(to_original, corners), text, confidence))
+        except (IndexError, TypeError, ValueError):
+            # Malformed entries are skipped later by _blocks_from_detections
+            mapped.append(detection)
+    return mapped
+
+
+def map_box(to_original: Optional[np.ndarray], x1: float, y1: float, x2: float, y2: float) -> Tuple[float, float, float, float]:
+    """The axis-aligned box in original coordinates covering a processed box."""
+    if to_original is None:
+        return x1, y1, x2, y2
+    xs, ys = zip(*map_points(to_original, [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]))
+    return min(xs), min(ys), max(xs), max(ys)
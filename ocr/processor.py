@@ -1,131 +1,285 @@
-import easyocr
+import gc
 import os
-import tempfile
-from pdf2image import convert_from_path
+import threading
+import time
+import traceback
 
-# Initialize EasyOCR reader cache
-readers = {}
+import cv2
+
+from config.metrics import ERRORS, PAGE_SOURCES, observe_stage, stage_timer
+from config.settings import settings
+from ocr.batcher import OCRBatcher
+from ocr.images import PAGE_LIMIT, DocumentDecodeError, is_pdf, page_windows, to_rgb
+from ocr.pool import get_ocr_pool
+from ocr.preprocess import map_detections, normalize_page
+from ocr.text_layer import extract_text_layer
 from performance_cache import ModelCache
 
-def process_document(file_path, languages=None):
-    import gc
-    global readers
-    if not languages:
-        languages = ['en']
-    lang_key = tuple(languages)
-    reader = ModelCache.easyocr_reader
-    all_results = {"pages": []}
 
-    # Limit number of pages/images processed (configurable)
-    PAGE_LIMIT = 20  # Change as needed
+def _get_reader():
+    if ModelCache.easyocr_reader is None:
+        ModelCache.load_easyocr()
+    return ModelCache.easyocr_reader
 
-    import traceback
-    try:
-        if not os.path.exists(file_path):
-            return {"error": f"File not found: {file_path}"}
-        if os.path.getsize(file_path) == 0:
-            return {"error": f"File is empty: {file_path}"}
-
-        # Check if the file is a PDF
-        if file_path.lower().endswith('.pdf'):
-            images = convert_from_path(file_path)
-            for i, pil_image in enumerate(images):
-                if i >= PAGE_LIMIT:
-                    break
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_img:
-                    pil_image.save(tmp_img.name, 'PNG')
-                    temp_img_path = tmp_img.name
+
+_batcher = None
+_batcher_pid = None
+_batcher_lock = threading.Lock()
+
+
+def _get_batcher():
+    """The process-wide ``OCRBatcher``, or None when ``OCR_BATCH_MAX_WAIT_MS`` is 0.
+
+    A forked child (e.g. a respawned pre-fork worker) inherits the parent's
+    batcher without its thread, so each process builds its own.
+    """
+    global _batcher, _batcher_pid
+    if settings.ocr_batch_max_wait_ms <= 0:
+        return None
+    if _batcher is None or _batcher_pid != os.getpid():
+        with _batcher_lock:
+            if _batcher is None or _batcher_pid != os.getpid():
+                _batcher_pid = os.getpid()
+                _batcher = OCRBatcher(
+                    lambda images: _readtext_many(_get_reader(), images, settings.ocr_batch_size),
+                    settings.ocr_batch_max_images,
+                    settings.ocr_batch_max_wait_ms / 1000.0,
+                )
+    return _batcher
+
+
+def _blocks_from_detections(detections):
+    """Convert EasyOCR ``readtext(detail=1)`` output into block dicts."""
+    blocks = []
+    for detection in detections:
+        if isinstance(detection, (list, tuple)) and len(detection) >= 3:
+            bbox = detection[0]
+            text = detection[1]
+            confidence = detection[2]
+            if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
                 try:
-                    page_results = reader.readtext(temp_img_path, detail=1)
-                    page_data = {"page_number": i + 1, "blocks": []}
-                    for detection in page_results:
-                        if isinstance(detection, (list, tuple)) and len(detection) >= 3:
-                            bbox = detection[0]
-                            text = detection[1]
-                            confidence = detection[2]
-                            if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
-                                try:
-                                    block = {
-                                        "text": str(text),
-                                        "confidence": float(confidence),
-                                        "position": {
-                                            "top_left": [float(bbox[0][0]), float(bbox[0][1])],
-                                            "top_right": [float(bbox[1][0]), float(bbox[1][1])],
-                                            "bottom_right": [float(bbox[2][0]), float(bbox[2][1])],
-                                            "bottom_left": [float(bbox[3][0]), float(bbox[3][1])]
-                                        }
-                                    }
-                                    page_data["blocks"].append(block)
-                                except (IndexError, ValueError, TypeError):
-                                    continue
-                    all_results["pages"].append(page_data)
-                    del page_results, pil_image, page_data
-                    gc.collect()
-                except Exception as e:
-                    if os.path.exists(temp_img_path):
-                        os.unlink(temp_img_path)
-                    gc.collect()
-                    return {"error": f"EasyOCR failed for PDF page {i + 1}: {str(e)}\n{traceback.format_exc()}"}
-                finally:
-                    if os.path.exists(temp_img_path):
-                        os.unlink(temp_img_path)
-                    gc.collect()
-        else:
+                    block = {
+                        "text": str(text),
+                        "confidence": float(confidence),
+                        "position": {
+                            "top_left": [float(bbox[0][0]), float(bbox[0][1])],
+                            "top_right": [float(bbox[1][0]), float(bbox[1][1])],
+                            "bottom_right": [float(bbox[2][0]), float(bbox[2][1])],
+                            "bottom_left": [float(bbox[3][0]), float(bbox[3][1])]
+                        }
+                    }
+                except (IndexError, ValueError, TypeError):
+                    continue
+                blocks.append(block)
+    return blocks
+
+
+def readtext_many(images, batch_size=None):
+    """OCR several images with as few EasyOCR calls as possible.
+
+    Images of similar size are padded to a common canvas and run through
+    ``readtext_batched`` together (one detector pass, recognition crops
+    batched across images); the rest go through ``readtext``. With an OCR pool several images are spread over
+    its workers instead, and with a batching window they are batched with
+    the pages of concurrent requests. Returns a list aligned with
+    ``images`` holding each image's detections, or the exception raised for
+    that image.
+    """
+    with stage_timer("ocr"):
+        return _ocr(images, batch_size)
+
+
+def _ocr(images, batch_size=None):
+    """OCR normalized RGB copies of BGR ``images``; detections come back in original page coordinates."""
+    with stage_timer("preprocess"):
+        normalized = [normalize_page(image) for image in images]
+        # Pages are BGR (as YOLO wants); EasyOCR's detector expects RGB
+        rgb = [to_rgb(page) for page, _ in normalized]
+    results = _ocr_normalized(rgb, batch_size)
+    del rgb
+    return [map_detections(to_original, result) for (_, to_original), result in zip(normalized, results)]
+
+
+def _ocr_normalized(images, batch_size=None):
+    batch_size = batch_size or settings.ocr_batch_size
+    pool = get_ocr_pool()
+    if pool is not None and len(images) > 1:
+        return pool.readtext_many(images, batch_size)
+    batcher = _get_batcher()
+    if batcher is not None:
+        return batcher.readtext_many(images)
+    return _readtext_many(_get_reader(), images, batch_size)
+
+
+# Pages of different sizes share a readtext_batched call when padding them
+# to a common canvas adds at most this fraction to their own pixels
+BATCH_PAD_OVERHEAD = 0.25
+
+
+def _shape_groups(images):
+    """Indices of ``images`` grouped so each group can be padded to one canvas cheaply."""
+    order = sorted(range(len(images)), key=lambda i: images[i].shape[0] * images[i].shape[1])
+    groups = []  # [indices, canvas height, canvas width, own pixels, channel shape]
+    for i in order:
+        height, width = images[i].shape[:2]
+        if groups:
+            indices, canvas_h, canvas_w, pixels, channels = groups[-1]
+            canvas_h, canvas_w = max(canvas_h, height), max(canvas_w, width)
+            pixels += height * width
+            fits = canvas_h * canvas_w * (len(indices) + 1) <= (1 + BATCH_PAD_OVERHEAD) * pixels
+            if fits and images[i].shape[2:] == channels:
+                indices.append(i)
+                groups[-1][1:4] = canvas_h, canvas_w, pixels
+                continue
+        groups.append([[i], height, width, height * width, images[i].shape[2:]])
+    return [(indices, (canvas_h, canvas_w)) for indices, canvas_h, canvas_w, _, _ in groups]
+
+
+def _pad_to(image, height, width):
+    """``image`` on a white ``height`` x ``width`` canvas, anchored top left so boxes keep their coordinates."""
+    if image.shape[:2] == (height, width):
+        return image
+    fill = (255,) * (image.shape[2] if image.ndim == 3 else 1)
+    return cv2.copyMakeBorder(
+        image, 0, height - image.shape[0], 0, width - image.shape[1], cv2.BORDER_CONSTANT, value=fill
+    )
+
+
+def _readtext_many(reader, images, batch_size):
+    results = [None] * len(images)
+    for indices, (height, width) in _shape_groups(images):
+        if len(indices) > 1:
             try:
-                results = reader.readtext(file_path, detail=1)
-            except ValueError as img_shape_error:
-                if "too many values to unpack" in str(img_shape_error):
-                    try:
-                        import cv2
-                        import numpy as np
-                        img = cv2.imread(file_path)
-                        if img is None:
-                            return {"error": "Could not load image file"}
-                        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                        results = reader.readtext(img_rgb, detail=1)
-                        del img, img_rgb
-                        gc.collect()
-                    except Exception as e:
-                        gc.collect()
-                        return {"error": f"Image preprocessing failed: {str(e)}\n{traceback.format_exc()}"}
-                else:
-                    raise img_shape_error
+                # One detector pass needs one input size; padding is blank and finds nothing
+                canvas = [_pad_to(images[i], height, width) for i in indices]
+                batched = reader.readtext_batched(canvas, detail=1, batch_size=batch_size)
+                del canvas
+                for i, detections in zip(indices, batched):
+                    results[i] = detections
+                continue
+            except Exception:
+                # Fall back to one call per image so a bad image only fails itself
+                pass
+        for i in indices:
+            try:
+                results[i] = reader.readtext(images[i], detail=1, batch_size=batch_size)
             except Exception as e:
-                gc.collect()
-                return {"error": f"EasyOCR readtext failed: {str(e)}\n{traceback.format_exc()}"}
-
-            if not results:
-                gc.collect()
-                return {"error": "No text detected in the image."}
-
-            page_data = {"page_number": 1, "blocks": []}
-            for detection in results:
-                if isinstance(detection, (list, tuple)) and len(detection) >= 3:
-                    bbox = detection[0]
-                    text = detection[1]
-                    confidence = detection[2]
-                    if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
-                        try:
-                            block = {
-                                "text": str(text),
-                                "confidence": float(confidence),
-                                "position": {
-                                    "top_left": [float(bbox[0][0]), float(bbox[0][1])],
-                                    "top_right": [float(bbox[1][0]), float(bbox[1][1])],
-                                    "bottom_right": [float(bbox[2][0]), float(bbox[2][1])],
-                                    "bottom_left": [float(bbox[3][0]), float(bbox[3][1])]
-                                }
-                            }
-                        except (IndexError, ValueError, TypeError):
-                            continue
-                        page_data["blocks"].append(block)
-            all_results["pages"].append(page_data)
-            del results, page_data
+                results[i] = e
+    return results
+
+
+def process_images(images, pdf=False, on_page=None, first_page_no=1, total=None, text_layer=None):
+    """Run OCR over already-decoded page images (BGR numpy arrays).
+
+    Returns ``{"pages": [...]}`` in the same shape as ``process_document``,
+    or ``{"error": ...}``. ``images`` start at page ``first_page_no`` of a
+    document of ``total`` pages (default: just these). Pages found in
+    ``text_layer`` (page number to blocks) take those blocks instead of OCR;
+    the other pages are OCRed together (see ``readtext_many``).
+    ``on_page(pages_done, pages_total)`` is called after each page, in page
+    order, e.g. to report job progress.
+    """
+    text_layer = text_layer or {}
+    all_results = {"pages": []}
+    total = total or first_page_no - 1 + len(images)
+    pending = [i for i in range(len(images)) if first_page_no + i not in text_layer]
+    detections = dict(zip(pending, _ocr([images[i] for i in pending]))) if pending else {}
+    gc.collect()
+    for i in range(len(images)):
+        page_no = first_page_no + i
+        if page_no in text_layer:
+            PAGE_SOURCES.labels("text_layer").inc()
+            all_results["pages"].append({"page_number": page_no, "blocks": text_layer[page_no]})
+            if on_page is not None:
+                on_page(page_no, total)
+            continue
+        PAGE_SOURCES.labels("ocr").inc()
+        try:
+            results = detections.pop(i)
+            if isinstance(results, Exception):
+                raise results
+        except Exception as e:
+            gc.collect()
+            if pdf:
+                return {"error": f"EasyOCR failed for PDF page {page_no}: {str(e)}\n{traceback.format_exc()}"}
+            return {"error": f"EasyOCR readtext failed: {str(e)}\n{traceback.format_exc()}"}
+
+        if not results and not pdf:
             gc.collect()
+            return {"error": "No text detected in the image."}
 
+        page_data = {"page_number": page_no, "blocks": _blocks_from_detections(results)}
+        all_results["pages"].append(page_data)
+        del results, page_data
+        if on_page is not None:
+            on_page(page_no, total)
+    return all_results
+
+
+def process_document_bytes(data, filename, languages=None, on_page=None, on_window=None):
+    """Decode an uploaded document a window of pages at a time and OCR each page from memory.
+
+    PDF pages are rendered lazily (``ocr.images.page_windows``), so only the
+    current window is ever held, and pages with a text layer skip OCR
+    (``ocr.text_layer``); they are still rendered for signature detection. ``on_window(images, first_page_no)`` is
+    called with each window once it is OCRed, so callers can reuse the
+    arrays (e.g. for signature detection) before they are dropped.
+    """
+    seconds = {"decode": 0.0, "text_layer": 0.0, "ocr": 0.0}
+    stage = "decode"
+    all_results = {"pages": []}
+    try:
+        started = time.perf_counter()
+        pool = get_ocr_pool()
+        # Render at least one page per pool worker at a time so none idles
+        window = max(settings.pdf_render_window, pool.workers) if pool is not None else None
+        total, windows = page_windows(data, filename, PAGE_LIMIT, window)
+        pdf = is_pdf(filename, data)
+        seconds["decode"] += time.perf_counter() - started
+        stage, started = "text_layer", time.perf_counter()
+        text_layer = extract_text_layer(data, 1, total) if pdf else {}
+        seconds["text_layer"] += time.perf_counter() - started
+        stage, started = "decode", time.perf_counter()
+        first_page_no = 1
+        for images in windows:
+            seconds["decode"] += time.perf_counter() - started
+            stage, started = "ocr", time.perf_counter()
+            result = process_images(
+                images, pdf=pdf, on_page=on_page, first_page_no=first_page_no, total=total, text_layer=text_layer
+            )
+            seconds["ocr"] += time.perf_counter() - started
+            if "error" in result:
+                return result
+            all_results["pages"].extend(result["pages"])
+            if on_window is not None:
+                on_window(images, first_page_no)
+            first_page_no += len(images)
+            del images, result
+            stage, started = "decode", time.perf_counter()
+        seconds["decode"] += time.perf_counter() - started
+    except DocumentDecodeError as e:
+        ERRORS.labels("decode").inc()
+        return {"error": str(e)}
     except Exception as e:
+        ERRORS.labels(stage).inc()
         gc.collect()
         return {"error": f"EasyOCR failed: {str(e)}\n{traceback.format_exc()}"}
+    finally:
+        # One observation per stage and document, however many windows it took
+        for name, elapsed in seconds.items():
+            if elapsed:
+                observe_stage(name, elapsed)
+    return all_results
+
 
+def process_document(file_path, languages=None):
+    if not os.path.exists(file_path):
+        return {"error": f"File not found: {file_path}"}
+    if os.path.getsize(file_path) == 0:
+        return {"error": f"File is empty: {file_path}"}
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+    ocr_result = process_document_bytes(data, file_path, languages)
     gc.collect()
-    return all_results
+    return ocr_result
@@ -1,151 +1,168 @@
-
 import psutil
 import gc
-import easyocr
 import os
-import tempfile
-from pdf2image import convert_from_path
 from dotenv import load_dotenv
-load_dotenv()
 
-# Initialize EasyOCR reader cache
-readers = {}
+from config.metrics import PAGE_SOURCES, stage_timer
+from ocr.images import DocumentDecodeError, decode_image, is_pdf, page_windows, pdf_page_count, render_pdf_pages
+from ocr.processor import _blocks_from_detections, readtext_many
+from ocr.text_layer import extract_text_layer
+load_dotenv()
 
 # Configurable limits from environment
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE", 10485760)) // (1024 * 1024)  # Convert bytes to MB
 PAGE_LIMIT = int(os.getenv("PAGE_LIMIT", 20))
 MAX_MEMORY_MB = int(os.getenv("MAX_MEMORY_MB", 400))
 
+def _rss_mb():
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
 # Helper to check memory usage
-def memory_ok():
-    process = psutil.Process(os.getpid())
-    mem_mb = process.memory_info().rss / (1024 * 1024)
-    return mem_mb < MAX_MEMORY_MB
+def memory_ok(baseline_mb=0.0):
+    """True while this stream has grown the process by less than MAX_MEMORY_MB.
 
-# Generator for streaming results
+    The budget is measured from ``baseline_mb`` (the RSS when the stream
+    started) because the loaded models alone exceed any sensible absolute cap.
+    """
+    return _rss_mb() - baseline_mb < MAX_MEMORY_MB
 
-def process_document_stream(file_path, languages=None):
-    import numpy as np
-    global readers
-    if not languages:
-        languages = ['en']
-    lang_key = tuple(languages)
-    if lang_key not in readers:
-        readers[lang_key] = easyocr.Reader(languages, gpu=True)
-    reader = readers[lang_key]
-
-    # File size check
-    if not os.path.exists(file_path):
-        yield {"error": f"File not found: {file_path}"}
-        return
-    if os.path.getsize(file_path) > MAX_FILE_SIZE_MB * 1024 * 1024:
-        yield {"error": f"File too large (>{MAX_FILE_SIZE_MB}MB)"}
-        return
-    if os.path.getsize(file_path) == 0:
-        yield {"error": f"File is empty: {file_path}"}
+def _upload_error(data, filename):
+    """The error dict for an upload the stream refuses, or None."""
+    if not data:
+        return {"error": f"File is empty: {filename}"}
+    if len(data) > MAX_FILE_SIZE_MB * 1024 * 1024:
+        return {"error": f"File too large (>{MAX_FILE_SIZE_MB}MB)"}
+    return None
+
+
+def _ocr_page(image, page_no, pdf):
+    """OCR one page into its page dict, or an ``{"error": ...}`` dict."""
+    PAGE_SOURCES.labels("ocr").inc()
+    try:
+        results = readtext_many([image])[0]
+        if isinstance(results, Exception):
+            raise results
+    except Exception:
+        gc.collect()
+        if pdf:
+            return {"error": f"EasyOCR failed for PDF page {page_no}"}
+        return {"error": "EasyOCR readtext failed"}
+    if not results and not pdf:
+        gc.collect()
+        return {"error": "No text detected in the image."}
+    return {"page_number": page_no, "blocks": _blocks_from_detections(results)}
+
+
+# Single pages, for callers that process each page as a separate task
+
+def count_stream_pages(data, filename):
+    """Number of pages ``process_page_bytes`` serves for an upload, or an ``{"error": ...}`` dict."""
+    error = _upload_error(data, filename)
+    if error is not None:
+        return error
+    if not is_pdf(filename, data):
+        return 1
+    try:
+        total = min(pdf_page_count(data), PAGE_LIMIT)
+    except Exception as e:
+        return {"error": f"Could not read PDF: {e}"}
+    return total if total > 0 else {"error": "PDF has no pages"}
+
+
+def process_page_bytes(data, filename, page_no):
+    """``(page_data, page_image)`` for page ``page_no`` (1-based) of an upload.
+
+    Only that page is decoded or rendered; it takes its blocks from the PDF
+    text layer when it has one. On failure ``({"error": ...}, None)``.
+    """
+    error = _upload_error(data, filename)
+    if error is not None:
+        return error, None
+    pdf = is_pdf(filename, data)
+    try:
+        image = render_pdf_pages(data, page_no, page_no)[0] if pdf else decode_image(data)
+    except DocumentDecodeError as e:
+        return {"error": str(e)}, None
+    except Exception as e:
+        return {"error": f"Could not render PDF page {page_no}: {e}"}, None
+    if pdf:
+        with stage_timer("text_layer"):
+            blocks = extract_text_layer(data, page_no, page_no).get(page_no)
+        if blocks is not None:
+            PAGE_SOURCES.labels("text_layer").inc()
+            return {"page_number": page_no, "blocks": blocks}, image
+    page_data = _ocr_page(image, page_no, pdf)
+    if "error" in page_data:
+        return page_data, None
+    return page_data, image
+
+
+# Generators for streaming results
+
+def process_bytes_stream(data, filename):
+    """Yield ``(page_data, page_image)`` one page at a time from in-memory bytes.
+
+    ``page_image`` is the decoded BGR array the page was OCRed from (or, for
+    a PDF page with a text layer, rendered for), so callers can run signature
+    detection on the same buffer. On failure a single
+    ``({"error": ...}, None)`` is yielded and the generator stops.
+    """
+    error = _upload_error(data, filename)
+    if error is not None:
+        yield error, None
         return
 
-    # PDF or image
-    if file_path.lower().endswith('.pdf'):
-        images = convert_from_path(file_path)
-        for i, pil_image in enumerate(images):
-            if i >= PAGE_LIMIT:
-                break
-            if not memory_ok():
-                yield {"error": "Memory limit exceeded"}
-                return
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_img:
-                pil_image.save(tmp_img.name, 'PNG')
-                temp_img_path = tmp_img.name
-            try:
-                page_results = reader.readtext(temp_img_path, detail=1)
-                page_data = {"page_number": i + 1, "blocks": []}
-                for detection in page_results:
-                    if isinstance(detection, (list, tuple)) and len(detection) >= 3:
-                        bbox = detection[0]
-                        text = detection[1]
-                        confidence = detection[2]
-                        if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
-                            try:
-                                block = {
-                                    "text": str(text),
-                                    "confidence": float(confidence),
-                                    "position": {
-                                        "top_left": np.array([bbox[0][0], bbox[0][1]], dtype=np.float16).tolist(),
-                                        "top_right": np.array([bbox[1][0], bbox[1][1]], dtype=np.float16).tolist(),
-                                        "bottom_right": np.array([bbox[2][0], bbox[2][1]], dtype=np.float16).tolist(),
-                                        "bottom_left": np.array([bbox[3][0], bbox[3][1]], dtype=np.float16).tolist()
-                                    }
-                                }
-                                page_data["blocks"].append(block)
-                            except Exception:
-                                continue
-                yield page_data
-                del page_results, pil_image, page_data
-                gc.collect()
-            except Exception:
-                if os.path.exists(temp_img_path):
-                    os.unlink(temp_img_path)
-                gc.collect()
-                yield {"error": f"EasyOCR failed for PDF page {i + 1}"}
-                return
-            finally:
-                if os.path.exists(temp_img_path):
-                    os.unlink(temp_img_path)
+    baseline_mb = _rss_mb()
+    if is_pdf(filename, data):
+        try:
+            total, windows = page_windows(data, filename, PAGE_LIMIT)
+        except DocumentDecodeError as e:
+            yield {"error": str(e)}, None
+            return
+        with stage_timer("text_layer"):
+            text_layer = extract_text_layer(data, 1, total)
+        page_no = 0
+        for images in windows:
+            while images:
+                # Pop so the window only holds the pages still to be yielded
+                image = images.pop(0)
+                page_no += 1
+                if not memory_ok(baseline_mb):
+                    yield {"error": "Memory limit exceeded"}, None
+                    return
+                if page_no in text_layer:
+                    PAGE_SOURCES.labels("text_layer").inc()
+                    page_data = {"page_number": page_no, "blocks": text_layer.pop(page_no)}
+                    yield page_data, image
+                    del page_data, image
+                    continue
+                page_data = _ocr_page(image, page_no, pdf=True)
+                if "error" in page_data:
+                    yield page_data, None
+                    return
+                yield page_data, image
+                del page_data, image
                 gc.collect()
     else:
         try:
-            results = reader.readtext(file_path, detail=1)
-        except ValueError as img_shape_error:
-            if "too many values to unpack" in str(img_shape_error):
-                try:
-                    import cv2
-                    img = cv2.imread(file_path)
-                    if img is None:
-                        yield {"error": "Could not load image file"}
-                        return
-                    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    results = reader.readtext(img_rgb, detail=1)
-                    del img, img_rgb
-                    gc.collect()
-                except Exception:
-                    gc.collect()
-                    yield {"error": "Image preprocessing failed"}
-                    return
-            else:
-                raise img_shape_error
-        except Exception:
-            gc.collect()
-            yield {"error": "EasyOCR readtext failed"}
+            image = decode_image(data)
+        except DocumentDecodeError as e:
+            yield {"error": str(e)}, None
             return
-
-        if not results:
-            gc.collect()
-            yield {"error": "No text detected in the image."}
+        page_data = _ocr_page(image, 1, pdf=False)
+        if "error" in page_data:
+            yield page_data, None
             return
+        yield page_data, image
+        del page_data, image
+        gc.collect()
 
-        page_data = {"page_number": 1, "blocks": []}
-        for detection in results:
-            if isinstance(detection, (list, tuple)) and len(detection) >= 3:
-                bbox = detection[0]
-                text = detection[1]
-                confidence = detection[2]
-                if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
-                    try:
-                        block = {
-                            "text": str(text),
-                            "confidence": float(confidence),
-                            "position": {
-                                "top_left": [float(bbox[0][0]), float(bbox[0][1])],
-                                "top_right": [float(bbox[1][0]), float(bbox[1][1])],
-                                "bottom_right": [float(bbox[2][0]), float(bbox[2][1])],
-                                "bottom_left": [float(bbox[3][0]), float(bbox[3][1])]
-                            }
-                        }
-                        block["position"] = {k: [np.float16(x) for x in v] for k, v in block["position"].items()}
-                        page_data["blocks"].append(block)
-                    except Exception:
-                        continue
+def process_document_stream(file_path, languages=None):
+    """Yield OCR results page by page for a file on disk."""
+    if not os.path.exists(file_path):
+        yield {"error": f"File not found: {file_path}"}
+        return
+    with open(file_path, "rb") as f:
+        data = f.read()
+    for page_data, _ in process_bytes_stream(data, file_path):
         yield page_data
-        del results, page_data
-        gc.collect()
@@ -0,0 +1,77 @@
+"""
+Text-layer extraction for born-digital PDFs.
+
+A PDF page that carries its own text does not need OCR: poppler's
+``pdftotext -bbox-layout`` returns every line with its box, in milliseconds.
+Lines become blocks in the same ``text``/``confidence``/``position`` shape
+EasyOCR output is converted to, with boxes scaled from PDF points to the
+pixels of the page rendered at ``PDF_DPI``, so signature boxes, PII boxes
+and masking all share one coordinate system.
+
+Pages with less than ``PDF_TEXT_LAYER_MIN_CHARS`` of text (scans, or scans
+with a stray header) are left out and go through OCR.
+"""
+import subprocess
+import xml.etree.ElementTree as ET
+from typing import Dict, List
+
+from config.logging import logger
+from config.settings import settings
+
+TEXT_LAYER_TIMEOUT = 30  # seconds for one pdftotext call
+
+
+def _local(tag: str) -> str:
+    # pdftotext writes XHTML; drop the namespace
+    return tag.rsplit("}", 1)[-1]
+
+
+def _block(line: ET.Element, scale: float) -> Dict:
+    x1, y1 = float(line.get("xMin")) * scale, float(line.get("yMin")) * scale
+    x2, y2 = float(line.get("xMax")) * scale, float(line.get("yMax")) * scale
+    return {
+        "text": " ".join(word.text or "" for word in line if _local(word.tag) == "word"),
+        "confidence": 1.0,
+        "position": {
+            "top_left": [x1, y1],
+            "top_right": [x2, y1],
+            "bottom_right": [x2, y2],
+            "bottom_left": [x1, y2],
+        },
+    }
+
+
+def parse_bbox_layout(xhtml: bytes, first_page: int, dpi: int, min_chars: int) -> Dict[int, List[Dict]]:
+    """Blocks per page number from ``pdftotext -bbox-layout`` output, for pages with a text layer."""
+    scale = dpi / 72.0
+    pages = {}
+    page_no = first_page
+    for element in ET.fromstring(xhtml).iter():
+        if _local(element.tag) != "page":
+            continue
+        blocks = [_block(line, scale) for line in element.iter() if _local(line.tag) == "line"]
+        blocks = [block for block in blocks if block["text"].strip()]
+        if sum(len(block["text"]) for block in blocks) >= min_chars:
+            pages[page_no] = blocks
+        page_no += 1
+    return pages
+
+
+def extract_text_layer(data: bytes, first_page: int, last_page: int) -> Dict[int, List[Dict]]:
+    """Blocks for each page in ``first_page``..``last_page`` that has a usable text layer.
+
+    Returns ``{}`` when the feature is off or poppler fails, so every page
+    falls back to OCR.
+    """
+    if not settings.pdf_text_layer_enabled:
+        return {}
+    try:
+        # "-" reads the PDF from stdin and writes the layout to stdout
+        completed = subprocess.run(
+            ["pdftotext", "-bbox-layout", "-enc", "UTF-8", "-f", str(first_page), "-l", str(last_page), "-", "-"],
+            input=data, capture_output=True, timeout=TEXT_LAYER_TIMEOUT, check=True,
+        )
+        return parse_bbox_layout(completed.stdout, first_page, settings.pdf_dpi, settings.pdf_text_layer_min_chars)
+    except (OSError, subprocess.SubprocessError, ET.ParseError, ValueError) as e:
+        logger.warning(f"PDF text layer unavailable, using OCR: {e}")
+        return {}
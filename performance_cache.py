@@ -1,10 +1,16 @@
 import os
+import threading
 from ultralytics import YOLO
 import easyocr
 import spacy
-from presidio_analyzer import AnalyzerEngine
 from presidio_anonymizer import AnonymizerEngine
-from pii_detection.indian_recognizers import AadhaarRecognizer, PANRecognizer, IndianPhoneRecognizer
+from importlib.metadata import version as _package_version
+from pii_detection.detector import PIIDetector, build_analyzer
+
+try:
+    presidio_version = _package_version("presidio-analyzer")
+except Exception:
+    presidio_version = None
 
 class ModelCache:
     yolo_model = None
@@ -12,9 +18,16 @@ class ModelCache:
     spacy_nlp = None
     presidio_analyzer = None
     presidio_anonymizer = None
+    pii_detector = None
+    yolo_model_path = None
+    # The Ultralytics predictor keeps per-call state and is not thread-safe
+    yolo_lock = threading.Lock()
+    _lock = threading.RLock()
 
     @classmethod
     def load_yolo(cls):
+        if cls.yolo_model is not None:
+            return
         env_path = os.getenv("YOLO_MODEL_PATH")
         local_path = os.path.join(os.getcwd(), "detector_yolo_1cls.pt")
         if env_path and os.path.exists(env_path):
@@ -24,6 +37,7 @@ class ModelCache:
         else:
             raise FileNotFoundError(f"YOLO model file not found at {env_path} or {local_path}")
         cls.yolo_model = YOLO(model_path)
+        cls.yolo_model_path = model_path
 
     @classmethod
     def load_easyocr(cls):
@@ -32,15 +46,74 @@ class ModelCache:
 
     @classmethod
     def load_spacy(cls):
-        if cls.spacy_nlp is None:
-            cls.spacy_nlp = spacy.load("en_core_web_sm")
+        with cls._lock:
+            if cls.spacy_nlp is None:
+                cls.spacy_nlp = spacy.load("en_core_web_sm")
 
     @classmethod
     def load_presidio(cls):
-        if cls.presidio_analyzer is None:
-            cls.presidio_analyzer = AnalyzerEngine()
-            cls.presidio_analyzer.registry.add_recognizer(AadhaarRecognizer())
-            cls.presidio_analyzer.registry.add_recognizer(PANRecognizer())
-            cls.presidio_analyzer.registry.add_recognizer(IndianPhoneRecognizer())
-        if cls.presidio_anonymizer is None:
-            cls.presidio_anonymizer = AnonymizerEngine()
\ No newline at end of file
+        """Build the Presidio engines on top of the cached spaCy model (no second model)."""
+        with cls._lock:
+            if cls.presidio_analyzer is None:
+                cls.load_spacy()
+                cls.presidio_analyzer = build_analyzer(cls.spacy_nlp)
+            if cls.presidio_anonymizer is None:
+                cls.presidio_anonymizer = AnonymizerEngine()
+
+    @classmethod
+    def load_pii_detector(cls):
+        """Build the shared PIIDetector from the cached spaCy and Presidio engines."""
+        if cls.pii_detector is not None:
+            return
+        with cls._lock:
+            if cls.pii_detector is None:
+                cls.load_spacy()
+                cls.load_presidio()
+                cls.pii_detector = PIIDetector(
+                    nlp=cls.spacy_nlp,
+                    analyzer=cls.presidio_analyzer,
+                    anonymizer=cls.presidio_anonymizer,
+                )
+
+    @classmethod
+    def get_pii_detector(cls):
+        """Return the process-wide PIIDetector, loading it on first use.
+
+        The detector keeps no per-request state, so a single instance is
+        shared by every request handled in this process.
+        """
+        if cls.pii_detector is None:
+            cls.load_pii_detector()
+        return cls.pii_detector
+
+    @classmethod
+    def readiness(cls):
+        """Report which models are loaded and usable."""
+        return {
+            "yolo": cls.yolo_model is not None,
+            "easyocr": cls.easyocr_reader is not None,
+            "spacy": cls.spacy_nlp is not None,
+            "presidio": cls.presidio_analyzer is not None,
+            "pii_detector": cls.pii_detector is not None and cls.pii_detector.is_available,
+        }
+
+    @classmethod
+    def versions(cls):
+        """Identify the loaded models, e.g. for keying cached results."""
+        yolo = None
+        if cls.yolo_model_path:
+            stat = os.stat(cls.yolo_model_path)
+            yolo = f"{os.path.basename(cls.yolo_model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+        spacy_model = None
+        if cls.spacy_nlp is not None:
+            spacy_model = f"{cls.spacy_nlp.meta.get('name')}-{cls.spacy_nlp.meta.get('version')}"
+        return {
+            "yolo": yolo,
+            "easyocr": getattr(easyocr, "__version__", None),
+            "spacy": spacy_model,
+            "presidio": presidio_version,
+        }
+
+    @classmethod
+    def is_ready(cls):
+        return all(cls.readiness().values())
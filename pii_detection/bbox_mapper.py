@@ -13,7 +13,7 @@ def get_subspan_bbox(span_bbox: BBox, span_text_length: int, entity_start: int,
     end_ratio = clamped_end / float(span_text_length)
     x1 = span_bbox.x1 + width * start_ratio
     x2 = span_bbox.x1 + width * end_ratio
-    return BBox(x1=x1, y1=span_bbox.y1, x2=x2, y2=span_bbox.y2)
+    return BBox.model_construct(x1=x1, y1=span_bbox.y1, x2=x2, y2=span_bbox.y2)
 
 def merge_bboxes(bboxes: List[BBox]) -> BBox:
     if not bboxes:
@@ -22,7 +22,7 @@ def merge_bboxes(bboxes: List[BBox]) -> BBox:
     y1 = min(b.y1 for b in bboxes)
     x2 = max(b.x2 for b in bboxes)
     y2 = max(b.y2 for b in bboxes)
-    return BBox(x1=x1, y1=y1, x2=x2, y2=y2)
+    return BBox.model_construct(x1=x1, y1=y1, x2=x2, y2=y2)
 
 def clamp_bbox_to_page(bbox: BBox, page_width: float, page_height: float) -> BBox:
     x1 = max(0.0, min(bbox.x1, page_width))
@@ -1,26 +1,83 @@
+import multiprocessing
 import spacy
-from typing import List, Dict
-from presidio_analyzer import AnalyzerEngine
+import threading
+import time
+from collections import OrderedDict
+from typing import FrozenSet, List, Dict, Optional
+from presidio_analyzer import AnalyzerEngine, RecognizerRegistry
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
 from presidio_anonymizer import AnonymizerEngine
+from config.metrics import observe_skipped, observe_stage, observe_validations
+from config.settings import settings
 from pii_detection.models import TextSpan, DetectedEntity, EntityType
+from pii_detection.layout import layout_units
+from pii_detection.page_text import PageText, page_texts
+from pii_detection.patterns import HEALTHCARE_ENTITY_TYPES, SCANNER, is_medical_number
+from pii_detection.prefilter import ID_REQUIREMENTS, full_plan, plan_detectors
+from pii_detection.resolver import Candidate, resolve
+from pii_detection.validators import CERTAIN, INVALID, UNKNOWN, VALIDATORS, validate_batch
 from .indian_recognizers import (
 	AadhaarRecognizer,
 	PANRecognizer,
 	IndianPhoneRecognizer,
 )
 
+def build_analyzer(nlp) -> AnalyzerEngine:
+	"""Presidio analyzer that shares the given spaCy pipeline instead of loading its own.
+
+	The detector parses each span once and hands the resulting artifacts to
+	``analyze``, so Presidio's NLP engine only wraps ``nlp`` and never runs it
+	on the hot path.
+	"""
+	nlp_engine = SpacyNlpEngine(models=[{"lang_code": "en", "model_name": f"{nlp.lang}_{nlp.meta.get('name')}"}])
+	nlp_engine.nlp = {"en": nlp}
+	analyzer = AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=["en"])
+	# Add custom Indian recognizers
+	analyzer.registry.add_recognizer(AadhaarRecognizer())
+	analyzer.registry.add_recognizer(PANRecognizer())
+	analyzer.registry.add_recognizer(IndianPhoneRecognizer())
+	return analyzer
+
+# Raw detector labels to EntityType values; valid EntityType values map to themselves
+ENTITY_TYPE_MAP = {
+	"PERSON": "NAME",
+	"ORG": "ADDRESS",
+	"GPE": "ADDRESS",
+	"LOC": "ADDRESS",
+	"DATE": "DATE",
+	"CARDINAL": "MEDICAL_RECORD_NUMBER",
+	"QUANTITY": "MEDICAL_RECORD_NUMBER",
+	# Add more mappings as needed
+	**{e.value: e.value for e in EntityType},
+}
+
 class PIIDetector:
-	def __init__(self):
+	# Pipeline components neither NER nor Presidio's recognizers use; they are
+	# skipped when parsing spans. The tagger, attribute_ruler and lemmatizer
+	# stay on because Presidio's context enhancement works on lemmas.
+	NER_UNUSED_COMPONENTS = ("parser", "senter")
+	# Entity types the spaCy NER mapping can produce (see ``_ner_results``)
+	NER_ENTITY_TYPES = frozenset({"NAME", "ADDRESS", "DATE_OF_BIRTH", "MEDICAL_RECORD_NUMBER"})
+	# Subset analyzers kept by ``_analyzer_for``
+	ANALYZER_CACHE_SIZE = 32
+
+	def __init__(self, nlp=None, analyzer=None, anonymizer=None):
+		"""Create a detector.
+
+		Pre-loaded engines (normally from ``ModelCache``) are reused as-is so a
+		single detector can be shared across requests; anything not supplied is
+		built here.
+		"""
 		try:
 			# Initialize spaCy
-			self.nlp = spacy.load("en_core_web_sm")
-			# Initialize Presidio with custom recognizers
-			self.analyzer = AnalyzerEngine()
-			self.anonymizer = AnonymizerEngine()
-			# Add custom Indian recognizers
-			self.analyzer.registry.add_recognizer(AadhaarRecognizer())
-			self.analyzer.registry.add_recognizer(PANRecognizer())
-			self.analyzer.registry.add_recognizer(IndianPhoneRecognizer())
+			self.nlp = nlp if nlp is not None else spacy.load("en_core_web_sm")
+			# Initialize Presidio with custom recognizers on the same spaCy pipeline
+			if analyzer is None:
+				analyzer = build_analyzer(self.nlp)
+			self.analyzer = analyzer
+			self.anonymizer = anonymizer if anonymizer is not None else AnonymizerEngine()
+			self._analyzers = OrderedDict()
+			self._analyzers_lock = threading.Lock()
 			self.is_available = True
 		except (OSError, IOError, SystemExit, Exception) as e:
 			self.nlp = None
@@ -28,36 +85,202 @@ class PIIDetector:
 			self.anonymizer = None
 			self.is_available = False
     
-	def detect_entities(self, spans: List[TextSpan], entities_to_detect: List[str]) -> List[DetectedEntity]:
+	def detect_entities(self, spans: List[TextSpan], entities_to_detect: List[str], mode: str = None) -> List[DetectedEntity]:
 		"""Detect PII entities from text spans."""
+		return self.detect_entities_many([spans], entities_to_detect, mode)[0]
+
+	def detect_entities_many(self, span_groups: List[List[TextSpan]], entities_to_detect: List[str], mode: str = None) -> List[List[DetectedEntity]]:
+		"""Detect PII entities for several documents at once.
+
+		In ``span`` mode (the default, see ``settings.pii_analysis_mode``) each
+		span is analyzed on its own. In ``page`` mode the spans of each page
+		are joined in reading order and analyzed once, so context words in
+		neighbouring blocks count, and every entity is mapped back to its
+		source spans with a box around just its characters. ``line`` mode
+		does the same per reconstructed line or key-value pair (see
+		``layout``), which catches IDs and names split across OCR blocks
+		while keeping unrelated lines apart.
+
+		Unless ``settings.pii_prefilter_enabled`` is off, ``prefilter`` first
+		decides which detectors each text can need, so form labels skip
+		NER and texts without enough digits skip the ID recognizers. spaCy
+		parses the remaining texts of every group in one batched ``nlp.pipe``
+		call and each parse is shared by Presidio and the NER mapping;
+		returns one entity list per group, in order.
+		"""
 		if not self.is_available:
-			return []
-		
-		detected_entities = []
-        
-		for span in spans:
-			# Run Presidio analysis
-			presidio_results = self.analyzer.analyze(
-				text=span.text,
-				entities=entities_to_detect,
-				language="en"
-			)
-            
-			# Run spaCy NER
-			spacy_results = self._run_spacy_ner(span.text)
-            
+			return [[] for _ in span_groups]
+
+		mode = mode or settings.pii_analysis_mode
+		if mode == "page":
+			unit_groups = [page_texts(spans) for spans in span_groups]
+			merge = self._merge_page_results
+		elif mode == "line":
+			unit_groups = [layout_units(spans) for spans in span_groups]
+			merge = self._merge_page_results
+		else:
+			unit_groups = span_groups
+			merge = self._merge_results
+
+		# Only the recognizers and passes the requested entities need
+		wanted = frozenset(entities_to_detect)
+		analyzer = self._analyzer_for(wanted)
+		supported = set(analyzer.get_supported_entities("en")) if analyzer is not None else set()
+		presidio_entities = [e for e in entities_to_detect if e in supported]
+		needs_ner = bool(wanted & self.NER_ENTITY_TYPES) or any(e not in ID_REQUIREMENTS for e in presidio_entities)
+		needs_rules = bool(wanted.intersection(HEALTHCARE_ENTITY_TYPES))
+
+		texts = [unit.text for units in unit_groups for unit in units]
+		if settings.pii_prefilter_enabled:
+			plans = plan_detectors(texts, presidio_entities, ner=needs_ner, rules=needs_rules)
+		else:
+			plans = full_plan(texts, presidio_entities, ner=needs_ner, rules=needs_rules)
+
+		started = time.perf_counter()
+		docs = [None] * len(texts)
+		parsed = [i for i, plan in enumerate(plans) if plan.ner]
+		for i, doc in zip(parsed, self._ner_docs([texts[i] for i in parsed])):
+			docs[i] = doc
+		# Texts only Presidio analyzes still need lemmas for its context
+		# enhancement, so they are parsed too, just without NER
+		tagged = [i for i, plan in enumerate(plans) if not plan.ner and plan.presidio_entities]
+		for i, doc in zip(tagged, self._ner_docs([texts[i] for i in tagged], ner=False)):
+			docs[i] = doc
+		observe_stage("spacy", time.perf_counter() - started)
+		to_artifacts = getattr(self.analyzer.nlp_engine, "_doc_to_nlp_artifact", None)
+		all_types = wanted.issuperset(e.value for e in EntityType)
+
+		presidio_seconds = 0.0
+		presidio_calls = 0
+		index = 0
+		analyzed = []  # (group, unit, presidio results, spaCy results)
+		for group, units in enumerate(unit_groups):
+			for unit in units:
+				plan, doc = plans[index], docs[index]
+				index += 1
+				presidio_results = []
+				presidio_entities = plan.presidio_entities
+				if plan.ner_entities and doc.ents:
+					presidio_entities = presidio_entities + plan.ner_entities
+				if presidio_entities:
+					# Run Presidio analysis on the shared parse
+					started = time.perf_counter()
+					presidio_results = analyzer.analyze(
+						text=unit.text,
+						entities=presidio_entities,
+						language="en",
+						nlp_artifacts=to_artifacts(doc, "en") if to_artifacts is not None else None
+					)
+					presidio_seconds += time.perf_counter() - started
+					presidio_calls += 1
+
+				spacy_results = self._ner_results(doc) if plan.ner else []
+				if plan.rules:
+					spacy_results.extend(self._detect_healthcare_patterns(unit.text))
+				if not all_types:
+					spacy_results = [r for r in spacy_results if self._map_entity_type(r["entity_type"]) in wanted]
+				analyzed.append((group, unit, presidio_results, spacy_results))
+
+		if settings.pii_validators_enabled:
+			self._validate_ids(analyzed)
+
+		results = [[] for _ in unit_groups]
+		for group, unit, presidio_results, spacy_results in analyzed:
 			# Merge results
-			merged_entities = self._merge_results(
-				span, presidio_results, spacy_results
-			)
-            
-			detected_entities.extend(merged_entities)
-        
-		return detected_entities
+			results[group].extend(merge(unit, presidio_results, spacy_results))
+
+		# One observation per call keeps the per-span loop cheap
+		observe_stage("presidio", presidio_seconds)
+		if settings.pii_prefilter_enabled:
+			observe_skipped({
+				"presidio": len(plans) - presidio_calls,
+				"ner": sum(1 for plan in plans if not plan.ner),
+				"rules": sum(1 for plan in plans if not plan.rules),
+			})
+		return results
+
+	def _validate_ids(self, analyzed: list):
+		"""Check every Aadhaar, PAN and phone candidate of the call in one batch.
+
+		Candidates that fail their checksum or structure are removed; those
+		that prove themselves get the maximum score and ``certain`` metadata,
+		which lets the LLM validator skip them.
+		"""
+		candidates = [
+			(unit.text, presidio_results, result)
+			for _, unit, presidio_results, _ in analyzed
+			for result in presidio_results
+			if result.entity_type in VALIDATORS
+		]
+		if not candidates:
+			return
+		verdicts = validate_batch(
+			[result.entity_type for _, _, result in candidates],
+			[text[result.start:result.end] for text, _, result in candidates]
+		)
+		for (_, presidio_results, result), verdict in zip(candidates, verdicts):
+			if verdict == INVALID:
+				presidio_results.remove(result)
+			elif verdict == CERTAIN:
+				result.score = 1.0
+				result.recognition_metadata["certain"] = True
+		observe_validations({
+			"invalid": int((verdicts == INVALID).sum()),
+			"unknown": int((verdicts == UNKNOWN).sum()),
+			"certain": int((verdicts == CERTAIN).sum()),
+		})
+
+	def _analyzer_for(self, entities: FrozenSet[str]) -> Optional[AnalyzerEngine]:
+		"""Presidio analyzer whose registry holds only the recognizers for ``entities``.
+
+		Built once per entity subset (least recently used subsets are dropped
+		past ``ANALYZER_CACHE_SIZE``) and sharing the recognizers and NLP
+		engine of ``self.analyzer``. None when no recognizer applies.
+		"""
+		with self._analyzers_lock:
+			if entities in self._analyzers:
+				self._analyzers.move_to_end(entities)
+				return self._analyzers[entities]
+		recognizers = [r for r in self.analyzer.registry.recognizers if entities.intersection(r.supported_entities)]
+		analyzer = None
+		if recognizers:
+			registry = RecognizerRegistry(recognizers=recognizers, supported_languages=["en"])
+			analyzer = AnalyzerEngine(registry=registry, nlp_engine=self.analyzer.nlp_engine, supported_languages=["en"])
+		with self._analyzers_lock:
+			self._analyzers[entities] = analyzer
+			while len(self._analyzers) > self.ANALYZER_CACHE_SIZE:
+				self._analyzers.popitem(last=False)
+		return analyzer
+
+	def _ner_docs(self, texts: List[str], ner: bool = True) -> list:
+		"""Parse ``texts`` in batches, skipping components nothing downstream uses.
+
+		With ``ner`` off the entity recognizer is skipped as well; the tagger
+		and lemmatizer still run for Presidio's context enhancement.
+
+		Short OCR fragments are dominated by per-call overhead, so one
+		``nlp.pipe`` over all of them is several times faster than calling
+		``nlp`` per text. Very large batches may be split across
+		``spacy_n_process`` processes (not from inside a daemonic worker,
+		which cannot have children).
+		"""
+		if not texts:
+			return []
+		unused = self.NER_UNUSED_COMPONENTS if ner else self.NER_UNUSED_COMPONENTS + ("ner",)
+		disable = [name for name in self.nlp.pipe_names if name in unused]
+		n_process = 1
+		if settings.spacy_n_process > 1 and len(texts) >= settings.spacy_multiprocess_min_texts \
+				and not multiprocessing.current_process().daemon:
+			n_process = settings.spacy_n_process
+		return list(self.nlp.pipe(
+			texts,
+			batch_size=max(1, settings.spacy_batch_size),
+			disable=disable,
+			n_process=n_process,
+		))
     
-	def _run_spacy_ner(self, text: str) -> List[Dict]:
-		"""Run spaCy NER and return structured results."""
-		doc = self.nlp(text)
+	def _ner_results(self, doc) -> List[Dict]:
+		"""Structured results for the NER entities of a parsed text."""
 		results = []
         
 		for ent in doc.ents:
@@ -82,149 +305,102 @@ class PIIDetector:
 					"text": ent.text
 				})
         
-		# Additional pattern-based detection for healthcare entities
-		results.extend(self._detect_healthcare_patterns(text))
-        
 		return results
     
-	def _merge_results(self, span: TextSpan, presidio_results, spacy_results) -> List[DetectedEntity]:
-		"""Merge Presidio and spaCy results into DetectedEntity objects."""
-		entities = []
-        
+	def _candidates(self, text: str, presidio_results, spacy_results) -> List[Candidate]:
+		"""Presidio and spaCy results for ``text`` with supported types, overlaps resolved."""
+		candidates = []
 		# Process Presidio results
 		for result in presidio_results:
 			mapped_type = self._map_entity_type(result.entity_type)
 			if mapped_type is None:
 				continue
-			original_value = span.text[result.start:result.end]
-			masked_value = self._mask_value(original_value, mapped_type)
-			entity = DetectedEntity(
-				type=EntityType(mapped_type),
-				value=original_value,
-				redacted_value=masked_value,
-				confidence=result.score,
-				method="rule",
-				page_no=span.page_no,
-				bbox=span.bbox,  # Use span's bbox for now
-				source_span_ids=[span.span_id],
-				language=span.language,
-				validations={
-					"regex_match": True,
-					"context_score": result.score
-				}
-			)
-			entities.append(entity)
+			validations = {"regex_match": True, "context_score": result.score}
+			if (result.recognition_metadata or {}).get("certain"):
+				validations["certain"] = True
+			candidates.append(Candidate(
+				mapped_type, result.start, result.end, text[result.start:result.end], result.score, "rule",
+				validations
+			))
 		# Process spaCy results
 		for result in spacy_results:
 			mapped_type = self._map_entity_type(result["entity_type"])
 			if mapped_type is None:
 				continue
-			original_value = result["text"]
-			masked_value = self._mask_value(original_value, mapped_type)
-			entity = DetectedEntity(
-				type=EntityType(mapped_type),
-				value=original_value,
-				redacted_value=masked_value,
-				confidence=result["score"],
-				method="ner",
+			candidates.append(Candidate(
+				mapped_type, result["start"], result["end"], result["text"], result["score"], "ner",
+				{"spacy_label": True}
+			))
+		if settings.pii_resolve_overlaps:
+			candidates = resolve(candidates, text, settings.pii_entity_precedence, settings.pii_score_fusion)
+		return candidates
+
+	def _merge_results(self, span: TextSpan, presidio_results, spacy_results) -> List[DetectedEntity]:
+		"""Merge Presidio and spaCy results into DetectedEntity objects."""
+		return [
+			# Every field is already of its declared type; skip pydantic validation
+			DetectedEntity.model_construct(
+				type=EntityType(candidate.entity_type),
+				value=candidate.value,
+				redacted_value=self._mask_value(candidate.value, candidate.entity_type),
+				confidence=float(candidate.score),
+				method=candidate.method,
 				page_no=span.page_no,
-				bbox=span.bbox,
+				bbox=span.bbox,  # Use span's bbox for now
 				source_span_ids=[span.span_id],
 				language=span.language,
-				validations={
-					"spacy_label": True
-				}
+				validations=candidate.validations
 			)
-			entities.append(entity)
+			for candidate in self._candidates(span.text, presidio_results, spacy_results)
+		]
+
+	def _merge_page_results(self, page: PageText, presidio_results, spacy_results) -> List[DetectedEntity]:
+		"""Like ``_merge_results`` for a joined page, locating each entity in its source spans."""
+		entities = []
+		for candidate in self._candidates(page.text, presidio_results, spacy_results):
+			located = page.locate(candidate.start, candidate.end)
+			if located is None:
+				continue
+			sources, bbox = located
+			entities.append(DetectedEntity.model_construct(
+				type=EntityType(candidate.entity_type),
+				value=candidate.value,
+				redacted_value=self._mask_value(candidate.value, candidate.entity_type),
+				confidence=float(candidate.score),
+				method=candidate.method,
+				page_no=page.page_no,
+				bbox=bbox,
+				source_span_ids=[span.span_id for span in sources],
+				language=sources[0].language,
+				validations=candidate.validations
+			))
 		return entities
 
 	def _map_entity_type(self, entity_type: str) -> str:
 		"""Map raw entity type to supported EntityType values."""
-		mapping = {
-			"PERSON": "NAME",
-			"ORG": "ADDRESS",
-			"GPE": "ADDRESS",
-			"LOC": "ADDRESS",
-			"DATE": "DATE",
-			"CARDINAL": "MEDICAL_RECORD_NUMBER",
-			"QUANTITY": "MEDICAL_RECORD_NUMBER",
-			# Add more mappings as needed
-		}
-		# If already a valid EntityType, return as is
-		valid_types = [e.value for e in EntityType]
-		if entity_type in valid_types:
-			return entity_type
-		return mapping.get(entity_type)
-        
-		return entities
+		return ENTITY_TYPE_MAP.get(entity_type)
     
 	def _is_medical_number(self, text: str) -> bool:
 		"""Check if a number pattern looks like a medical ID."""
-		import re
-		# Simple heuristic: alphanumeric patterns that could be medical IDs
-		# More restrictive - must contain at least some digits
-		cleaned_text = text.upper().replace(' ', '').replace('-', '')
-        
-		# Must have at least some digits to be a medical ID
-		if not re.search(r'\d', cleaned_text):
-			return False
-            
-		patterns = [
-			r'^[A-Z]{2,4}[0-9]{6,12}$',  # Letters followed by numbers (MR123456789)
-			r'^[0-9]{8,15}$',             # All numbers
-			r'^[A-Z]{3}[0-9]{3}[A-Z]{3}[0-9]{3}$',  # Mixed pattern (ABC123DEF456)
-			r'^[A-Z0-9]{6,15}$'           # General alphanumeric (but must have digits from above check)
-		]
-		return any(re.match(pattern, cleaned_text) for pattern in patterns) and len(cleaned_text) >= 6
+		return is_medical_number(text)
     
 	def _detect_healthcare_patterns(self, text: str) -> List[Dict]:
-		"""Detect healthcare-specific patterns in text."""
-		import re
+		"""Detect healthcare-specific patterns in text.
+
+		Reads the shared rule scan, which Presidio's Indian recognizers have
+		usually already run on this exact text.
+		"""
+		matches = SCANNER.scan(text)
 		results = []
-        
-		# Medical record number patterns
-		mrn_patterns = [
-			r'\b(?:MRN|Medical Record|Patient ID|Chart #):\s*([A-Z0-9-]{6,15})',
-			r'\b([A-Z]{2,3}\d{6,10})\b',  # Common MRN format
-		]
-        
-		# Insurance number patterns
-		insurance_patterns = [
-			r'\b(?:Insurance|Policy):\s*([A-Z0-9-]{8,20})',
-			r'\b([A-Z]{3}\d{6,12})\b',  # Common insurance format
-		]
-        
-		# Medical condition keywords
-		condition_keywords = [
-			r'\b(?:diagnosed with|suffers from|condition:|history of)\s+([A-Za-z\s,]+?)(?:\.|,|$|\s+and|\s+or)',
-			r'\b(diabetes(?:\s+mellitus)?(?:\s+type\s+\d+)?|hypertension|asthma|cancer|depression|anxiety|arthritis)\b',
-		]
-        
-		# Medication patterns
-		medication_patterns = [
-			r'\b(?:prescribed|taking|medication:|drug:)\s+([A-Za-z\s]{3,30})',
-			r'\b(aspirin|ibuprofen|metformin|lisinopril|atorvastatin)\b',
-		]
-        
-		# Process all patterns
-		pattern_configs = [
-			(mrn_patterns, "MEDICAL_RECORD_NUMBER"),
-			(insurance_patterns, "INSURANCE_NUMBER"),
-			(condition_keywords, "MEDICAL_CONDITION"),
-			(medication_patterns, "MEDICATION"),
-		]
-        
-		for patterns, entity_type in pattern_configs:
-			for pattern in patterns:
-				for match in re.finditer(pattern, text, re.IGNORECASE):
-					results.append({
-						"entity_type": entity_type,
-						"start": match.start(),
-						"end": match.end(),
-						"score": 0.8,
-						"text": match.group(1) if match.groups() else match.group(0)
-					})
-        
+		for entity_type in HEALTHCARE_ENTITY_TYPES:
+			for match in matches.get(entity_type, ()):
+				results.append({
+					"entity_type": entity_type,
+					"start": match.value_start,
+					"end": match.value_end,
+					"score": match.rule.score,
+					"text": match.value
+				})
 		return results
     
 	def _mask_value(self, value: str, entity_type: str) -> str:
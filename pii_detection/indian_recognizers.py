@@ -1,28 +1,71 @@
-from presidio_analyzer import Pattern, PatternRecognizer
+from presidio_analyzer import EntityRecognizer, Pattern, PatternRecognizer, RecognizerResult
 
-class AadhaarRecognizer(PatternRecognizer):
-    PATTERNS = [
-        Pattern("Aadhaar (strong)", r"\b[2-9]\d{3}[\s-]?\d{4}[\s-]?\d{4}\b", 0.9),
-        Pattern("Aadhaar (medium)", r"\b(?![01]|0000|1111|2222|3333|4444|5555|6666|7777|8888|9999)\d{4}[\s-]?\d{4}[\s-]?\d{4}\b", 0.7),
-    ]
+from .patterns import AADHAAR_RULES, PAN_RULES, PHONE_RULES, SCANNER
+
+class ScannedPatternRecognizer(PatternRecognizer):
+    """PatternRecognizer whose matches come from the shared ``patterns.SCANNER``.
+
+    Results are built exactly as ``PatternRecognizer`` builds them, but the
+    text is scanned once for every rule-based entity instead of once per
+    recognizer and pattern.
+    """
+    RULES = []
+
+    def __init__(self, supported_entity, context):
+        patterns = [Pattern(rule.name, rule.regex, rule.score) for rule in self.RULES]
+        super().__init__(supported_entity=supported_entity, patterns=patterns, context=context, supported_language="en")
+
+    def analyze(self, text, entities, nlp_artifacts=None, regex_flags=None):
+        flags = regex_flags if regex_flags else self.global_regex_flags
+        if flags != self.global_regex_flags:
+            return super().analyze(text, entities, nlp_artifacts, regex_flags)
+        results = []
+        for match in SCANNER.scan(text).get(self.supported_entities[0], ()):
+            current_match = text[match.start:match.end]
+            if current_match == "":
+                continue
+            score = match.rule.score
+            validation_result = self.validate_result(current_match)
+            description = self.build_regex_explanation(
+                self.name, match.rule.name, match.rule.regex, score, validation_result, flags
+            )
+            result = RecognizerResult(
+                entity_type=self.supported_entities[0],
+                start=match.start,
+                end=match.end,
+                score=score,
+                analysis_explanation=description,
+                recognition_metadata={
+                    RecognizerResult.RECOGNIZER_NAME_KEY: self.name,
+                    RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: self.id,
+                },
+            )
+            if validation_result is not None:
+                result.score = EntityRecognizer.MAX_SCORE if validation_result else EntityRecognizer.MIN_SCORE
+            if self.invalidate_result(current_match):
+                result.score = EntityRecognizer.MIN_SCORE
+            if result.score > EntityRecognizer.MIN_SCORE:
+                results.append(result)
+            description.score = result.score
+        return EntityRecognizer.remove_duplicates(results)
+
+class AadhaarRecognizer(ScannedPatternRecognizer):
+    RULES = AADHAAR_RULES
+    PATTERNS = [Pattern(rule.name, rule.regex, rule.score) for rule in AADHAAR_RULES]
     CONTEXT = ["aadhaar", "adhar", "aadhaar card", "uid", "unique", "identification"]
     def __init__(self):
-        super().__init__(supported_entity="AADHAAR", patterns=self.PATTERNS, context=self.CONTEXT, supported_language="en")
+        super().__init__(supported_entity="AADHAAR", context=self.CONTEXT)
 
-class PANRecognizer(PatternRecognizer):
-    PATTERNS = [
-        Pattern("PAN (strong)", r"\b[A-Z]{5}\d{4}[A-Z]\b", 0.9),
-    ]
+class PANRecognizer(ScannedPatternRecognizer):
+    RULES = PAN_RULES
+    PATTERNS = [Pattern(rule.name, rule.regex, rule.score) for rule in PAN_RULES]
     CONTEXT = ["pan", "permanent account number", "tax", "income tax", "financial", "account"]
     def __init__(self):
-        super().__init__(supported_entity="PAN", patterns=self.PATTERNS, context=self.CONTEXT, supported_language="en")
-
-class IndianPhoneRecognizer(PatternRecognizer):
-    PATTERNS = [
-        Pattern("Phone (strong international)", r"\+91[-\s]?[6-9]\d{9}\b", 0.9),
-        Pattern("Phone (strong mobile)", r"\b[6-9]\d{9}\b", 0.8),
-        Pattern("Phone (landline with area code)", r"\b0\d{2,4}[-\s]?\d{6,8}\b", 0.7),
-    ]
+        super().__init__(supported_entity="PAN", context=self.CONTEXT)
+
+class IndianPhoneRecognizer(ScannedPatternRecognizer):
+    RULES = PHONE_RULES
+    PATTERNS = [Pattern(rule.name, rule.regex, rule.score) for rule in PHONE_RULES]
     CONTEXT = ["phone", "mobile", "contact", "number"]
     def __init__(self):
-        super().__init__(supported_entity="PHONE", patterns=self.PATTERNS, context=self.CONTEXT, supported_language="en")
+        super().__init__(supported_entity="PHONE", context=self.CONTEXT)
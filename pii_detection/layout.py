@@ -0,0 +1,188 @@
+"""
+Layout analysis of OCR blocks: lines and key-value pairs.
+
+EasyOCR often splits what a reader sees as one piece of text into several
+blocks: the groups of an Aadhaar number, or a "Name:" label and the name
+next to or below it. Analyzed block by block, neither half is PII.
+
+``layout_units`` rebuilds the page structure from the block boxes:
+
+* blocks are bucketed into a uniform ``GridIndex`` (cells about one text
+  line high), so each block only looks at the few blocks near it instead
+  of every other block on the page;
+* each block is linked to its nearest right-hand neighbour on the same row
+  when the gap is small (``LINE_GAP`` line heights), and the chains of links
+  are the lines;
+* a line ending in a label ("Name:", "DOB") is paired with its value: the
+  next block on the same row within ``KEY_VALUE_GAP`` line heights, or else
+  the line just below that starts under the label.
+
+Every line or key-value pair becomes a ``PageText`` unit, so entities found
+in the joined text map back to their source spans.
+"""
+from collections import defaultdict
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import TextSpan
+from .page_text import NON_TEXT_SPANS, PageText
+from .prefilter import FORM_LABELS
+
+# Largest horizontal gap, in line heights, between blocks of one line
+LINE_GAP = 1.5
+# Largest gap between a label and a value on the same row
+KEY_VALUE_GAP = 8.0
+# Largest vertical gap between a label and a value on the line below
+VALUE_BELOW_GAP = 1.0
+# Blocks share a row when their vertical extents overlap by this fraction
+ROW_OVERLAP = 0.5
+
+
+def _height(span: TextSpan) -> float:
+    return max(span.bbox.y2 - span.bbox.y1, 1.0)
+
+
+def _row_overlap(a: TextSpan, b: TextSpan) -> bool:
+    overlap = min(a.bbox.y2, b.bbox.y2) - max(a.bbox.y1, b.bbox.y1)
+    return overlap >= ROW_OVERLAP * min(_height(a), _height(b))
+
+
+def is_label(text: str) -> bool:
+    stripped = text.strip()
+    return stripped.endswith(":") or stripped.strip(" :.-*#").lower() in FORM_LABELS
+
+
+class GridIndex:
+    """Uniform grid over block boxes for neighbourhood queries.
+
+    A box is stored in every cell it touches; ``query`` returns the indices
+    of boxes touching any cell of a region, a superset of those intersecting it.
+    """
+
+    def __init__(self, spans: List[TextSpan], cell_size: float):
+        self.spans = spans
+        self.cell = max(cell_size, 1.0)
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, span in enumerate(spans):
+            for key in self._keys(span.bbox.x1, span.bbox.y1, span.bbox.x2, span.bbox.y2):
+                self._cells[key].append(i)
+
+    def _keys(self, x1: float, y1: float, x2: float, y2: float) -> Iterable[Tuple[int, int]]:
+        cell = self.cell
+        for cx in range(int(x1 // cell), int(x2 // cell) + 1):
+            for cy in range(int(y1 // cell), int(y2 // cell) + 1):
+                yield cx, cy
+
+    def query(self, x1: float, y1: float, x2: float, y2: float) -> Set[int]:
+        found: Set[int] = set()
+        for key in self._keys(x1, y1, x2, y2):
+            found.update(self._cells.get(key, ()))
+        return found
+
+
+def _right_neighbours(index: GridIndex, i: int, max_gap: float) -> List[Tuple[float, int]]:
+    """``(gap, j)`` for blocks on the row of block ``i`` starting to its right within ``max_gap`` heights."""
+    span = index.spans[i]
+    reach = max_gap * _height(span)
+    center = (span.bbox.x1 + span.bbox.x2) / 2
+    neighbours = []
+    for j in index.query(span.bbox.x2 - reach, span.bbox.y1, span.bbox.x2 + reach, span.bbox.y2):
+        other = index.spans[j]
+        gap = other.bbox.x1 - span.bbox.x2
+        if j != i and other.bbox.x1 > center and gap <= reach and _row_overlap(span, other):
+            neighbours.append((max(gap, 0.0), j))
+    return neighbours
+
+
+def _line_indices(index: GridIndex) -> List[List[int]]:
+    count = len(index.spans)
+    links = sorted(
+        (gap, i, j)
+        for i in range(count)
+        for gap, j in _right_neighbours(index, i, LINE_GAP)
+    )
+    successor: Dict[int, int] = {}
+    predecessor: Dict[int, int] = {}
+    for _, i, j in links:
+        if i not in successor and j not in predecessor:
+            successor[i] = j
+            predecessor[j] = i
+    lines = []
+    for i in range(count):
+        if i in predecessor:
+            continue
+        line = [i]
+        while line[-1] in successor:
+            line.append(successor[line[-1]])
+        lines.append(line)
+    spans = index.spans
+    lines.sort(key=lambda line: (min(spans[k].bbox.y1 for k in line), spans[line[0]].bbox.x1))
+    return lines
+
+
+def build_lines(spans: List[TextSpan]) -> List[List[TextSpan]]:
+    """Group blocks into lines, each left to right, lines top to bottom.
+
+    Candidate links are taken shortest gap first, so each block keeps its
+    nearest neighbour on either side.
+    """
+    if not spans:
+        return []
+    index = GridIndex(spans, median(_height(s) for s in spans))
+    return [[spans[i] for i in line] for line in _line_indices(index)]
+
+
+def _value_for(label: int, line_of: List[int], lines: List[List[int]], index: GridIndex) -> Optional[int]:
+    """Line holding the value of the label block ``label`` (the last block of its line)."""
+    spans = index.spans
+    own = line_of[label]
+    beside = [(gap, line_of[j]) for gap, j in _right_neighbours(index, label, KEY_VALUE_GAP) if line_of[j] != own]
+    if beside:
+        return min(beside)[1]
+    box = spans[label].bbox
+    height = _height(spans[label])
+    below = []
+    for j in index.query(box.x1, box.y2, box.x2 + KEY_VALUE_GAP * height, box.y2 + VALUE_BELOW_GAP * height):
+        other = spans[j].bbox
+        k = line_of[j]
+        # The value line must start under the label, not merely extend beneath it
+        if k != own and lines[k][0] == j and other.y1 >= box.y1 + height / 2 \
+                and box.x1 - height <= other.x1 <= box.x2 + KEY_VALUE_GAP * height:
+            below.append((other.y1 - box.y2, other.x1, k))
+    return min(below)[2] if below else None
+
+
+def layout_units(spans: List[TextSpan]) -> List[PageText]:
+    """One ``PageText`` per line or key-value pair, page by page in reading order."""
+    by_page: Dict[int, List[TextSpan]] = {}
+    for span in spans:
+        if span.text and span.text not in NON_TEXT_SPANS:
+            by_page.setdefault(span.page_no, []).append(span)
+
+    units = []
+    for page_no in sorted(by_page):
+        page_spans = by_page[page_no]
+        index = GridIndex(page_spans, median(_height(s) for s in page_spans))
+        lines = _line_indices(index)
+        line_of = [0] * len(page_spans)
+        for k, line in enumerate(lines):
+            for i in line:
+                line_of[i] = k
+
+        value_of: Dict[int, int] = {}
+        claimed: Set[int] = set()
+        for k, line in enumerate(lines):
+            if k in claimed or not is_label(page_spans[line[-1]].text):
+                continue
+            value = _value_for(line[-1], line_of, lines, index)
+            if value is None or value in claimed or value in value_of or is_label(page_spans[lines[value][0]].text):
+                continue
+            value_of[k] = value
+            claimed.add(value)
+
+        for k, line in enumerate(lines):
+            if k in claimed:
+                continue
+            grouped = [[page_spans[i] for i in group] for group in ([line, lines[value_of[k]]] if k in value_of else [line])]
+            units.append(PageText(page_no, [s for group in grouped for s in group], grouped))
+    return units
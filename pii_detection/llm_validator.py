@@ -2,22 +2,42 @@ from __future__ import annotations
 import json
 import logging
 import re
+import time
 from typing import List, Dict, Any, Tuple
 import anyio
 import google.generativeai as genai
+from config.metrics import LLM_CALLS, observe_stage
 from .models import DetectedEntity
 
 class LLMValidator:
     def __init__(self, api_key: str):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel("gemini-2.5-flash")
+        # Calls of the last validate_entities that timed out or errored
+        self.failed_calls = 0
 
     async def validate_entities(self, entities: List[DetectedEntity], context_text: str, detector=None) -> Tuple[List[DetectedEntity], List[Dict[str, Any]]]:
+        """Validate ``entities`` with one LLM call each.
+
+        An entity whose call times out or errors is kept unvalidated rather
+        than reported as a false positive; ``failed_calls`` counts them so
+        callers can tell a partial validation from a complete one.
+        """
         validated_entities = []
         false_positives = []
+        self.failed_calls = 0
         for entity in entities:
+            if entity.validations.get("certain"):
+                # Proven by a checksum or numbering-plan check; no call needed
+                LLM_CALLS.labels("skipped").inc()
+                validated_entities.append(entity)
+                continue
             context = self._build_context(entity, context_text)
             validation_result = await self._validate_with_llm(entity, context)
+            if validation_result.get("failed"):
+                self.failed_calls += 1
+                validated_entities.append(entity)
+                continue
             entity.validations["llm_contextual_score"] = validation_result["confidence"]
             corrected_type = validation_result.get("corrected_type")
             corrected_value = validation_result.get("corrected_value")
@@ -50,11 +70,15 @@ class LLMValidator:
             f"Detected Entity: {entity.value} (type: {entity.type})\n\n"
             "Respond ONLY with minified JSON object with keys: confidence (0..1), corrected_type (optional), corrected_value (optional). Do NOT include reasoning."
         )
+        started = time.perf_counter()
         try:
             with anyio.move_on_after(20) as cancel_scope:
                 response = await anyio.to_thread.run_sync(lambda: self.model.generate_content(prompt))
+            observe_stage("llm", time.perf_counter() - started)
             if cancel_scope.cancel_called:
+                LLM_CALLS.labels("timeout").inc()
                 raise TimeoutError("LLM validation timed out.")
+            LLM_CALLS.labels("ok").inc()
             response_text = getattr(response, "text", None) or ""
             clean = response_text.strip()
             clean = re.sub(r"^```(?:json)?\s*", "", clean, flags=re.IGNORECASE)
@@ -69,5 +93,9 @@ class LLMValidator:
             if "reasoning" in result:
                 del result["reasoning"]
             return result
+        except TimeoutError:
+            return {"confidence": 0.0, "failed": True}
         except Exception as e:
-            return {"confidence": 0.0}
+            LLM_CALLS.labels("error").inc()
+            logging.warning(f"LLM validation call failed: {e}")
+            return {"confidence": 0.0, "failed": True}
@@ -0,0 +1,89 @@
+"""
+Page-level text for PII analysis.
+
+``PageText`` joins the text spans of one page in reading order (spans on the
+same line separated by a space, lines by a newline) and keeps an offset index
+so that a character range found in the joined text can be mapped back to the
+spans it came from and to a box covering just those characters.
+"""
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from .bbox_mapper import get_subspan_bbox, merge_bboxes
+from .models import BBox, TextSpan
+
+# Spans that carry a detection rather than text (YOLO signature boxes)
+NON_TEXT_SPANS = {"<signature>"}
+
+
+def reading_order(spans: List[TextSpan]) -> List[List[TextSpan]]:
+    """Group spans into lines top to bottom, each line sorted left to right.
+
+    A span joins the current line when its vertical centre falls inside the
+    vertical extent of the line's first span.
+    """
+    lines = []
+    for span in sorted(spans, key=lambda s: ((s.bbox.y1 + s.bbox.y2) / 2, s.bbox.x1)):
+        center = (span.bbox.y1 + span.bbox.y2) / 2
+        if lines and lines[-1][0] <= center <= lines[-1][1]:
+            lines[-1][2].append(span)
+        else:
+            lines.append([span.bbox.y1, span.bbox.y2, [span]])
+    return [sorted(line, key=lambda s: s.bbox.x1) for _, _, line in lines]
+
+
+class PageText:
+    """Text of several spans joined line by line, with an offset index back to the spans.
+
+    ``lines`` gives the grouping and order directly (see ``layout``);
+    otherwise all text spans are grouped with ``reading_order``.
+    """
+
+    def __init__(self, page_no: int, spans: List[TextSpan], lines: Optional[List[List[TextSpan]]] = None):
+        self.page_no = page_no
+        self.spans: List[TextSpan] = []
+        self.starts: List[int] = []
+        parts = []
+        offset = 0
+        if lines is None:
+            lines = reading_order([s for s in spans if s.text and s.text not in NON_TEXT_SPANS])
+        for line_no, line in enumerate(lines):
+            for i, span in enumerate(line):
+                if line_no or i:
+                    separator = " " if i else "\n"
+                    parts.append(separator)
+                    offset += len(separator)
+                self.spans.append(span)
+                self.starts.append(offset)
+                parts.append(span.text)
+                offset += len(span.text)
+        self.text = "".join(parts)
+
+    def locate(self, start: int, end: int) -> Optional[Tuple[List[TextSpan], BBox]]:
+        """Spans overlapping ``text[start:end]`` and the box of just those characters.
+
+        Returns None when the range only covers separators.
+        """
+        first = max(0, bisect_right(self.starts, start) - 1)
+        sources, boxes = [], []
+        for span, span_start in zip(self.spans[first:], self.starts[first:]):
+            if span_start >= end:
+                break
+            local_start = max(start, span_start) - span_start
+            local_end = min(end, span_start + len(span.text)) - span_start
+            if local_end <= local_start:
+                continue
+            sources.append(span)
+            boxes.append(get_subspan_bbox(span.bbox, len(span.text), local_start, local_end))
+        if not sources:
+            return None
+        return sources, merge_bboxes(boxes)
+
+
+def page_texts(spans: List[TextSpan]) -> List[PageText]:
+    """One ``PageText`` per page (in page order) that has any text."""
+    by_page = {}
+    for span in spans:
+        by_page.setdefault(span.page_no, []).append(span)
+    pages = (PageText(page_no, by_page[page_no]) for page_no in sorted(by_page))
+    return [page for page in pages if page.text]
@@ -0,0 +1,112 @@
+"""
+Rule-based PII patterns, compiled once and scanned together.
+
+Every regex rule lives here: the Indian ID recognizers (Aadhaar, PAN, phone)
+and the healthcare patterns. ``SCANNER.scan(text)`` runs all of them over a
+text once and returns the matches grouped by entity type. The last scan is
+memoised per thread, so Presidio's recognizers and the detector's healthcare
+pass share a single scan of each span (or page) instead of rescanning it.
+"""
+import re
+import threading
+from typing import Dict, List, NamedTuple
+
+# The engine and default flags of Presidio's PatternRecognizer, so ID matches
+# are unchanged; ``regex`` is also noticeably faster than ``re`` on these rules
+import regex
+
+FLAGS = regex.DOTALL | regex.MULTILINE | regex.IGNORECASE
+
+
+class Rule(NamedTuple):
+    entity_type: str
+    name: str
+    regex: str  # a "value" group, if any, marks the part reported as the entity
+    score: float
+
+
+class RuleMatch(NamedTuple):
+    rule: Rule
+    start: int
+    end: int
+    value_start: int
+    value_end: int
+    value: str
+
+
+AADHAAR_RULES = [
+    Rule("AADHAAR", "Aadhaar (strong)", r"\b[2-9]\d{3}[\s-]?\d{4}[\s-]?\d{4}\b", 0.9),
+    Rule("AADHAAR", "Aadhaar (medium)", r"\b(?![01]|0000|1111|2222|3333|4444|5555|6666|7777|8888|9999)\d{4}[\s-]?\d{4}[\s-]?\d{4}\b", 0.7),
+]
+PAN_RULES = [
+    Rule("PAN", "PAN (strong)", r"\b[A-Z]{5}\d{4}[A-Z]\b", 0.9),
+]
+PHONE_RULES = [
+    Rule("PHONE", "Phone (strong international)", r"\+91[-\s]?[6-9]\d{9}\b", 0.9),
+    Rule("PHONE", "Phone (strong mobile)", r"\b[6-9]\d{9}\b", 0.8),
+    Rule("PHONE", "Phone (landline with area code)", r"\b0\d{2,4}[-\s]?\d{6,8}\b", 0.7),
+]
+HEALTHCARE_RULES = [
+    # Medical record number patterns
+    Rule("MEDICAL_RECORD_NUMBER", "MRN (labelled)", r"\b(?:MRN|Medical Record|Patient ID|Chart #):\s*(?P<value>[A-Z0-9-]{6,15})", 0.8),
+    Rule("MEDICAL_RECORD_NUMBER", "MRN (format)", r"\b(?P<value>[A-Z]{2,3}\d{6,10})\b", 0.8),
+    # Insurance number patterns
+    Rule("INSURANCE_NUMBER", "Insurance (labelled)", r"\b(?:Insurance|Policy):\s*(?P<value>[A-Z0-9-]{8,20})", 0.8),
+    Rule("INSURANCE_NUMBER", "Insurance (format)", r"\b(?P<value>[A-Z]{3}\d{6,12})\b", 0.8),
+    # Medical condition keywords
+    Rule("MEDICAL_CONDITION", "Condition (phrase)", r"\b(?:diagnosed with|suffers from|condition:|history of)\s+(?P<value>[A-Za-z\s,]+?)(?:\.|,|$|\s+and|\s+or)", 0.8),
+    Rule("MEDICAL_CONDITION", "Condition (keyword)", r"\b(?P<value>diabetes(?:\s+mellitus)?(?:\s+type\s+\d+)?|hypertension|asthma|cancer|depression|anxiety|arthritis)\b", 0.8),
+    # Medication patterns
+    Rule("MEDICATION", "Medication (phrase)", r"\b(?:prescribed|taking|medication:|drug:)\s+(?P<value>[A-Za-z\s]{3,30})", 0.8),
+    Rule("MEDICATION", "Medication (keyword)", r"\b(?P<value>aspirin|ibuprofen|metformin|lisinopril|atorvastatin)\b", 0.8),
+]
+HEALTHCARE_ENTITY_TYPES = ("MEDICAL_RECORD_NUMBER", "INSURANCE_NUMBER", "MEDICAL_CONDITION", "MEDICATION")
+
+
+class PatternScanner:
+    """Scans a text with a fixed set of precompiled rules.
+
+    Matches keep ``re.finditer`` semantics per rule (non-overlapping within a
+    rule, overlapping across rules) and are returned in rule order.
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = list(rules)
+        self._compiled = [regex.compile(rule.regex, FLAGS) for rule in self.rules]
+        self._memo = threading.local()
+
+    def scan(self, text: str) -> Dict[str, List[RuleMatch]]:
+        memo = self._memo
+        if getattr(memo, "text", None) == text:
+            return memo.matches
+        matches: Dict[str, List[RuleMatch]] = {}
+        for rule, pattern in zip(self.rules, self._compiled):
+            value_group = "value" if "value" in pattern.groupindex else 0
+            for match in pattern.finditer(text):
+                value_start, value_end = match.span(value_group)
+                matches.setdefault(rule.entity_type, []).append(
+                    RuleMatch(rule, match.start(), match.end(), value_start, value_end, match.group(value_group))
+                )
+        memo.text = text
+        memo.matches = matches
+        return matches
+
+
+SCANNER = PatternScanner(AADHAAR_RULES + PAN_RULES + PHONE_RULES + HEALTHCARE_RULES)
+
+_MEDICAL_NUMBER_PATTERNS = [
+    re.compile(r'^[A-Z]{2,4}[0-9]{6,12}$'),  # Letters followed by numbers (MR123456789)
+    re.compile(r'^[0-9]{8,15}$'),             # All numbers
+    re.compile(r'^[A-Z]{3}[0-9]{3}[A-Z]{3}[0-9]{3}$'),  # Mixed pattern (ABC123DEF456)
+    re.compile(r'^[A-Z0-9]{6,15}$'),          # General alphanumeric (but must have digits)
+]
+_DIGIT = re.compile(r'\d')
+
+
+def is_medical_number(text: str) -> bool:
+    """Check if a number pattern looks like a medical ID."""
+    cleaned_text = text.upper().replace(' ', '').replace('-', '')
+    # Must have at least some digits to be a medical ID
+    if len(cleaned_text) < 6 or not _DIGIT.search(cleaned_text):
+        return False
+    return any(pattern.match(cleaned_text) for pattern in _MEDICAL_NUMBER_PATTERNS)
@@ -0,0 +1,130 @@
+"""
+Cheap pre-classification of texts before PII detection.
+
+Most OCR spans are short labels ("Name", "Date", "Signature") or plain
+numbers, yet every span used to go through Presidio, spaCy NER and the
+healthcare patterns. ``plan_detectors`` looks at simple features of all texts
+at once (length and character-class counts computed with numpy, plus one
+keyword scan over the joined texts) and decides which detectors each text
+can possibly need:
+
+* the Indian ID recognizers only where enough digits (and, for PAN, letters)
+  are present for their patterns to match;
+* the healthcare patterns only where there are enough digits for an ID
+  format, or one of the words the other healthcare rules start with;
+* spaCy NER everywhere except texts without letters or digits and bare
+  form labels. Digit-only texts still go through NER: whether a number
+  becomes a medical record number depends on how the model tags and splits
+  it (a date or several short cardinals are not one), which no feature
+  here can predict.
+
+Every rule gate is derived from the rules in ``patterns``, so skipping a
+rule check never loses a match.
+"""
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+import regex
+
+from .patterns import FLAGS
+
+# Fewest \d characters a match of each ID rule contains, and fewest letters.
+# Aadhaar: 12 digits; PAN: AAAAA9999A; phone: 10-digit mobile or a landline
+# of at least 0 + 2 + 6 digits.
+ID_REQUIREMENTS = {
+    "AADHAAR": (12, 0),
+    "PAN": (4, 6),
+    "PHONE": (9, 0),
+}
+# The MRN and insurance formats need at least six digits; every other
+# healthcare rule starts with one of these words
+HEALTHCARE_MIN_DIGITS = 6
+HEALTHCARE_KEYWORDS = regex.compile(
+    r"mrn|medical record|patient id|chart #|insurance|policy"
+    r"|diagnosed with|suffers from|condition:|history of"
+    r"|diabetes|hypertension|asthma|cancer|depression|anxiety|arthritis"
+    r"|prescribed|taking|medication:|drug:"
+    r"|aspirin|ibuprofen|metformin|lisinopril|atorvastatin",
+    FLAGS,
+)
+# Field labels that are never PII themselves
+FORM_LABELS = {
+    "name", "full name", "patient name", "father's name", "mother's name", "date", "dob", "date of birth",
+    "signature", "sign", "address", "age", "sex", "gender", "phone", "mobile", "email", "doctor", "hospital",
+}
+_LABEL_STRIP = " \t:.-*#"
+
+_DIGIT, _LETTER = 1, 2
+# Character classes of ASCII code points; anything beyond ASCII may be a
+# Unicode digit or letter (``\d`` and spaCy are Unicode aware), so it counts as both
+_ASCII_CLASSES = np.zeros(128, dtype=np.uint8)
+_ASCII_CLASSES[ord("0"):ord("9") + 1] = _DIGIT
+_ASCII_CLASSES[ord("A"):ord("Z") + 1] = _LETTER
+_ASCII_CLASSES[ord("a"):ord("z") + 1] = _LETTER
+_NON_ASCII = _DIGIT | _LETTER
+
+
+class DetectorPlan(NamedTuple):
+    presidio_entities: List[str]  # rule-based entities whose patterns can match
+    ner_entities: List[str]  # reported from NER entities, if the parse has any
+    ner: bool
+    rules: bool
+
+
+def _counts(mask: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    cumulative = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+    return cumulative[ends] - cumulative[starts]
+
+
+def plan_detectors(texts: Sequence[str], entities: Sequence[str], ner: bool = True, rules: bool = True) -> List[DetectorPlan]:
+    """Which detectors each of ``texts`` needs when looking for ``entities``.
+
+    ``entities`` should be the requested entities Presidio has recognizers
+    for. Those without an entry in ``ID_REQUIREMENTS`` come from Presidio's
+    spaCy recognizer, which only reads the NER entities of the parse; they go
+    to ``ner_entities`` wherever NER runs, for the caller to request only if
+    the parse found any entity. ``ner`` and ``rules`` switch NER and the
+    healthcare patterns off for every text, when no requested entity needs them.
+    """
+    if not texts:
+        return []
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    # Texts are joined with one separator each so keyword hits map back by offset
+    starts = np.concatenate(([0], np.cumsum(lengths[:-1] + 1)))
+    ends = starts + lengths
+    joined = "\n".join(texts)
+
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype="<u4")
+    classes = np.where(codes < 128, _ASCII_CLASSES[np.minimum(codes, 127)], _NON_ASCII)
+    digits = _counts(classes & _DIGIT != 0, starts, ends)
+    letters = _counts(classes & _LETTER != 0, starts, ends)
+
+    keyword = np.zeros(len(texts), dtype=bool)
+    hits = [match.start() for match in HEALTHCARE_KEYWORDS.finditer(joined)]
+    if hits:
+        keyword[np.searchsorted(starts, np.asarray(hits), side="right") - 1] = True
+
+    needs_rules = ((digits >= HEALTHCARE_MIN_DIGITS) | keyword) & rules
+    needs_ner = ((digits + letters) > 0) & ner
+
+    gated = {name: need for name, need in ID_REQUIREMENTS.items() if name in entities}
+    ungated = [name for name in entities if name not in ID_REQUIREMENTS]
+    id_passes = {
+        name: (digits >= min_digits) & (letters >= min_letters)
+        for name, (min_digits, min_letters) in gated.items()
+    }
+
+    plans = []
+    for i, text in enumerate(texts):
+        run_ner = bool(needs_ner[i])
+        if run_ner and len(text) <= 20 and text.strip(_LABEL_STRIP).lower() in FORM_LABELS:
+            run_ner = False
+        presidio_entities = [name for name in gated if id_passes[name][i]]
+        plans.append(DetectorPlan(presidio_entities, ungated if run_ner else [], run_ner, bool(needs_rules[i])))
+    return plans
+
+
+def full_plan(texts: Sequence[str], entities: Sequence[str], ner: bool = True, rules: bool = True) -> List[DetectorPlan]:
+    """Every requested detector for every text, as without the pre-filter."""
+    return [DetectorPlan(list(entities), [], ner, rules) for _ in texts]
+
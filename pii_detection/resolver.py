@@ -0,0 +1,107 @@
+"""
+Overlap resolution for the detections found in one text (a span or a page).
+
+Presidio, the NER mapping and the healthcare patterns often report the same
+characters more than once: the same MRN from two rules, or an Aadhaar number
+that NER also tags as a number and maps to a medical record number. Every
+duplicate would become its own entity, its own LLM validation call and its
+own entry in the response.
+
+``resolve`` sweeps the candidates in start order, grouping overlapping
+intervals into clusters, and within each cluster:
+
+* merges detections of the same type that overlap into one covering their
+  union, fusing their scores (``max`` or ``noisy_or``);
+* drops a detection whose interval lies inside one of a different type that
+  ranks higher: earlier in the precedence list, then higher score, then
+  longer.
+
+Detections of different types that only partly overlap are both kept, so
+no character that was flagged loses its cover.
+"""
+from typing import Dict, List, NamedTuple, Sequence
+
+# Which method's label and validations a fused detection keeps
+METHOD_PRIORITY = {"rule": 0, "ner": 1}
+
+
+class Candidate(NamedTuple):
+    entity_type: str
+    start: int
+    end: int
+    value: str
+    score: float
+    method: str
+    validations: Dict
+
+
+def fuse_scores(scores: Sequence[float], fusion: str = "max") -> float:
+    """Combine the scores of detections that agree.
+
+    ``noisy_or`` treats them as independent evidence (1 - prod(1 - s));
+    ``max`` keeps the strongest.
+    """
+    if fusion == "noisy_or":
+        remaining = 1.0
+        for score in scores:
+            remaining *= 1.0 - score
+        return round(1.0 - remaining, 4)
+    return max(scores)
+
+
+def _merge_same_type(group: List[Candidate], text: str, fusion: str) -> Candidate:
+    start = min(c.start for c in group)
+    end = max(c.end for c in group)
+    lead = min(group, key=lambda c: (METHOD_PRIORITY.get(c.method, len(METHOD_PRIORITY)), -c.score))
+    if len(group) == 1:
+        return lead
+    value = lead.value if (lead.start, lead.end) == (start, end) else text[start:end]
+    validations = {}
+    for candidate in group:
+        if candidate is not lead:
+            validations.update(candidate.validations)
+    validations.update(lead.validations)
+    return lead._replace(
+        start=start, end=end, value=value, score=fuse_scores([c.score for c in group], fusion), validations=validations
+    )
+
+
+def _resolve_cluster(cluster: List[Candidate], text: str, rank: Dict[str, int], fusion: str) -> List[Candidate]:
+    by_type: Dict[str, List[List[Candidate]]] = {}
+    for candidate in cluster:
+        groups = by_type.setdefault(candidate.entity_type, [])
+        # Clusters are swept in start order, so a candidate can only extend the last group
+        if groups and candidate.start < max(c.end for c in groups[-1]):
+            groups[-1].append(candidate)
+        else:
+            groups.append([candidate])
+    merged = [_merge_same_type(group, text, fusion) for groups in by_type.values() for group in groups]
+    if len(merged) == 1:
+        return merged
+
+    unranked = len(rank)
+    merged.sort(key=lambda c: (rank.get(c.entity_type, unranked), -c.score, c.start - c.end, c.start))
+    kept: List[Candidate] = []
+    for candidate in merged:
+        if not any(k.start <= candidate.start and candidate.end <= k.end for k in kept):
+            kept.append(candidate)
+    return kept
+
+
+def resolve(candidates: List[Candidate], text: str, precedence: Sequence[str] = (), fusion: str = "max") -> List[Candidate]:
+    """Resolve overlapping detections; returns the survivors in text order."""
+    if len(candidates) < 2:
+        return list(candidates)
+    rank = {entity_type: i for i, entity_type in enumerate(precedence)}
+    resolved: List[Candidate] = []
+    cluster: List[Candidate] = []
+    cluster_end = -1
+    for candidate in sorted(candidates, key=lambda c: (c.start, -c.end)):
+        if cluster and candidate.start >= cluster_end:
+            resolved.extend(_resolve_cluster(cluster, text, rank, fusion))
+            cluster = []
+        cluster.append(candidate)
+        cluster_end = max(cluster_end, candidate.end) if len(cluster) > 1 else candidate.end
+    resolved.extend(_resolve_cluster(cluster, text, rank, fusion))
+    resolved.sort(key=lambda c: (c.start, c.end))
+    return resolved
@@ -0,0 +1,147 @@
+"""
+Deterministic checks for rule-based ID candidates.
+
+The ID patterns only describe the shape of a number, so any 12-digit string
+looks like an Aadhaar and any 10-digit one like a phone. These validators
+look at what the shape cannot express and give one verdict per candidate:
+
+* ``INVALID``: cannot be a real ID of that type; the candidate is dropped.
+* ``CERTAIN``: the number proves itself (a correct Aadhaar Verhoeff check
+  digit, a ``+91`` mobile number), so it needs no LLM validation.
+* ``UNKNOWN``: plausible, left to the later stages.
+
+Checks run vectorised over all candidates of a type at once.
+"""
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+INVALID, UNKNOWN, CERTAIN = -1, 0, 1
+
+# Verhoeff dihedral-group multiplication and position permutation tables
+_VERHOEFF_D = np.array([
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8],
+    [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2],
+    [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+], dtype=np.int8)
+_VERHOEFF_P = np.array([
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 3, 1, 2, 6, 8, 7, 0],
+    [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5],
+    [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+], dtype=np.int8)
+
+# Fourth PAN character: the holder's category (person, company, HUF, firm,
+# association, trust, body of individuals, local authority, juridical
+# person, government)
+PAN_CATEGORIES = "PCHFATBLJG"
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def _digit_matrix(numbers: Sequence[str], width: int) -> np.ndarray:
+    """``numbers`` (all ``width`` digits long) as an ``(n, width)`` int array."""
+    if not numbers:
+        return np.zeros((0, width), dtype=np.int8)
+    return (np.frombuffer("".join(numbers).encode("ascii"), dtype=np.uint8).reshape(-1, width) - ord("0")).astype(np.int8)
+
+
+def verhoeff_valid(numbers: Sequence[str]) -> np.ndarray:
+    """Whether each equal-length digit string ends in a correct Verhoeff check digit."""
+    if not numbers:
+        return np.zeros(0, dtype=bool)
+    digits = _digit_matrix(numbers, len(numbers[0]))
+    check = np.zeros(len(numbers), dtype=np.int8)
+    for position, column in enumerate(digits[:, ::-1].T):
+        check = _VERHOEFF_D[check, _VERHOEFF_P[position % 8, column]]
+    return check == 0
+
+
+def validate_aadhaar(values: Sequence[str]) -> np.ndarray:
+    """Aadhaar numbers are 12 digits, never start with 0 or 1, and carry a Verhoeff check digit."""
+    numbers = [_NON_DIGITS.sub("", value) for value in values]
+    verdicts = np.full(len(numbers), INVALID, dtype=np.int8)
+    well_formed = [i for i, number in enumerate(numbers) if len(number) == 12 and number.isascii() and number[0] not in "01"]
+    if well_formed:
+        valid = verhoeff_valid([numbers[i] for i in well_formed])
+        verdicts[well_formed] = np.where(valid, CERTAIN, INVALID)
+    return verdicts
+
+
+def validate_pan(values: Sequence[str]) -> np.ndarray:
+    """A PAN's fourth letter is a known holder category and its serial is never 0000.
+
+    Its last letter is a check character, but the algorithm is not public,
+    so a well-formed PAN stays ``UNKNOWN``.
+    """
+    verdicts = np.full(len(values), INVALID, dtype=np.int8)
+    shaped = [i for i, value in enumerate(values) if len(value) == 10 and value.isascii()]
+    if shaped:
+        codes = np.array([values[i].upper() for i in shaped], dtype="<U10").view(np.uint32).reshape(-1, 10)
+        category_ok = np.isin(codes[:, 3], np.array([ord(c) for c in PAN_CATEGORIES], dtype=np.uint32))
+        serial_ok = ~np.all(codes[:, 5:9] == ord("0"), axis=1)
+        verdicts[shaped] = np.where(category_ok & serial_ok, UNKNOWN, INVALID)
+    return verdicts
+
+
+def validate_phone(values: Sequence[str]) -> np.ndarray:
+    """Indian numbering plan: ten significant digits after the ``+91`` or trunk ``0`` prefix.
+
+    Mobile numbers start with 6-9 and landline STD codes with 1-8; a number
+    of one repeated digit is a placeholder. A valid mobile number written
+    with ``+91`` is ``CERTAIN``.
+    """
+    numbers, international = [], []
+    for value in values:
+        stripped = value.strip()
+        number = _NON_DIGITS.sub("", stripped)
+        is_international = stripped.startswith("+91")
+        if is_international:
+            number = number[2:]
+        elif number.startswith("0"):
+            number = number[1:]
+        numbers.append(number)
+        international.append(is_international)
+    verdicts = np.full(len(values), INVALID, dtype=np.int8)
+    shaped = [i for i, number in enumerate(numbers) if len(number) == 10 and number.isascii()]
+    if shaped:
+        digits = _digit_matrix([numbers[i] for i in shaped], 10)
+        trunk = np.array([values[i].strip().startswith("0") for i in shaped])
+        mobile = ~trunk & (digits[:, 0] >= 6)
+        landline = trunk & (digits[:, 0] >= 1) & (digits[:, 0] <= 8)
+        repeated = np.all(digits == digits[:, :1], axis=1)
+        ok = (mobile | landline) & ~repeated
+        certain = ok & mobile & np.array([international[i] for i in shaped])
+        verdicts[shaped] = np.where(certain, CERTAIN, np.where(ok, UNKNOWN, INVALID))
+    return verdicts
+
+
+VALIDATORS = {
+    "AADHAAR": validate_aadhaar,
+    "PAN": validate_pan,
+    "PHONE": validate_phone,
+}
+
+
+def validate_batch(entity_types: Sequence[str], values: Sequence[str]) -> np.ndarray:
+    """Verdict for each ``(entity_type, value)`` candidate; types without a validator are ``UNKNOWN``."""
+    verdicts = np.full(len(values), UNKNOWN, dtype=np.int8)
+    by_type: Dict[str, List[int]] = {}
+    for i, entity_type in enumerate(entity_types):
+        if entity_type in VALIDATORS:
+            by_type.setdefault(entity_type, []).append(i)
+    for entity_type, indices in by_type.items():
+        verdicts[indices] = VALIDATORS[entity_type]([values[i] for i in indices])
+    return verdicts
@@ -0,0 +1,149 @@
+"""
+Bounded executor for the blocking inference stages.
+
+The API admits at most ``inference_workers + inference_queue_depth`` jobs at
+a time; anything beyond that is rejected immediately with ``OverloadedError``
+so the event loop (and ``/health``) stays responsive under load.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from config.settings import settings
+
+
+class OverloadedError(Exception):
+    """Raised when the inference queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """One admission slot held across several submissions, e.g. the pages of a stream.
+
+    ``release`` may be called any number of times; the slot goes back to the
+    executor once, and not before the work it last submitted has finished.
+    """
+
+    def __init__(self, executor: "InferenceExecutor"):
+        self._executor = executor
+        self._future: Optional[Future] = None
+        self._released = False
+        self._lock = threading.Lock()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` in the executor's pool under this slot and await its result."""
+        with self._lock:
+            if self._released:
+                raise RuntimeError("Admission slot already released")
+            self._future = self._executor._pool.submit(fn, *args, **kwargs)
+        return await asyncio.wrap_future(self._future)
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+            future = self._future
+        if future is not None:
+            # Runs at once if the work is done, otherwise when it finishes
+            future.add_done_callback(self._executor.release)
+        else:
+            self._executor.release()
+
+
+class InferenceExecutor:
+    def __init__(self, max_workers: int, queue_depth: int, retry_after: int, backend=None):
+        """``backend`` is anything with ``submit``/``shutdown`` returning
+        ``concurrent.futures`` futures (e.g. ``PreforkPool``); a thread pool
+        is used when it is not given."""
+        self.max_workers = max(1, max_workers)
+        self.capacity = self.max_workers + max(0, queue_depth)
+        self.retry_after = retry_after
+        self._pool = backend or ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Reserve an admission slot; returns False when the queue is full."""
+        with self._lock:
+            if self._pending >= self.capacity:
+                return False
+            self._pending += 1
+            return True
+
+    def release(self, *_):
+        with self._lock:
+            self._pending = max(0, self._pending - 1)
+
+    def _acquire_or_raise(self):
+        if not self.try_acquire():
+            raise OverloadedError(self.retry_after)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Submit ``fn`` to the pool under an admission slot, released when it finishes."""
+        self._acquire_or_raise()
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self.release()
+            raise
+        future.add_done_callback(self.release)
+        return future
+
+    def hold(self) -> AdmissionSlot:
+        """Reserve a slot for a series of submissions; the caller must ``release`` it."""
+        self._acquire_or_raise()
+        return AdmissionSlot(self)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` in the pool and await its result.
+
+        The admission slot is released when the work itself finishes, not when
+        the awaiting request goes away, so cancelled requests still count
+        against the queue until their stage completes.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+        stats = {
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "pending": pending,
+        }
+        if hasattr(self._pool, "stats"):
+            stats["worker_processes"] = self._pool.stats()
+        return stats
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def set_executor(executor: InferenceExecutor):
+    """Install a pre-built executor (used by the pre-fork serving mode)."""
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def get_executor() -> InferenceExecutor:
+    """Return the process-wide inference executor, creating it from settings."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor(
+                    max_workers=settings.inference_workers,
+                    queue_depth=settings.inference_queue_depth,
+                    retry_after=settings.overload_retry_after,
+                )
+    return _executor
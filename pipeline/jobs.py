@@ -0,0 +1,342 @@
+"""
+Asynchronous document jobs backed by SQLite.
+
+``POST /jobs`` stores the upload on disk and a ``queued`` row in SQLite;
+background runner threads claim queued jobs, process them page by page
+(recording progress) and store an ``AnalyzeResponse``-shaped result. Jobs
+whose runner went away are re-queued, so a restart never loses accepted
+work: a runner holds a lease on each job it runs (``JOB_LEASE_SECONDS``)
+and renews it while the job is in progress, and ``running`` jobs whose lease
+has expired are taken back on startup and whenever a runner is idle. Leases
+rather than PIDs decide ownership, since PIDs are reused across restarts.
+
+Inference for a job goes through the shared ``pipeline.executor`` like any
+request: it counts against the admission limit and, in pre-fork mode, runs
+in an inference worker. The worker writes page progress to SQLite itself,
+so nothing but the store's paths has to cross the process boundary.
+"""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.logging import logger
+from config.settings import settings
+from pipeline.executor import OverloadedError, get_executor
+from pipeline.serialization import dumps, entity_dicts
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Seconds a claimed job waits before asking the full inference queue again
+ADMISSION_RETRY_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    use_llm INTEGER NOT NULL DEFAULT 0,
+    entities TEXT,
+    status TEXT NOT NULL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    pages_total INTEGER,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER,
+    owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobStore:
+    def __init__(self, jobs_dir: str):
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.db_path = os.path.join(jobs_dir, "jobs.sqlite3")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Stores created by earlier versions lack the newer columns
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in (("entities", "TEXT"), ("owner", "TEXT"), ("lease_expires", "REAL")):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits (or rolls back) and is closed on exit."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def payload_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.upload")
+
+    def create(self, data: bytes, filename: str, use_llm: bool, entities: Optional[List[str]] = None) -> str:
+        job_id = uuid.uuid4().hex
+        payload_path = self.payload_path(job_id)
+        with open(payload_path, "wb") as f:
+            f.write(data)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, filename, use_llm, entities, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, int(use_llm), json.dumps(entities) if entities is not None else None, QUEUED, now, now),
+            )
+        return job_id
+
+    def claim_next(self, owner: str, lease_seconds: float) -> Optional[sqlite3.Row]:
+        """Atomically move the oldest queued job to ``running`` under ``owner``'s lease and return it."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, owner_pid = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, owner, os.getpid(), now + lease_seconds, now, row["id"]),
+            )
+            return row
+
+    def renew_leases(self, owner: str, job_ids: List[str], lease_seconds: float):
+        """Extend ``owner``'s lease on the given running jobs."""
+        if not job_ids:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND owner = ? AND status = ?",
+                [(time.time() + lease_seconds, job_id, owner, RUNNING) for job_id in job_ids],
+            )
+
+    def update_progress(self, job_id: str, pages_done: int, pages_total: int):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET pages_done = ?, pages_total = ?, updated_at = ? WHERE id = ?",
+                (pages_done, pages_total, time.time(), job_id),
+            )
+
+    def finish(self, job_id: str, result: Optional[str] = None, error: Optional[str] = None, owner: Optional[str] = None):
+        """Store the outcome; with ``owner``, only while that runner still holds the job."""
+        with self._connect() as conn:
+            query = "UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires = NULL, updated_at = ? WHERE id = ?"
+            params = [FAILED if error else COMPLETED, result, error, time.time(), job_id]
+            if owner is not None:
+                query += " AND owner = ? AND status = ?"
+                params += [owner, RUNNING]
+            if conn.execute(query, params).rowcount == 0:
+                # Lost the lease; the job was re-queued and runs again elsewhere
+                return
+        try:
+            os.remove(self.payload_path(job_id))
+        except OSError:
+            pass
+
+    def requeue_interrupted(self) -> int:
+        """Re-queue running jobs whose owner's lease has expired (or that never had one)."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, pages_done = 0, owner = NULL, owner_pid = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE status = ? AND (lease_expires IS NULL OR lease_expires < ?)",
+                (QUEUED, time.time(), RUNNING, time.time()),
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "progress": {"pages_done": row["pages_done"], "pages_total": row["pages_total"]},
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+
+def analyze_job(store: JobStore, job_id: str, filename: str, entities: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run ``analyze_document`` on a stored upload, recording page progress in the store.
+
+    Runs in the inference executor, possibly in a pre-fork worker process.
+    """
+    from pipeline.stages import analyze_document
+
+    with open(store.payload_path(job_id), "rb") as f:
+        data = f.read()
+    return analyze_document(
+        data, filename, on_page=lambda done, total: store.update_progress(job_id, done, total),
+        entities_to_detect=entities,
+    )
+
+
+def _submit_when_admitted(fn, *args):
+    """Submit to the inference executor, waiting for a free slot rather than failing the job."""
+    executor = get_executor()
+    while True:
+        try:
+            return executor.submit(fn, *args)
+        except OverloadedError:
+            time.sleep(ADMISSION_RETRY_INTERVAL)
+
+
+def run_job(store: JobStore, job_id: str, filename: str, use_llm: bool, entities: Optional[List[str]] = None) -> str:
+    """Process one stored upload and return the serialized AnalyzeResponse."""
+    stage_result = _submit_when_admitted(analyze_job, store, job_id, filename, entities).result()
+    if "error" in stage_result:
+        raise RuntimeError(stage_result["error"])
+
+    entities = stage_result["pii_entities"]
+    false_positives = []
+    warnings = []
+    llm_api_key = settings.gemini_api_key if use_llm else None
+    if llm_api_key:
+        from performance_cache import ModelCache
+        from pii_detection.llm_validator import LLMValidator
+        try:
+            validator = LLMValidator(api_key=llm_api_key)
+            entities, false_positives = asyncio.run(validator.validate_entities(
+                entities, " ".join(s.text for s in stage_result["spans"]), ModelCache.get_pii_detector()
+            ))
+            if validator.failed_calls:
+                warnings.append(
+                    f"LLM validation failed for {validator.failed_calls} entity(ies); they are returned unvalidated."
+                )
+        except Exception as llm_error:
+            logger.error(f"LLM validation failed for job {job_id}: {llm_error}")
+            warnings.append("LLM validation failed; returning unvalidated entities.")
+    elif use_llm:
+        warnings.append("LLM validation skipped: GEMINI_API_KEY not set.")
+
+    # AnalyzeResponse.model_dump(), built directly
+    return dumps({
+        "document_id": job_id,
+        "entities": entity_dicts(entities),
+        "false_positives": false_positives,
+        "summary": {
+            "filename": filename,
+            "pages": len(stage_result["ocr"].get("pages", [])),
+            "signatures": len(stage_result["signatures"]),
+            "total_entities": len(entities),
+            "total_false_positives": len(false_positives),
+        },
+        "warnings": warnings,
+    })
+
+
+class JobRunner:
+    def __init__(self, store: JobStore, num_workers: int = 1, poll_interval: float = 2.0, lease_seconds: float = 60.0):
+        self.store = store
+        self.num_workers = max(1, num_workers)
+        self.poll_interval = poll_interval
+        self.lease_seconds = max(1.0, lease_seconds)
+        # Unique per runner and per boot, unlike a PID
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._threads = []
+        self._running_jobs = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        self._requeue_expired()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._loop, name=f"job-runner-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-lease-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        return self
+
+    def notify(self):
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def stop(self):
+        self._stopped = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _requeue_expired(self):
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            logger.info(f"Re-queued {requeued} interrupted job(s)")
+
+    def _heartbeat(self):
+        # Renew well before expiry so a slow write never lets a live job go
+        while not self._stopped:
+            time.sleep(self.lease_seconds / 3)
+            with self._running_lock:
+                job_ids = list(self._running_jobs)
+            try:
+                self.store.renew_leases(self.instance_id, job_ids, self.lease_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew job leases: {e}")
+
+    def _loop(self):
+        while not self._stopped:
+            row = self.store.claim_next(self.instance_id, self.lease_seconds)
+            if row is None:
+                # Idle: take back jobs of runners that died since startup
+                self._requeue_expired()
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            job_id = row["id"]
+            logger.info(f"Job {job_id}: processing {row['filename']}")
+            with self._running_lock:
+                self._running_jobs.add(job_id)
+            try:
+                entities = json.loads(row["entities"]) if row["entities"] else None
+                result = run_job(self.store, job_id, row["filename"], bool(row["use_llm"]), entities)
+                self.store.finish(job_id, result=result, owner=self.instance_id)
+                logger.info(f"Job {job_id}: completed")
+            except Exception as e:
+                logger.error(f"Job {job_id}: failed: {e}")
+                self.store.finish(job_id, error=str(e), owner=self.instance_id)
+            finally:
+                with self._running_lock:
+                    self._running_jobs.discard(job_id)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Return the process-wide job runner, creating its store from settings."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner(
+                    JobStore(settings.jobs_dir), num_workers=settings.job_workers, lease_seconds=settings.job_lease_seconds
+                )
+    return _runner
@@ -1,10 +1,10 @@
 
 
-from ocr.processor import process_document
-from pii_detection.detector import PIIDetector
+from ocr.processor import process_document_bytes
+from performance_cache import ModelCache
 from pii_detection.llm_validator import LLMValidator
 from pii_detection.models import TextSpan, EntityType, AnalyzeResponse, DetectedEntity, BBox, Page
-from ultralytics import YOLO
+from pipeline.stages import detect_signatures
 
 import os
 import asyncio
@@ -34,67 +34,56 @@ def ocr_to_textspans(ocr_result):
 	return pages
 
 async def run_pipeline(image_path, llm_api_key=None):
-	# Run OCR
-	ocr_result = process_document(image_path)
-	pages = ocr_to_textspans(ocr_result)
+	# Decode the document a window at a time; YOLO runs on each window's
+	# page buffers right after OCR, before they are dropped
+	with open(image_path, "rb") as f:
+		data = f.read()
+	signatures = []
+
+	def on_window(images, first_page_no):
+		signatures.extend(detect_signatures(images, first_page_no=first_page_no))
 
-	# Run YOLO signature detection
-	BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-	MODEL_PATH = os.path.join(BASE_DIR, "models", "detector_yolo_1cls.pt")
+	ocr_result = process_document_bytes(data, image_path, on_window=on_window)
+	if "error" in ocr_result:
+		raise RuntimeError(f"OCR failed for {image_path}: {ocr_result['error']}")
+	pages = ocr_to_textspans(ocr_result)
 
-	signature_spans = []
-	try:
-		model = YOLO(MODEL_PATH)
-		results = model(image_path)
-		unique_boxes = set()
-		for i, r in enumerate(results):
-			for box in r.boxes:
-				coords = box.xyxy[0].tolist()
-				if len(coords) >= 4:
-					x1, y1, x2, y2 = coords[:4]
-				else:
-					print(f"[WARNING] Skipping YOLO box with insufficient coordinates: {coords}")
-					continue
-				conf = float(box.conf[0])
-				box_key = (round(x1, 2), round(y1, 2), round(x2, 2), round(y2, 2))
-				if box_key in unique_boxes:
-					continue
-				unique_boxes.add(box_key)
-				signature_span = TextSpan(
-					span_id=f"signature_{i}",
-					text="<signature>",
-					bbox=BBox(x1=x1, y1=y1, x2=x2, y2=y2),
-					page_no=1,
-					language="und",
-					ocr_confidence=conf
-				)
-				signature_spans.append(signature_span)
-		# Add signature spans to first page
-		if pages and signature_spans:
-			pages[0].spans.extend(signature_spans)
-	except Exception as e:
-		print(f"[ERROR] Signature detection failed: {e}")
-		signature_spans = []
+	signature_spans = [
+		TextSpan(
+			span_id=sig["span_id"],
+			text=sig["text"],
+			bbox=BBox(**sig["bbox"]),
+			page_no=sig["page_no"],
+			language=sig["language"],
+			ocr_confidence=sig["ocr_confidence"]
+		)
+		for sig in signatures
+	]
+	# Add signature spans to their page
+	for page in pages:
+		page.spans.extend(s for s in signature_spans if s.page_no == page.page_no)
 
 	# Entities to detect
 	entities_to_detect = [e.value for e in EntityType]
 
 	# Run PII detection
-	detector = PIIDetector()
+	detector = ModelCache.get_pii_detector()
 	all_spans = [span for page in pages for span in page.spans]
 	pii_entities = detector.detect_entities(all_spans, entities_to_detect)
 
 	# Optionally run LLM validation
 	false_positives = []
+	warnings = []
 	if llm_api_key:
 		llm_validator = LLMValidator(api_key=llm_api_key)
 		validated_entities, false_positives = await llm_validator.validate_entities(pii_entities, " ".join([s.text for s in all_spans]), detector)
+		if llm_validator.failed_calls:
+			warnings.append(f"LLM validation failed for {llm_validator.failed_calls} entity(ies); they are returned unvalidated.")
 	else:
 		validated_entities = pii_entities
 
-	# Build summary and warnings (simple example)
+	# Build summary (simple example)
 	summary = {"total_entities": len(validated_entities), "total_false_positives": len(false_positives)}
-	warnings = []
 
 	response = AnalyzeResponse(
 		document_id=os.path.basename(image_path),
@@ -115,5 +104,9 @@ if __name__ == "__main__":
 	else:
 		image_path = sys.argv[1]
 		llm_api_key = sys.argv[2] if len(sys.argv) > 2 else os.getenv("GEMINI_API_KEY")
-		response = asyncio.run(run_pipeline(image_path, llm_api_key))
+		try:
+			response = asyncio.run(run_pipeline(image_path, llm_api_key))
+		except RuntimeError as e:
+			print(e, file=sys.stderr)
+			sys.exit(1)
 		print(response.json(indent=2))
@@ -0,0 +1,195 @@
+"""
+Pre-fork inference worker pool.
+
+Models are loaded once in the parent process, then the inference workers are
+forked so the read-only weights are shared copy-on-write instead of being
+loaded again by every worker. Tasks are dispatched to the workers over a
+local multiprocessing queue; ``submit`` returns a ``concurrent.futures``
+future so the pool can back ``pipeline.executor.InferenceExecutor``.
+
+The parent must not run inference before ``start()``: forking after torch
+has spun up its intra-op thread pool can deadlock the children.
+"""
+import gc
+import itertools
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from config.logging import logger
+
+_MB = 1024 * 1024
+
+
+def _worker_main(index: int, forked_at: float, threads: int, tasks, results, current):
+    """Entry point of a forked inference worker."""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+    rss = psutil.Process().memory_info().rss
+    results.put(("ready", index, os.getpid(), time.time() - forked_at, rss))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, fn, args, kwargs = task
+        # Shared memory rather than a queue message: it is visible to the
+        # parent even if this process dies before the queue is flushed.
+        current[index] = task_id
+        try:
+            payload = pickle.dumps(fn(*args, **kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+            results.put(("done", index, task_id, True, payload))
+        except BaseException as e:
+            try:
+                payload = pickle.dumps(e, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                payload = pickle.dumps(RuntimeError(repr(e)), protocol=pickle.HIGHEST_PROTOCOL)
+            results.put(("done", index, task_id, False, payload))
+        current[index] = -1
+
+
+class PreforkPool:
+    def __init__(self, num_workers: int, threads_per_worker: Optional[int] = None):
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self._ctx = mp.get_context("fork")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._processes: Dict[int, Any] = {}
+        self._workers: Dict[int, Dict[str, Any]] = {}
+        self._futures: Dict[int, Future] = {}
+        self._current = self._ctx.Array("q", [-1] * self.num_workers, lock=False)  # task id per worker
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._dispatcher = None
+        self._closed = False
+
+    def start(self):
+        """Freeze the parent heap and fork the workers."""
+        # Objects allocated so far (the loaded models) move to the permanent
+        # generation so the cyclic GC never touches, and thereby copies, them.
+        gc.collect()
+        gc.freeze()
+        for index in range(self.num_workers):
+            self._spawn(index)
+        self._dispatcher = threading.Thread(target=self._dispatch, name="prefork-dispatcher", daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, time.time(), self.threads_per_worker, self._tasks, self._results, self._current),
+            name=f"inference-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+        self._workers[index] = {"pid": process.pid, "ready": False, "startup_seconds": None, "tasks_completed": 0}
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if self._closed:
+            raise RuntimeError("PreforkPool is shut down")
+        future = Future()
+        task_id = next(self._ids)
+        with self._lock:
+            self._futures[task_id] = future
+        self._tasks.put((task_id, fn, args, kwargs))
+        return future
+
+    def _dispatch(self):
+        last_reap = time.monotonic()
+        while not self._closed:
+            if time.monotonic() - last_reap >= 1.0:
+                self._reap_dead_workers()
+                last_reap = time.monotonic()
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            kind, index = message[0], message[1]
+            if kind == "ready":
+                _, _, pid, startup_seconds, rss = message
+                self._workers[index].update(ready=True, pid=pid, startup_seconds=startup_seconds)
+                logger.info(
+                    f"Inference worker {index} (pid {pid}) ready in {startup_seconds:.3f}s, "
+                    f"rss={rss / _MB:.1f}MB"
+                )
+            elif kind == "done":
+                _, _, task_id, ok, payload = message
+                with self._lock:
+                    future = self._futures.pop(task_id, None)
+                self._workers[index]["tasks_completed"] += 1
+                if future is None or not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    value = pickle.loads(payload)
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _reap_dead_workers(self):
+        for index, process in list(self._processes.items()):
+            if process.is_alive() or self._closed:
+                continue
+            logger.error(f"Inference worker {index} (pid {process.pid}) exited with code {process.exitcode}, restarting")
+            task_id = self._current[index]
+            self._current[index] = -1
+            with self._lock:
+                future = self._futures.pop(task_id, None) if task_id >= 0 else None
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError(f"Inference worker {index} died while processing the request"))
+            process.join(timeout=0)
+            self._spawn(index)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-worker startup cost and memory (RSS, and PSS/USS where available).
+
+        PSS splits shared pages between the processes mapping them and USS
+        counts only private pages, so together they show how much of the
+        model memory is actually shared with the parent.
+        """
+        report = []
+        for index, info in sorted(self._workers.items()):
+            entry = {"worker": index, **info, "alive": self._processes[index].is_alive()}
+            try:
+                memory = psutil.Process(info["pid"]).memory_full_info()
+                entry["rss_mb"] = round(memory.rss / _MB, 1)
+                entry["pss_mb"] = round(getattr(memory, "pss", 0) / _MB, 1)
+                entry["uss_mb"] = round(getattr(memory, "uss", 0) / _MB, 1)
+            except (psutil.Error, OSError):
+                pass
+            report.append(entry)
+        return report
+
+    def shutdown(self, wait: bool = False):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        if wait:
+            for process in self._processes.values():
+                process.join(timeout=10)
+        with self._lock:
+            pending = list(self._futures.values())
+            self._futures.clear()
+        for future in pending:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("PreforkPool shut down"))
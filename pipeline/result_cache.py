@@ -0,0 +1,179 @@
+"""
+Content-addressed cache of ``/process_document`` responses.
+
+Entries are keyed by a hash of the uploaded bytes plus every option that
+changes the result (LLM validation, entity set, OCR languages, model
+versions). Values are the rendered JSON response bodies, so a hit is served
+without re-running OCR, YOLO or PII detection and without re-serializing.
+
+Two tiers: a bounded in-memory LRU with TTL, and an optional directory on
+disk that survives restarts and is shared by every worker on the host.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from config.logging import logger
+from config.metrics import CACHE_REQUESTS
+from config.settings import settings
+
+
+def make_cache_key(data: bytes, options: Dict[str, Any]) -> str:
+    """Hash the document bytes together with the result-affecting options."""
+    digest = hashlib.sha256(data)
+    digest.update(b"\0")
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 256, ttl: int = 3600, disk_dir: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypasses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+        CACHE_REQUESTS.labels(name).inc()
+
+    def record_bypass(self):
+        self._count("bypasses")
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, body = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    CACHE_REQUESTS.labels("memory_hits").inc()
+                    return body
+                del self._entries[key]
+
+        body = self._disk_get(key, now)
+        if body is not None:
+            self._memory_put(key, body, now)
+            self._count("disk_hits")
+            return body
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, body: bytes):
+        now = time.time()
+        self._memory_put(key, body, now)
+        self._disk_put(key, body)
+        self._count("stores")
+
+    def _memory_put(self, key: str, body: bytes, now: float):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl <= now:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, body: bytes):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Result cache disk write failed for {key}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl
+        stats["disk_tier"] = bool(self.disk_dir)
+        return stats
+
+
+def document_options(use_llm: bool, entities: Iterable[str], model_versions: Dict[str, Any]) -> Dict[str, Any]:
+    """The options that, together with the file bytes, determine a response."""
+    return {
+        "use_llm": bool(use_llm),
+        "entities": sorted(entities),
+        "languages": list(settings.ocr_languages),
+        "rasterization": [settings.pdf_dpi, settings.pdf_grayscale],
+        "text_layer": [settings.pdf_text_layer_enabled, settings.pdf_text_layer_min_chars],
+        "preprocessing": [
+            settings.preprocess_enabled, settings.preprocess_max_long_edge, settings.preprocess_target_text_height,
+            settings.preprocess_grayscale, settings.preprocess_deskew, settings.preprocess_crop,
+        ],
+        "analysis_mode": settings.pii_analysis_mode,
+        "prefilter": settings.pii_prefilter_enabled,
+        "validators": settings.pii_validators_enabled,
+        "resolution": [settings.pii_resolve_overlaps, list(settings.pii_entity_precedence), settings.pii_score_fusion],
+        "models": model_versions,
+    }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the process-wide result cache, or None when caching is disabled."""
+    global _cache
+    if not settings.result_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    max_entries=settings.result_cache_max_entries,
+                    ttl=settings.result_cache_ttl,
+                    disk_dir=settings.result_cache_dir,
+                )
+    return _cache
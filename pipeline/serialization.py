@@ -0,0 +1,52 @@
+"""
+Response serialization without pydantic round-trips.
+
+``entity_dict`` builds the same dict ``DetectedEntity.model_dump()`` (and the
+deprecated ``.dict()``) returns, straight from the attributes, and the
+encoders here are created once and reused. The bytes produced are identical
+to Starlette's ``JSONResponse`` and to ``json.dumps`` with the same options.
+"""
+import json
+from typing import Any, Dict, Iterable, List
+
+# Responses are trees built per request, never self-referencing, so the
+# circular-reference bookkeeping can be skipped
+_COMPACT = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"), check_circular=False)
+_NDJSON = json.JSONEncoder(ensure_ascii=False, check_circular=False)
+_DEFAULT = json.JSONEncoder(check_circular=False)
+
+
+def entity_dict(entity) -> Dict[str, Any]:
+    """``entity.model_dump()`` for a ``DetectedEntity``, in field order."""
+    bbox = entity.bbox
+    return {
+        "type": entity.type,
+        "value": entity.value,
+        "redacted_value": entity.redacted_value,
+        "confidence": entity.confidence,
+        "method": entity.method,
+        "page_no": entity.page_no,
+        "bbox": {"x1": bbox.x1, "y1": bbox.y1, "x2": bbox.x2, "y2": bbox.y2},
+        "source_span_ids": list(entity.source_span_ids),
+        "language": entity.language,
+        "validations": dict(entity.validations),
+    }
+
+
+def entity_dicts(entities: Iterable) -> List[Dict[str, Any]]:
+    return [entity_dict(entity) for entity in entities]
+
+
+def dumps_compact(content: Any) -> bytes:
+    """What ``JSONResponse(content).body`` would be."""
+    return _COMPACT.encode(content).encode("utf-8")
+
+
+def dumps_line(content: Any) -> str:
+    """``json.dumps(content, ensure_ascii=False)`` plus a newline, for NDJSON streams."""
+    return _NDJSON.encode(content) + "\n"
+
+
+def dumps(content: Any) -> str:
+    """``json.dumps(content)`` with the shared encoder."""
+    return _DEFAULT.encode(content)
@@ -0,0 +1,334 @@
+"""
+Blocking document-processing stages shared by the API and the pipeline.
+
+Every function here is CPU/GPU bound and must not be called from the event
+loop directly; the API runs them through ``pipeline.executor``.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.logging import logger
+from config.metrics import ERRORS, PAGE_SOURCES, observe_document, stage_timer, update_process_memory
+from config.settings import settings
+from ocr.images import DocumentDecodeError, is_pdf, page_windows
+from ocr.preprocess import map_box, normalize_page
+from ocr.processor import PAGE_LIMIT, _blocks_from_detections, process_document_bytes, readtext_many
+from ocr.processor_stream import count_stream_pages, process_page_bytes
+from ocr.text_layer import extract_text_layer
+from performance_cache import ModelCache
+from pii_detection.models import TextSpan, EntityType, DetectedEntity
+from pipeline.serialization import entity_dicts
+
+
+def _yolo_boxes(pages: List[Any]) -> List[List[tuple]]:
+    """Run YOLO over page arrays in batches of ``yolo_batch_size``.
+
+    Pages are normalized first (``ocr.preprocess``) and the boxes mapped
+    back; returns, per page, the ``(x1, y1, x2, y2, confidence)`` of each
+    box in original page coordinates.
+    """
+    if ModelCache.yolo_model is None:
+        ModelCache.load_yolo()
+    model = ModelCache.yolo_model
+    batch_size = max(1, settings.yolo_batch_size)
+    with stage_timer("preprocess"):
+        normalized = [normalize_page(page) for page in pages]
+    boxes_per_page = []
+    with stage_timer("yolo"):
+        for start in range(0, len(normalized), batch_size):
+            batch = normalized[start:start + batch_size]
+            # A list source is letterboxed and run as a single batched forward pass;
+            # inference threads share the model, so they take turns
+            with ModelCache.yolo_lock:
+                results = model([page for page, _ in batch], verbose=False)
+            for (_, to_original), r in zip(batch, results):
+                page_boxes = []
+                for box in r.boxes:
+                    coords = box.xyxy[0].tolist()
+                    if len(coords) < 4:
+                        print(f"[SIGNATURE] Skipping YOLO box with insufficient coordinates: {coords}")
+                        continue
+                    page_boxes.append((*map_box(to_original, *coords[:4]), float(box.conf[0])))
+                boxes_per_page.append(page_boxes)
+    return boxes_per_page
+
+
+def _signature_spans(boxes_per_page: List[List[tuple]], first_page_no: int = 1) -> List[Dict[str, Any]]:
+    """Build de-duplicated signature span dicts from per-page YOLO boxes."""
+    signature_spans = []
+    unique_boxes = set()
+    for i, page_boxes in enumerate(boxes_per_page, start=first_page_no - 1):
+        for x1, y1, x2, y2, conf in page_boxes:
+            box_key = (i, round(x1, 2), round(y1, 2), round(x2, 2), round(y2, 2))
+            if box_key in unique_boxes:
+                continue
+            unique_boxes.add(box_key)
+            signature_spans.append({
+                "span_id": f"signature_{i}",
+                "text": "<signature>",
+                "bbox": {
+                    "x1": float(x1),
+                    "y1": float(y1),
+                    "x2": float(x2),
+                    "y2": float(y2)
+                },
+                "page_no": i + 1,
+                "language": "und",
+                "ocr_confidence": conf
+            })
+    return signature_spans
+
+
+def detect_signatures(pages: List[Any], first_page_no: int = 1) -> List[Dict[str, Any]]:
+    """Run YOLO signature detection over decoded page arrays.
+
+    ``pages`` are the same BGR buffers that were passed to OCR, starting at
+    page ``first_page_no``; one span dict is returned per unique box, tagged
+    with its page number.
+    """
+    try:
+        signature_spans = _signature_spans(_yolo_boxes(pages), first_page_no)
+    except Exception as e:
+        print(f"[SIGNATURE][ERROR] Signature detection failed: {e}")
+        return []
+    print(f"[SIGNATURE] Total detected signature boxes: {len(signature_spans)}")
+    return signature_spans
+
+
+def build_pii_spans(ocr_result: Dict[str, Any], signature_spans: List[Dict[str, Any]]) -> List[TextSpan]:
+    """Convert OCR blocks (plus the signature boxes of each page) into TextSpans."""
+    spans_for_pii = []
+    for page in ocr_result.get("pages", []):
+        for i, block in enumerate(page.get("blocks", [])):
+            span = TextSpan(
+                span_id=f"block_{i}",
+                text=block["text"],
+                bbox={
+                    "x1": block["position"]["top_left"][0],
+                    "y1": block["position"]["top_left"][1],
+                    "x2": block["position"]["bottom_right"][0],
+                    "y2": block["position"]["bottom_right"][1]
+                },
+                page_no=page["page_number"],
+                language="en",
+                ocr_confidence=block["confidence"]
+            )
+            spans_for_pii.append(span)
+
+        # Add signature spans to their page
+        for sig in signature_spans:
+            if sig["page_no"] == page["page_number"]:
+                sig_span = TextSpan(
+                    span_id=sig["span_id"],
+                    text=sig["text"],
+                    bbox=sig["bbox"],
+                    page_no=sig["page_no"],
+                    language=sig["language"],
+                    ocr_confidence=sig["ocr_confidence"]
+                )
+                spans_for_pii.append(sig_span)
+    return spans_for_pii
+
+
+def detect_pii(spans: List[TextSpan], entities_to_detect: Optional[List[str]] = None) -> List[DetectedEntity]:
+    """Run the shared PIIDetector over the spans; failures yield no entities."""
+    if entities_to_detect is None:
+        entities_to_detect = [e.value for e in EntityType]
+    try:
+        with stage_timer("pii"):
+            detector = ModelCache.get_pii_detector()
+            return detector.detect_entities(spans, entities_to_detect)
+    except Exception as pii_error:
+        print(f"[WARNING] PII detection failed: {pii_error}")
+        return []
+
+
+def detect_pii_many(span_groups: List[List[TextSpan]], entities_to_detect: Optional[List[str]] = None) -> List[List[DetectedEntity]]:
+    """Like ``detect_pii`` for several documents, sharing one batched spaCy pass."""
+    if entities_to_detect is None:
+        entities_to_detect = [e.value for e in EntityType]
+    try:
+        with stage_timer("pii"):
+            detector = ModelCache.get_pii_detector()
+            return detector.detect_entities_many(span_groups, entities_to_detect)
+    except Exception as pii_error:
+        print(f"[WARNING] PII detection failed: {pii_error}")
+        return [[] for _ in span_groups]
+
+
+def analyze_document(
+    data: bytes,
+    filename: str,
+    on_page: Optional[Callable[[int, int], None]] = None,
+    entities_to_detect: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Run OCR, signature detection and PII detection for one uploaded document.
+
+    The upload is decoded in memory a window of pages at a time, and each
+    window's arrays are shared by OCR and YOLO before the next is rendered.
+    Returns ``{"error": ...}`` if OCR fails, otherwise the OCR
+    result, the signature spans, the spans fed to PII detection and the
+    detected entities. ``on_page(pages_done, pages_total)`` reports OCR
+    progress; ``entities_to_detect`` limits detection to those entity types
+    (default: all).
+    """
+    signature_spans: List[Dict[str, Any]] = []
+
+    def on_window(images, first_page_no):
+        signature_spans.extend(detect_signatures(images, first_page_no=first_page_no))
+
+    ocr_result = process_document_bytes(data, filename, on_page=on_page, on_window=on_window)
+    if ocr_result is None or (isinstance(ocr_result, dict) and "error" in ocr_result):
+        error_msg = ocr_result["error"] if ocr_result and "error" in ocr_result else "OCR failed"
+        logger.warning(f"OCR failed for {filename}: {error_msg}")
+        ERRORS.labels("ocr").inc()
+        return {"error": error_msg}
+
+    spans_for_pii = build_pii_spans(ocr_result, signature_spans)
+    pii_entities = detect_pii(spans_for_pii, entities_to_detect)
+    observe_document(len(ocr_result.get("pages", [])), len(spans_for_pii), len(pii_entities))
+    update_process_memory()
+
+    return {
+        "ocr": ocr_result,
+        "signatures": signature_spans,
+        "spans": spans_for_pii,
+        "pii_entities": pii_entities,
+    }
+
+
+def _stream_item(page_data: Dict[str, Any], image: Any, entities_to_detect: Optional[List[str]]) -> Dict[str, Any]:
+    page_no = page_data["page_number"]
+    signature_spans = detect_signatures([image], first_page_no=page_no)
+    spans = build_pii_spans({"pages": [page_data]}, signature_spans)
+    pii_entities = detect_pii(spans, entities_to_detect)
+    return {
+        "page_number": page_no,
+        "ocr": page_data,
+        "signatures": signature_spans,
+        "pii_detection": entity_dicts(pii_entities),
+    }
+
+
+def stream_page_count(data: bytes, filename: str) -> Any:
+    """Pages ``analyze_stream_page`` can be asked for, or an ``{"error": ...}`` dict."""
+    return count_stream_pages(data, filename)
+
+
+def analyze_stream_page(
+    data: bytes, filename: str, page_no: int, entities_to_detect: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """One streamed result: page ``page_no``'s OCR blocks, signature boxes and PII entities.
+
+    Only that page is decoded, so each page of a stream can be run as its own
+    executor task (and, in pre-fork mode, in any inference worker). Returns
+    an ``{"error": ...}`` dict if the page cannot be read.
+    """
+    page_data, image = process_page_bytes(data, filename, page_no)
+    if "error" in page_data:
+        logger.warning(f"Streaming OCR failed for {filename}: {page_data['error']}")
+        return page_data
+    return _stream_item(page_data, image, entities_to_detect)
+
+
+def _batch_window(pages: List[Any], text_blocks: List[Optional[List[Dict[str, Any]]]]) -> Tuple[List[Any], List[List[tuple]]]:
+    """OCR detections (``None`` for text-layer pages) and signature boxes for one window of batch pages."""
+    # Only pages without a text layer are OCRed
+    ocr_indices = [i for i, blocks in enumerate(text_blocks) if blocks is None]
+    PAGE_SOURCES.labels("text_layer").inc(len(pages) - len(ocr_indices))
+    PAGE_SOURCES.labels("ocr").inc(len(ocr_indices))
+    detections: List[Any] = [None] * len(pages)
+    ocr_detections = readtext_many([pages[i] for i in ocr_indices], batch_size=settings.ocr_batch_size) if ocr_indices else []
+    for i, page_detections in zip(ocr_indices, ocr_detections):
+        detections[i] = page_detections
+    try:
+        boxes = _yolo_boxes(pages)
+    except Exception as e:
+        print(f"[SIGNATURE][ERROR] Batched signature detection failed: {e}")
+        boxes = [[] for _ in pages]
+    return detections, boxes
+
+
+def analyze_batch(files: List[Tuple[bytes, str]], entities_to_detect: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Process many small documents with batched model calls.
+
+    Pages of all files are decoded in windows of about ``BATCH_PAGE_WINDOW``
+    pages, so a batch never holds more rendered pages than that. Each
+    window is signature-detected in batched YOLO calls and, except PDF
+    pages with a text layer, OCRed together (similar-sized pages share
+    EasyOCR batches, see ``ocr.processor``); then PII detection runs per
+    file. Returns one result per input file, in order; a failure in one
+    file is reported in that file's entry only.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in files]
+    window = max(1, settings.batch_page_window)
+    # Per decoded page: (file index, page index, text-layer blocks or None, OCR detections, signature boxes)
+    processed: List[Tuple[int, int, Optional[List[Dict[str, Any]]], Any, List[tuple]]] = []
+    pages: List[Any] = []
+    owners: List[Tuple[int, int, Optional[List[Dict[str, Any]]]]] = []
+
+    def flush():
+        detections, boxes = _batch_window(pages, [blocks for _, _, blocks in owners])
+        for (f, p, blocks), page_detections, page_boxes in zip(owners, detections, boxes):
+            processed.append((f, p, blocks, page_detections, page_boxes))
+        pages.clear()
+        owners.clear()
+
+    for f, (data, filename) in enumerate(files):
+        try:
+            total, windows = page_windows(data, filename, PAGE_LIMIT)
+            text_layer = {}
+            if is_pdf(filename, data):
+                with stage_timer("text_layer"):
+                    text_layer = extract_text_layer(data, 1, total)
+            p = 0
+            for images in windows:
+                for image in images:
+                    pages.append(image)
+                    owners.append((f, p, text_layer.get(p + 1)))
+                    p += 1
+                del images
+                if len(pages) >= window:
+                    flush()
+        except DocumentDecodeError as e:
+            results[f] = {"filename": filename, "error": str(e)}
+        except Exception as e:
+            results[f] = {"filename": filename, "error": f"Could not decode document: {e}"}
+    if pages:
+        flush()
+
+    ocr_pages: Dict[int, List[Dict[str, Any]]] = {}
+    signature_boxes: Dict[int, List[List[tuple]]] = {}
+    for f, p, text_blocks, page_detections, page_boxes in processed:
+        if "error" in results[f]:
+            continue
+        filename = files[f][1]
+        if isinstance(page_detections, Exception):
+            results[f] = {"filename": filename, "error": f"EasyOCR failed for page {p + 1}: {page_detections}"}
+            continue
+        blocks = text_blocks if text_blocks is not None else _blocks_from_detections(page_detections)
+        ocr_pages.setdefault(f, []).append({"page_number": p + 1, "blocks": blocks})
+        signature_boxes.setdefault(f, []).append(page_boxes)
+
+    ready = []  # (file index, ocr result, signature spans, pii spans)
+    for f, (data, filename) in enumerate(files):
+        if "error" in results[f]:
+            continue
+        ocr_result = {"pages": ocr_pages.get(f, [])}
+        if not is_pdf(filename, data) and not any(page["blocks"] for page in ocr_result["pages"]):
+            results[f] = {"filename": filename, "error": "No text detected in the image."}
+            continue
+        signature_spans = _signature_spans(signature_boxes.get(f, []))
+        ready.append((f, ocr_result, signature_spans, build_pii_spans(ocr_result, signature_spans)))
+
+    # One NER pass over the spans of every file in the batch
+    entities_per_file = detect_pii_many([spans for _, _, _, spans in ready], entities_to_detect)
+    for (f, ocr_result, signature_spans, spans), pii_entities in zip(ready, entities_per_file):
+        observe_document(len(ocr_result["pages"]), len(spans), len(pii_entities))
+        results[f] = {
+            "filename": files[f][1],
+            "ocr": ocr_result,
+            "signatures": signature_spans,
+            "pii_detection": entity_dicts(pii_entities),
+        }
+    update_process_memory()
+    return results
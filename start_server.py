@@ -14,11 +14,65 @@ sys.path.insert(0, str(project_root))
 from config.settings import settings
 from config.logging import logger
 
+def start_prefork_pool():
+    """Load every model once in this process, then fork the inference workers."""
+    import time
+    import psutil
+    from performance_cache import ModelCache
+    from pipeline.executor import InferenceExecutor, set_executor
+    from pipeline.prefork import PreforkPool
+
+    started = time.time()
+    ModelCache.load_yolo()
+    ModelCache.load_easyocr()
+    ModelCache.load_spacy()
+    ModelCache.load_presidio()
+    ModelCache.load_pii_detector()
+    rss_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+    logger.info(f"Models loaded in parent in {time.time() - started:.1f}s, rss={rss_mb:.1f}MB")
+
+    pool = PreforkPool(settings.inference_workers).start()
+    set_executor(InferenceExecutor(
+        max_workers=settings.inference_workers,
+        queue_depth=settings.inference_queue_depth,
+        retry_after=settings.overload_retry_after,
+        backend=pool,
+    ))
+    logger.info(f"Forked {pool.num_workers} inference workers ({pool.threads_per_worker} torch threads each)")
+    return pool
+
+def enable_multiprocess_metrics():
+    """Point prometheus_client at a fresh shared directory so /metrics covers every process.
+
+    Must run before ``config.metrics`` is first imported.
+    """
+    import tempfile
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus_"))
+
 def main():
     """Start the production server."""
     logger.info("Starting OCR PII Detection API server...")
     logger.info(f"Configuration loaded: Debug={settings.debug}, Host={settings.host}, Port={settings.port}")
     
+    if settings.serving_mode == "prefork" or (settings.workers > 1 and not settings.debug):
+        enable_multiprocess_metrics()
+    
+    if settings.serving_mode == "prefork":
+        # One HTTP process in front of the forked inference workers, which
+        # must live in this process for the shared model memory to apply.
+        start_prefork_pool()
+        uvicorn.run(
+            "api.main:app",
+            host=settings.host,
+            port=settings.port,
+            workers=1,
+            log_level=settings.log_level.lower(),
+            access_log=True,
+            reload=False,
+            timeout_keep_alive=settings.request_timeout,
+        )
+        return
+    
     # Start the server
     uvicorn.run(
         "api.main:app",
@@ -0,0 +1,46 @@
+import pytest
+import spacy
+from spacy.language import Language
+
+from pii_detection.detector import PIIDetector
+from pii_detection.models import EntityType, TextSpan
+
+
+@Language.component("lowercase_lemmatizer")
+def lowercase_lemmatizer(doc):
+    # Stands in for the model's lemmatizer, which Presidio's context enhancement reads
+    for token in doc:
+        token.lemma_ = token.lower_
+    return doc
+
+
+@pytest.fixture(scope="module")
+def detector():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("lowercase_lemmatizer")
+    ner = nlp.add_pipe("entity_ruler", name="ner")
+    ner.add_patterns([{"label": "PERSON", "pattern": [{"IS_TITLE": True}, {"IS_TITLE": True}]}])
+    return PIIDetector(nlp=nlp)
+
+
+def span(span_id, text, y):
+    return TextSpan(span_id=span_id, text=text, bbox={"x1": 0, "y1": y, "x2": 300, "y2": y + 20}, page_no=1)
+
+
+SPANS = [
+    span("b0", "Mobile 9876543210", 0),
+    span("b1", "PAN ABCPE1234F", 30),
+    span("b2", "Ravi Kumar", 60),
+]
+
+
+def scores(entities):
+    return sorted((e.type.value, e.value, e.confidence) for e in entities)
+
+
+@pytest.mark.parametrize("subset", [["PHONE", "PAN"], ["PAN"]])
+def test_subset_without_ner_keeps_context_scores(detector, subset):
+    full = detector.detect_entities(SPANS, [e.value for e in EntityType], mode="span")
+    expected = [e for e in full if e.type.value in subset]
+    assert expected
+    assert scores(detector.detect_entities(SPANS, subset, mode="span")) == scores(expected)
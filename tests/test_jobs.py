@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import time
+
+from pipeline.jobs import COMPLETED, QUEUED, RUNNING, JobStore
+
+
+def test_running_job_with_live_pid_but_no_lease_is_requeued(tmp_path):
+    # A store from before leases, whose owner PID now belongs to another process
+    with sqlite3.connect(os.path.join(tmp_path, "jobs.sqlite3")) as conn:
+        conn.executescript(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, filename TEXT NOT NULL, use_llm INTEGER NOT NULL DEFAULT 0, "
+            "status TEXT NOT NULL, pages_done INTEGER NOT NULL DEFAULT 0, pages_total INTEGER, result TEXT, "
+            "error TEXT, owner_pid INTEGER, created_at REAL NOT NULL, updated_at REAL NOT NULL);"
+            "INSERT INTO jobs (id, filename, status, owner_pid, created_at, updated_at) "
+            "VALUES ('job', 'a.png', 'running', 1, 0, 0);"
+        )
+    store = JobStore(str(tmp_path))
+    assert store.requeue_interrupted() == 1
+    assert store.get("job")["status"] == QUEUED
+
+
+def test_leased_job_is_kept_until_the_lease_lapses(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = store.create(b"data", "a.png", False)
+    assert store.claim_next("runner-a", 0.2)["id"] == job_id
+    assert store.requeue_interrupted() == 0
+    time.sleep(0.3)
+    assert store.requeue_interrupted() == 1
+    assert store.get(job_id)["status"] == QUEUED
+
+
+def test_renewed_lease_keeps_the_job(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = store.create(b"data", "a.png", False)
+    store.claim_next("runner-a", 0.2)
+    time.sleep(0.1)
+    store.renew_leases("runner-a", [job_id], 60)
+    time.sleep(0.2)
+    assert store.requeue_interrupted() == 0
+    assert store.get(job_id)["status"] == RUNNING
+
+
+def test_finish_is_ignored_once_another_runner_holds_the_job(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = store.create(b"data", "a.png", False)
+    store.claim_next("runner-a", 0.1)
+    time.sleep(0.2)
+    store.requeue_interrupted()
+    store.claim_next("runner-b", 60)
+    store.finish(job_id, result="{}", owner="runner-a")
+    assert store.get(job_id)["status"] == RUNNING
+    assert os.path.exists(store.payload_path(job_id))
+    store.finish(job_id, result="{}", owner="runner-b")
+    assert store.get(job_id)["status"] == COMPLETED
+    assert not os.path.exists(store.payload_path(job_id))
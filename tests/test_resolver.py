@@ -0,0 +1,79 @@
+from pii_detection.resolver import Candidate, fuse_scores, resolve
+
+TEXT = "MRN AB1234567 Aadhaar 2345 6789 0124"
+
+
+def candidate(entity_type, start, end, score=0.8, method="rule", validations=None):
+    return Candidate(entity_type, start, end, TEXT[start:end], score, method, validations or {})
+
+
+def test_fuse_scores():
+    assert fuse_scores([0.8, 0.6]) == 0.8
+    assert fuse_scores([0.8, 0.6], "noisy_or") == 0.92
+
+
+def test_single_candidate_is_returned_as_is():
+    only = candidate("AADHAAR", 22, 36)
+    assert resolve([only], TEXT) == [only]
+
+
+def test_same_type_overlaps_merge_into_their_union():
+    rule = candidate("MEDICAL_RECORD_NUMBER", 0, 13, score=0.8, method="rule", validations={"pattern": "mrn"})
+    ner = candidate("MEDICAL_RECORD_NUMBER", 4, 13, score=0.6, method="ner", validations={"ner": "CARDINAL"})
+    [merged] = resolve([ner, rule], TEXT)
+    assert (merged.start, merged.end, merged.value) == (0, 13, "MRN AB1234567")
+    # The rule detection leads; the other's validations are kept as well
+    assert merged.method == "rule"
+    assert merged.score == 0.8
+    assert merged.validations == {"pattern": "mrn", "ner": "CARDINAL"}
+
+
+def test_same_type_merge_can_fuse_with_noisy_or():
+    first = candidate("AADHAAR", 22, 31, score=0.5)
+    second = candidate("AADHAAR", 27, 36, score=0.5, method="ner")
+    [merged] = resolve([first, second], TEXT, fusion="noisy_or")
+    assert (merged.start, merged.end, merged.value) == (22, 36, "2345 6789 0124")
+    assert merged.score == 0.75
+
+
+def test_same_type_without_overlap_stays_separate():
+    first = candidate("AADHAAR", 22, 26)
+    touching = candidate("AADHAAR", 26, 31)
+    assert resolve([touching, first], TEXT) == [first, touching]
+
+
+def test_contained_lower_precedence_detection_is_dropped():
+    aadhaar = candidate("AADHAAR", 22, 36, score=0.7)
+    number = candidate("MEDICAL_RECORD_NUMBER", 27, 31, score=0.9, method="ner")
+    assert resolve([number, aadhaar], TEXT, precedence=["AADHAAR", "MEDICAL_RECORD_NUMBER"]) == [aadhaar]
+
+
+def test_contained_detection_that_ranks_higher_is_kept():
+    aadhaar = candidate("AADHAAR", 22, 36)
+    number = candidate("MEDICAL_RECORD_NUMBER", 27, 31)
+    resolved = resolve([aadhaar, number], TEXT, precedence=["MEDICAL_RECORD_NUMBER", "AADHAAR"])
+    assert resolved == [aadhaar, number]
+
+
+def test_without_precedence_score_then_length_decide():
+    outer = candidate("AADHAAR", 22, 36, score=0.6)
+    inner = candidate("PHONE", 22, 31, score=0.9)
+    assert resolve([outer, inner], TEXT) == [inner, outer]
+    inner = candidate("PHONE", 22, 31, score=0.6)
+    assert resolve([outer, inner], TEXT) == [outer]
+
+
+def test_partial_overlap_of_different_types_keeps_both():
+    left = candidate("AADHAAR", 22, 31)
+    right = candidate("PHONE", 27, 36)
+    assert resolve([right, left], TEXT, precedence=["AADHAAR", "PHONE"]) == [left, right]
+
+
+def test_separate_clusters_resolve_independently():
+    mrn = candidate("MEDICAL_RECORD_NUMBER", 4, 13)
+    mrn_again = candidate("MEDICAL_RECORD_NUMBER", 4, 13, score=0.6, method="ner")
+    aadhaar = candidate("AADHAAR", 22, 36)
+    resolved = resolve([aadhaar, mrn_again, mrn], TEXT)
+    assert [(c.entity_type, c.start, c.end) for c in resolved] == [
+        ("MEDICAL_RECORD_NUMBER", 4, 13), ("AADHAAR", 22, 36),
+    ]
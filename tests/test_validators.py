@@ -0,0 +1,77 @@
+from pii_detection.validators import (
+    CERTAIN, INVALID, UNKNOWN, validate_aadhaar, validate_batch, validate_pan, validate_phone, verhoeff_valid,
+)
+
+
+def test_verhoeff_check_digit():
+    assert verhoeff_valid(["234567890124", "499118665246"]).tolist() == [True, True]
+    # One digit off, or two neighbours swapped
+    assert verhoeff_valid(["234567890123", "234567890214"]).tolist() == [False, False]
+
+
+def test_aadhaar_with_valid_check_digit_is_certain():
+    verdicts = validate_aadhaar(["2345 6789 0124", "499118665246", "2345-6789-0124"])
+    assert verdicts.tolist() == [CERTAIN, CERTAIN, CERTAIN]
+
+
+def test_aadhaar_invalid_numbers():
+    verdicts = validate_aadhaar([
+        "2345 6789 0123",  # wrong check digit
+        "1234 5678 9012",  # starts with 1
+        "0123 4567 8901",  # starts with 0
+        "2345 6789 012",  # 11 digits
+        "2345 6789 01245",  # 13 digits
+    ])
+    assert verdicts.tolist() == [INVALID] * 5
+
+
+def test_pan_categories():
+    # Person, company, HUF, firm, association, trust, body of individuals,
+    # local authority, juridical person, government
+    values = [f"ABC{category}E1234F" for category in "PCHFATBLJG"]
+    assert validate_pan(values).tolist() == [UNKNOWN] * len(values)
+    assert validate_pan(["ABCXE1234F", "ABCDE1234F"]).tolist() == [INVALID, INVALID]
+
+
+def test_pan_serial_and_shape():
+    assert validate_pan(["ABCPE0000F", "ABCPE0001F"]).tolist() == [INVALID, UNKNOWN]
+    assert validate_pan(["abcpe1234f"]).tolist() == [UNKNOWN]
+    assert validate_pan(["ABCPE1234", "ABCPE12345F"]).tolist() == [INVALID, INVALID]
+
+
+def test_phone_international_mobile_is_certain():
+    verdicts = validate_phone(["+91 9876543210", "+91-6123456789", "+919876543210"])
+    assert verdicts.tolist() == [CERTAIN, CERTAIN, CERTAIN]
+
+
+def test_phone_without_country_code_stays_unknown():
+    assert validate_phone(["9876543210", "7012345678"]).tolist() == [UNKNOWN, UNKNOWN]
+    # Mobile numbers start with 6-9
+    assert validate_phone(["5876543210"]).tolist() == [INVALID]
+
+
+def test_phone_trunk_zero_landline():
+    assert validate_phone(["011 2345 6789", "022-23456789", "0422 2345678"]).tolist() == [UNKNOWN] * 3
+    # After the trunk 0 comes an STD code (1-8), not a mobile number or another 0
+    assert validate_phone(["0 9876543210", "00123456789"]).tolist() == [INVALID, INVALID]
+
+
+def test_phone_repeated_digits_are_placeholders():
+    verdicts = validate_phone(["9999999999", "+91 9999999999", "0 1111111111"])
+    assert verdicts.tolist() == [INVALID, INVALID, INVALID]
+
+
+def test_phone_wrong_length():
+    assert validate_phone(["98765", "98765432101", "+91 987654321"]).tolist() == [INVALID] * 3
+
+
+def test_validate_batch_by_type():
+    verdicts = validate_batch(
+        ["AADHAAR", "PAN", "PHONE", "EMAIL", "AADHAAR"],
+        ["2345 6789 0124", "ABCPE1234F", "9999999999", "a@b.com", "2345 6789 0123"],
+    )
+    assert verdicts.tolist() == [CERTAIN, UNKNOWN, INVALID, UNKNOWN, INVALID]
+
+
+def test_validate_batch_empty():
+    assert validate_batch([], []).tolist() == []